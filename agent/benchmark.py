@@ -0,0 +1,930 @@
+# -*- coding: utf-8 -*-
+"""
+Offline replay benchmark for the custom recognitions.
+
+Each case is a directory with a `case.json` and the recorded screenshots it
+refers to:
+
+    {
+        "recognition": "SelectBounty",
+        "param": "\"Frost Orb\"",
+        "node": "Stage_Bounty_Boss",
+        "roi": [0, 0, 0, 0],
+        "image": "floors.png",
+        "screens": ["carousel-1.png", "carousel-2.png"],
+        "frames": {
+            "floors.png": {
+                "ocr": [{"text": "Frost Orb", "box": [600, 380, 120, 30], "score": 0.9}],
+                "template": {"stage/bounty-floor-iii.png": [{"box": [90, 300, 28, 42], "score": 0.95}]}
+            }
+        }
+    }
+
+`image` is passed as argv.image, every post_click/post_swipe moves the fake
+controller to the next entry of `screens`, and `run_recognition` answers from
+the recorded OCR/template results of the current frame, with a detail whose
+box is None on a miss like MaaFramework's. DirectHit hits its ROI; a case
+needing any other recognition type is reported as skipped. ROI crops passed
+by run_recognition_in_roi are located in the frame by content, and time
+spent in the fakes is subtracted from the reported latency.
+
+Usage: python agent/benchmark.py recognitions <cases_dir> [-n 20]
+       python agent/benchmark.py startup [-n 5]
+       python agent/benchmark.py logging [-n 20000]
+       python agent/benchmark.py swipe <cases_dir> [--node NODE]
+       python agent/benchmark.py digits <cases_dir>
+       python agent/benchmark.py prefilter <cases_dir> [--write]
+       python agent/benchmark.py screens <screens_dir>
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+if current_script_dir not in sys.path:
+    sys.path.insert(0, current_script_dir)
+
+import numpy
+from PIL import Image
+
+from utils import box_center_in
+from utils.screen import crop_view, to_frame_box
+
+### Fake MaaFramework objects ###
+
+
+class FakeJob:
+    def __init__(self, result=None):
+        self._result = result
+
+    def wait(self):
+        return self
+
+    def get(self):
+        return self._result
+
+    @property
+    def succeeded(self) -> bool:
+        return True
+
+
+class FakeController:
+    """Answers controller calls from the recorded screens of a case"""
+
+    def __init__(self, frames: dict, image_name: str, screens: list, stats: dict):
+        self._frames = frames
+        self._screens = [image_name] + screens
+        self._index = 0
+        self._stats = stats
+
+    @property
+    def current_frame(self) -> str:
+        return self._screens[self._index]
+
+    def _advance(self):
+        self._index = min(self._index + 1, len(self._screens) - 1)
+
+    def post_screencap(self):
+        image = self._frames[self.current_frame]
+        self._stats["screencap_calls"] += 1
+        self._stats["bytes_copied"] += image.nbytes
+        return FakeJob(image.copy())
+
+    def post_click(self, x: int, y: int):
+        self._stats["click_calls"] += 1
+        self._advance()
+        return FakeJob()
+
+    def post_swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int):
+        self._stats["swipe_calls"] += 1
+        self._advance()
+        return FakeJob()
+
+    @property
+    def cached_image(self):
+        return self._frames[self.current_frame]
+
+    @property
+    def uuid(self) -> str:
+        return "benchmark"
+
+
+class FakeTasker:
+    def __init__(self, controller: FakeController):
+        self.controller = controller
+
+    def post_stop(self):
+        return FakeJob()
+
+
+def locate_crop(frame, crop) -> tuple:
+    """Find the top-left corner of the region `crop` was copied from in `frame`"""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    if crop.shape == frame.shape:
+        return 0, 0
+
+    height, width = crop.shape[:2]
+    patch = crop[:4, :4]
+    windows = sliding_window_view(frame, patch.shape)[..., 0, :, :, :]
+    candidates = numpy.argwhere((windows == patch).all(axis=(2, 3, 4)))
+    for y, x in candidates:
+        if numpy.array_equal(frame[y : y + height, x : x + width], crop):
+            return int(x), int(y)
+
+    raise ValueError("Image passed to run_recognition is not part of the current frame")
+
+
+class SkipCase(Exception):
+    """The case needs something the fakes cannot answer from the recording"""
+
+
+# Nodes of the base pipeline, for FakeContext.get_node_data
+_pipeline = None
+
+
+class FakeContext:
+    """Answers run_recognition from the recorded results of the current frame"""
+
+    def __init__(self, case: dict, controller: FakeController, stats: dict):
+        self._case = case
+        self._stats = stats
+        self.tasker = FakeTasker(controller)
+
+    def clone(self):
+        return self
+
+    def override_pipeline(self, pipeline_override: dict) -> bool:
+        return True
+
+    def override_next(self, name: str, next_list: list) -> bool:
+        return True
+
+    def get_node_data(self, name: str):
+        global _pipeline
+        if _pipeline is None:
+            from pipeline_optimizer import load_pipeline, PIPELINE_DIR
+
+            _pipeline = load_pipeline(PIPELINE_DIR)
+        return _pipeline.get(name)
+
+    def run_recognition(self, entry: str, image, pipeline_override: dict = None):
+        start_time = time.perf_counter()
+        try:
+            return self._run_recognition(entry, image, pipeline_override or {})
+        finally:
+            self._stats["fake_seconds"] += time.perf_counter() - start_time
+
+    def _run_recognition(self, entry: str, image, pipeline_override: dict):
+        from maa.define import AlgorithmEnum, OCRResult, Rect, RecognitionDetail
+        from maa.define import TemplateMatchResult
+
+        self._stats["recognition_calls"] += 1
+        self._stats["bytes_copied"] += image.nbytes
+
+        recognition = pipeline_override.get(entry, {}).get("recognition", {})
+        reco_type = recognition.get("type", "DirectHit")
+        param = recognition.get("param", {})
+        roi = param.get("roi") or [0, 0, 0, 0]
+        if roi[2] <= 0 or roi[3] <= 0:
+            roi = [0, 0, image.shape[1], image.shape[0]]
+
+        controller = self.tasker.controller
+        origin_x, origin_y = locate_crop(controller.cached_image, image)
+        roi = to_frame_box(roi, [origin_x, origin_y])
+        recorded = self._case["frames"].get(controller.current_frame, {})
+
+        def to_crop_box(box):
+            return [box[0] - origin_x, box[1] - origin_y, box[2], box[3]]
+
+        if reco_type == "OCR":
+            all_results = [
+                OCRResult(
+                    box=to_crop_box(r["box"]), score=r.get("score", 1.0), text=r["text"]
+                )
+                for r in recorded.get("ocr", [])
+                if box_center_in(r["box"], roi)
+            ]
+            expected = param.get("expected", [])
+            filterd_results = [
+                r
+                for r in all_results
+                if not expected or any(re.search(e, r.text) for e in expected)
+            ]
+        elif reco_type == "TemplateMatch":
+            all_results = [
+                TemplateMatchResult(
+                    box=to_crop_box(r["box"]), score=r.get("score", 1.0)
+                )
+                for template in param.get("template", [])
+                for r in recorded.get("template", {}).get(template, [])
+                if box_center_in(r["box"], roi)
+            ]
+            filterd_results = all_results
+        elif reco_type == "DirectHit":
+            all_results, filterd_results = [], []
+        else:
+            raise SkipCase(f"{entry}: no recorded results for {reco_type}")
+
+        # like MaaFramework, a miss still returns the detail, with box None
+        best_result = filterd_results[0] if filterd_results else None
+        if reco_type == "DirectHit":
+            box = Rect(*to_crop_box(roi))
+        else:
+            box = best_result and Rect(*best_result.box)
+
+        return RecognitionDetail(
+            reco_id=self._stats["recognition_calls"],
+            name=entry,
+            algorithm=AlgorithmEnum(reco_type),
+            box=box,
+            all_results=all_results,
+            filterd_results=filterd_results,
+            best_result=best_result,
+            raw_detail={},
+            raw_image=None,
+            draw_images=[],
+        )
+
+
+### Benchmark ###
+
+
+def load_frame(path: Path):
+    """Load a screenshot as a BGR array like MaaFramework hands them out"""
+    with Image.open(path) as image:
+        return numpy.ascontiguousarray(numpy.asarray(image.convert("RGB"))[:, :, ::-1])
+
+
+def load_cases(cases_dir: Path) -> list:
+    cases = []
+    for case_path in sorted(cases_dir.glob("**/case.json")):
+        with open(case_path, "r", encoding="utf-8") as f:
+            case = json.load(f)
+        case["name"] = str(case_path.parent.relative_to(cases_dir))
+        names = set([case["image"]] + case.get("screens", []))
+        case["images"] = {name: load_frame(case_path.parent / name) for name in names}
+        case.setdefault("frames", {})
+        cases.append(case)
+    return cases
+
+
+def percentile(values: list, q: float) -> float:
+    return float(numpy.percentile(values, q)) if values else 0.0
+
+
+def run_case(case: dict, iterations: int) -> dict:
+    from custom import RECOGNITIONS
+    from custom.registry import LazyRecognition
+
+    name = case["recognition"]
+    recognition = LazyRecognition(name, RECOGNITIONS[name]).load()
+    latencies = []
+    stats = {
+        "recognition_calls": 0,
+        "screencap_calls": 0,
+        "click_calls": 0,
+        "swipe_calls": 0,
+        "bytes_copied": 0,
+        "fake_seconds": 0.0,
+    }
+    result = None
+
+    for _ in range(iterations):
+        controller = FakeController(
+            case["images"], case["image"], case.get("screens", []), stats
+        )
+        context = FakeContext(case, controller, stats)
+        argv = SimpleNamespace(
+            task_detail=None,
+            node_name=case.get("node", case["recognition"]),
+            custom_recognition_name=case["recognition"],
+            custom_recognition_param=case.get("param", ""),
+            image=case["images"][case["image"]],
+            roi=case.get("roi", [0, 0, 0, 0]),
+        )
+
+        fake_seconds = stats["fake_seconds"]
+        start_time = time.perf_counter()
+        try:
+            result = recognition.analyze(context, argv)
+        except SkipCase as e:
+            result = SimpleNamespace(detail=f"skipped: {e}")
+            break
+        elapsed = time.perf_counter() - start_time
+        latencies.append((elapsed - (stats["fake_seconds"] - fake_seconds)) * 1000)
+
+    report = {
+        "case": case["name"],
+        "recognition": case["recognition"],
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+    }
+    stats.pop("fake_seconds")
+    runs = max(len(latencies), 1)
+    report.update({key: value / runs for key, value in stats.items()})
+    report["detail"] = getattr(result, "detail", None)
+    return report
+
+
+def bench_recognitions(args):
+    from utils.reco_cache import recognition_cache
+
+    cases = load_cases(Path(args.cases_dir))
+    if not cases:
+        print(f"No case.json found under {args.cases_dir}")
+        sys.exit(1)
+
+    reports = []
+    for case in cases:
+        if not args.cache:
+            recognition_cache.max_size = 0
+        recognition_cache.clear()
+        reports.append(run_case(case, args.iterations))
+
+    print(
+        f"{'case':<32} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+        f"{'reco':>6} {'shots':>6} {'MB copied':>10}  detail"
+    )
+    for report in reports:
+        print(
+            f"{report['case']:<32} {report['p50_ms']:>8.2f} {report['p90_ms']:>8.2f} "
+            f"{report['p99_ms']:>8.2f} {report['recognition_calls']:>6.1f} "
+            f"{report['screencap_calls']:>6.1f} "
+            f"{report['bytes_copied'] / 1024 / 1024:>10.2f}  {report['detail']}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=4, ensure_ascii=False)
+
+
+def bench_startup(args):
+    """
+    Time agent/main.py's startup up to the point where AgentServer would
+    start (see startup_probe.py), once with the in-process venv activation
+    and once with the old relaunch.
+    """
+    probe_path = os.path.join(current_script_dir, "startup_probe.py")
+    modes = {"in-process": "0", "relaunch": "1"}
+    timings = {}
+
+    for mode, relaunch in modes.items():
+        env = os.environ.copy()
+        env["LARINA_VENV_RELAUNCH"] = relaunch
+        timings[mode] = []
+        for _ in range(args.iterations):
+            start_time = time.perf_counter()
+            subprocess.run(
+                [args.python, probe_path],
+                env=env,
+                check=True,
+                capture_output=True,
+            )
+            timings[mode].append((time.perf_counter() - start_time) * 1000)
+
+    print(f"{'mode':<12} {'p50 ms':>8} {'min ms':>8} {'max ms':>8}")
+    for mode, values in timings.items():
+        print(
+            f"{mode:<12} {percentile(values, 50):>8.1f} {min(values):>8.1f} {max(values):>8.1f}"
+        )
+
+
+def bench_logging(args):
+    """
+    Per-call cost of the debug logging in the recognition loops: eager f-strings
+    vs lazy loguru arguments with the file sink at DEBUG and at INFO, and
+    `logger.exception` with a screenshot in scope under loguru's diagnose vs
+    the summarizing patcher of utils/logger.py.
+    """
+    import tempfile
+    from loguru import logger
+    from utils.logger import _summarize_exception_locals
+
+    payload = [
+        SimpleNamespace(text=f"Lv.{i}", box=[i, i, 40, 20], score=0.9)
+        for i in range(20)
+    ]
+    frame = numpy.zeros((720, 1280, 3), dtype=numpy.uint8)
+    raw = bytes(frame[:256])
+
+    def eager():
+        logger.debug(f"[Bench] results: {payload}")
+
+    def lazy():
+        logger.debug("[Bench] results: {}", payload)
+
+    def failing():
+        image, buffer = frame, raw
+        try:
+            raise ValueError(f"bad frame {image.shape} {len(buffer)}")
+        except ValueError:
+            logger.exception("[Bench] failed")
+
+    def per_call_us(func, iterations):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        logger.complete()
+        return (time.perf_counter() - start_time) / iterations * 1e6
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        log_path = os.path.join(log_dir, "bench.log")
+        rows = []
+
+        for level in ["DEBUG", "INFO"]:
+            logger.remove()
+            logger.configure(extra={"locals": ""}, patcher=None)
+            logger.add(log_path, level=level, enqueue=True, diagnose=False)
+            for name, func in [("eager f-string", eager), ("lazy args", lazy)]:
+                rows.append((f"{name} @ {level}", per_call_us(func, args.iterations)))
+
+        for name, diagnose, patcher in [
+            ("exception diagnose", True, None),
+            ("exception summary", False, _summarize_exception_locals),
+        ]:
+            logger.remove()
+            logger.configure(extra={"locals": ""}, patcher=patcher)
+            logger.add(
+                log_path,
+                level="DEBUG",
+                enqueue=True,
+                backtrace=True,
+                diagnose=diagnose,
+                format="{message}{extra[locals]}",
+            )
+            iterations = max(args.iterations // 100, 10)
+            size = os.path.getsize(log_path)
+            us = per_call_us(failing, iterations)
+            logger.remove()
+            rows.append((name, us, (os.path.getsize(log_path) - size) / iterations))
+
+        logger.remove()
+
+    print(f"{'case':<28} {'us/call':>10} {'bytes/record':>14}")
+    for name, us, *record_size in rows:
+        size = f"{record_size[0]:.0f}" if record_size else "-"
+        print(f"{name:<28} {us:>10.2f} {size:>14}")
+
+
+def bench_swipe(args):
+    """
+    Check the swipe displacement estimate of utils/calibration.py. Every
+    `swipes.json` under the cases directory lists recorded frame pairs:
+
+        [{"before": "a.png", "after": "b.png", "axis": "x",
+          "expected": -600, "roi": [0, 150, 1280, 450]}]
+
+    Without fixtures, frames of the replay cases are shifted synthetically.
+    """
+    from utils.calibration import phase_correlation, unwrap_shift
+
+    samples = []
+    for fixture in sorted(Path(args.cases_dir).glob("**/swipes.json")):
+        with open(fixture, "r", encoding="utf-8") as f:
+            for swipe in json.load(f):
+                samples.append(
+                    (
+                        f"{fixture.parent.name}/{swipe['before']}",
+                        load_frame(fixture.parent / swipe["before"]),
+                        load_frame(fixture.parent / swipe["after"]),
+                        swipe.get("axis", "x"),
+                        swipe["expected"],
+                        swipe.get("roi"),
+                    )
+                )
+
+    if not samples:
+        rng = numpy.random.default_rng(0)
+        frames = sorted(Path(args.cases_dir).glob("**/*.png")) or [None]
+        for path in frames[:4]:
+            if path is None:
+                frame = rng.integers(0, 255, (720, 1280, 3), dtype=numpy.uint8)
+            else:
+                frame = load_frame(path)
+            name = "noise" if path is None else path.name
+            for axis, shift in [("x", -600), ("x", 240), ("y", -300), ("y", 90)]:
+                # the content moves by `shift`, new content enters on the other side
+                after = numpy.roll(frame, shift, axis=1 if axis == "x" else 0)
+                fresh = rng.integers(0, 255, after.shape, dtype=numpy.uint8)
+                span = slice(shift, None) if shift < 0 else slice(0, shift)
+                if axis == "x":
+                    after[:, span] = fresh[:, span]
+                else:
+                    after[span] = fresh[span]
+                samples.append((f"{name} (synthetic)", frame, after, axis, shift, None))
+
+    print(
+        f"{'pair':<32} {'axis':>4} {'expected':>9} {'measured':>9} {'error':>6} {'peak':>5}"
+    )
+    errors = []
+    for name, before, after, axis, expected, roi in samples:
+        shift_x, shift_y, peak = phase_correlation(before, after, roi)
+        height, width = before.shape[:2]
+        if roi:
+            width, height = roi[2], roi[3]
+        size = width if axis == "x" else height
+        measured = unwrap_shift(shift_x if axis == "x" else shift_y, expected, size)
+        errors.append(abs(measured - expected))
+        print(
+            f"{name[:32]:<32} {axis:>4} {expected:>9.0f} {measured:>9.0f} "
+            f"{errors[-1]:>6.0f} {peak:>5.2f}"
+        )
+
+    print(
+        f"\nmean abs error {sum(errors) / len(errors):.1f} px, max {max(errors):.0f} px"
+    )
+
+    if args.node:
+        bench_swipe_wait(args.node, samples[0][1], args.iterations)
+
+
+class SwipeController:
+    """
+    A list on screen for CalibratedSwipe: every swipe scrolls `frame` by
+    `scale` times the swipe (0 at the end of the list). An `animated` screen
+    never settles, every screencap differs.
+    """
+
+    def __init__(self, frame, scale: float, animated: bool, rng):
+        self.frame = frame
+        self.scale = scale
+        self.animated = animated
+        self.rng = rng
+
+    def post_swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int):
+        axis = 1 if abs(x2 - x1) >= abs(y2 - y1) else 0
+        shift = int(round(((x2 - x1) if axis else (y2 - y1)) * self.scale))
+        if shift:
+            self.frame = numpy.roll(self.frame, shift, axis=axis)
+        return FakeJob()
+
+    def post_screencap(self):
+        if self.animated:
+            self.frame = self.rng.integers(0, 255, self.frame.shape, dtype=numpy.uint8)
+        return FakeJob(self.frame.copy())
+
+    @property
+    def cached_image(self):
+        return self.frame
+
+    @property
+    def uuid(self) -> str:
+        return "benchmark"
+
+
+def bench_swipe_wait(node: str, frame, iterations: int):
+    """
+    Wall time of the CalibratedSwipe action of `node` when the list scrolls,
+    when it is already at its end and when the screen never settles (an
+    animation or a popup over the list): the last one is the longest the
+    action can hold the task.
+    """
+    import tempfile
+    from pipeline_optimizer import load_pipeline, PIPELINE_DIR
+    from custom import ACTIONS
+    from custom.registry import LazyAction
+    from utils.calibration import swipe_calibration
+
+    # keep the fake swipes out of the device calibration
+    swipe_calibration.path = Path(tempfile.mkdtemp()) / "swipe_calibration.json"
+
+    param = load_pipeline(PIPELINE_DIR)[node]["action"]["param"]
+    action = LazyAction("CalibratedSwipe", ACTIONS["CalibratedSwipe"]).load()
+    argv = SimpleNamespace(
+        node_name=node,
+        custom_action_param=json.dumps(param["custom_action_param"]),
+        box=[0, 0, 0, 0],
+    )
+
+    print(f"\n{node}: {argv.custom_action_param}")
+    print(f"{'screen':<16} {'p50 s':>7} {'max s':>7}")
+    for name, scale, animated in [
+        ("scrolls", 0.8, False),
+        ("end of list", 0.0, False),
+        ("never settles", 1.0, True),
+    ]:
+        timings = []
+        for i in range(iterations):
+            rng = numpy.random.default_rng(i)
+            controller = SwipeController(frame.copy(), scale, animated, rng)
+            context = SimpleNamespace(tasker=FakeTasker(controller))
+            start_time = time.perf_counter()
+            action.run(context, argv)
+            timings.append(time.perf_counter() - start_time)
+        print(f"{name:<16} {numpy.median(timings):>7.2f} {max(timings):>7.2f}")
+
+
+def _render_field(text: str, rng):
+    """A synthetic counter crop: light text on a dark panel with sensor noise"""
+    from PIL import ImageDraw, ImageFont
+
+    image = Image.new("RGB", (120, 40), (30, 40, 60))
+    ImageDraw.Draw(image).text(
+        (8, 6), text, font=ImageFont.load_default(size=22), fill=(240, 240, 240)
+    )
+    noisy = numpy.asarray(image)[:, :, ::-1] + rng.integers(-12, 12, (40, 120, 3))
+    return numpy.clip(noisy, 0, 255).astype(numpy.uint8)
+
+
+def bench_digits(args):
+    """
+    Accuracy and latency of the glyph reader of utils/digits.py. Every
+    `digits.json` under the cases directory lists recorded crops:
+
+        [{"image": "ticket-1.png", "roi": [1131, 116, 67, 41], "text": "3/3"}]
+
+    Half of the samples bootstrap the bank (as OCR fallbacks would), the
+    other half is read. Without fixtures, counters are rendered synthetically.
+    """
+    import tempfile
+    from utils.digits import GlyphReader
+
+    samples = []
+    for fixture in sorted(Path(args.cases_dir).glob("**/digits.json")):
+        with open(fixture, "r", encoding="utf-8") as f:
+            for crop in json.load(f):
+                image = load_frame(fixture.parent / crop["image"])
+                roi = crop.get("roi") or [0, 0, image.shape[1], image.shape[0]]
+                samples.append((image, roi, crop["text"]))
+
+    if not samples:
+        rng = numpy.random.default_rng(0)
+        for i in range(args.samples):
+            text = [
+                f"{i % 4}/3",
+                f"Lv.{rng.integers(10, 99)}",
+                f"{rng.integers(1, 60)}F",
+            ][i % 3]
+            samples.append((_render_field(text, rng), [0, 0, 120, 40], text))
+
+    with tempfile.TemporaryDirectory() as bank_dir:
+        reader = GlyphReader(path=Path(bank_dir) / "glyph_bank.json")
+        learned = sum(
+            reader.learn(image, roi, text) for image, roi, text in samples[::2]
+        )
+
+        correct = wrong = fallback = 0
+        timings = []
+        for image, roi, text in samples[1::2]:
+            start_time = time.perf_counter()
+            read, _ = reader.read(image, roi)
+            timings.append((time.perf_counter() - start_time) * 1000)
+            if read is None:
+                fallback += 1
+            elif read == text:
+                correct += 1
+            else:
+                wrong += 1
+                print(f"misread {text!r} as {read!r}")
+
+    total = len(samples[1::2])
+    print(f"bank bootstrapped from {learned}/{len(samples[::2])} samples")
+    print(
+        f"{total} reads: {correct} correct, {wrong} wrong, {fallback} OCR fallbacks "
+        f"({correct / max(total - fallback, 1):.1%} accuracy when confident)"
+    )
+    print(
+        f"latency ms: p50 {percentile(timings, 50):.3f}, "
+        f"p90 {percentile(timings, 90):.3f}, max {max(timings):.3f}"
+    )
+
+
+def bench_prefilter(args):
+    """
+    Calibrate the text prefilter on recorded frames. Every OCR result box of
+    the replay cases must pass the prefilter (a miss is a false negative);
+    windows of the same size elsewhere in the frame, clear of any OCR box,
+    show how often empty regions would be skipped.
+
+    Without --threshold, the lowest text score times --margin is evaluated,
+    the highest threshold without false negatives on these frames. --write
+    stores it in config/text_prefilter.json, which turns the prefilter on.
+    """
+    from utils.prefilter import text_score, TEXT_PREFILTER_CONFIG
+
+    rng = numpy.random.default_rng(0)
+    text_scores, empty_scores = [], []
+    timings = []
+
+    for case in load_cases(Path(args.cases_dir)):
+        for name, image in case["images"].items():
+            boxes = [r["box"] for r in case["frames"].get(name, {}).get("ocr", [])]
+            height, width = image.shape[:2]
+
+            for box in boxes:
+                view, _ = crop_view(image, box)
+                start_time = time.perf_counter()
+                text_scores.append((text_score(view), case["name"], box))
+                timings.append((time.perf_counter() - start_time) * 1e6)
+
+                for _ in range(args.windows):
+                    x = int(rng.integers(0, max(width - box[2], 1)))
+                    y = int(rng.integers(0, max(height - box[3], 1)))
+                    window = [x, y, box[2], box[3]]
+                    if any(_overlaps(window, other) for other in boxes):
+                        continue
+                    view, _ = crop_view(image, window)
+                    empty_scores.append(text_score(view))
+
+    if not text_scores:
+        print("No OCR results in the replay cases")
+        return
+
+    lowest = min(item[0] for item in text_scores)
+    threshold = args.threshold
+    if threshold is None:
+        threshold = round(lowest * args.margin, 4)
+    misses = [item for item in text_scores if item[0] < threshold]
+    for score, case_name, box in misses:
+        print(f"false negative: {case_name} {box} score {score:.4f}")
+
+    skipped = sum(score < threshold for score in empty_scores)
+    false_negative_rate = len(misses) / len(text_scores)
+    skip_rate = skipped / max(len(empty_scores), 1)
+    print(f"threshold {threshold}")
+    print(
+        f"text regions: {len(text_scores)}, false negatives {len(misses)} "
+        f"({false_negative_rate:.1%}), lowest score {lowest:.4f}"
+    )
+    print(f"empty windows: {len(empty_scores)}, skipped {skipped} ({skip_rate:.1%})")
+    print(f"text_score us: p50 {percentile(timings, 50):.1f}, max {max(timings):.1f}")
+
+    if not args.write:
+        return
+    if misses or len(text_scores) < args.min_regions:
+        print(
+            f"Not written: needs no false negative and at least {args.min_regions} "
+            "text regions"
+        )
+        return
+    TEXT_PREFILTER_CONFIG.parent.mkdir(exist_ok=True)
+    with open(TEXT_PREFILTER_CONFIG, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "threshold": threshold,
+                "text_regions": len(text_scores),
+                "false_negative_rate": false_negative_rate,
+                "empty_skip_rate": round(skip_rate, 4),
+            },
+            f,
+            indent=4,
+        )
+    print(f"Wrote {TEXT_PREFILTER_CONFIG}")
+
+
+def bench_screens(args):
+    """
+    Leave-one-out accuracy and latency of the screen classifier over labeled
+    reference frames, `<screens_dir>/<label>/*.png`. A frame labeled as
+    another screen would make a ScreenGate skip a node it should have run,
+    so wrong labels matter far more than unknown ones.
+    """
+    from utils.screen_classifier import ScreenClassifier, fingerprint
+
+    classifier = ScreenClassifier(
+        Path(args.screens_dir), args.max_distance, args.min_margin
+    )
+    labels = classifier.references()
+    if len(set(labels)) < 2:
+        print("Need reference frames of at least two screens")
+        return
+
+    paths = sorted(Path(args.screens_dir).glob("*/*.png"))
+    correct, unknown, wrong = 0, 0, []
+    timings = []
+    for index, path in enumerate(paths):
+        image = load_frame(path)
+        start_time = time.perf_counter()
+        label, distance, margin = classifier.match(fingerprint(image), exclude=index)
+        timings.append((time.perf_counter() - start_time) * 1e6)
+
+        if label is None:
+            unknown += 1
+        elif label == labels[index]:
+            correct += 1
+        else:
+            wrong.append((path, label, distance, margin))
+
+    for path, label, distance, margin in wrong:
+        print(
+            f"wrong: {path} as {label} (distance {distance:.3f}, margin {margin:.3f})"
+        )
+    total = len(paths)
+    print(f"references: {total} of {len(set(labels))} screens")
+    print(
+        f"correct {correct / total:.1%}, unknown {unknown / total:.1%}, "
+        f"wrong {len(wrong) / total:.1%}"
+    )
+    print(f"classify us: p50 {percentile(timings, 50):.1f}, max {max(timings):.1f}")
+
+
+def _overlaps(a, b) -> bool:
+    return (
+        a[0] < b[0] + b[2]
+        and b[0] < a[0] + a[2]
+        and a[1] < b[1] + b[3]
+        and (b[1] < a[1] + a[3])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the agent")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    recognitions = subparsers.add_parser(
+        "recognitions", help="Replay recorded cases through the custom recognitions"
+    )
+    recognitions.add_argument("cases_dir", nargs="?", default="debug/replay")
+    recognitions.add_argument("-n", "--iterations", type=int, default=20)
+    recognitions.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep the recognition cache enabled across iterations",
+    )
+    recognitions.add_argument("-o", "--output", help="Write the reports as JSON")
+    recognitions.set_defaults(func=bench_recognitions)
+
+    startup = subparsers.add_parser(
+        "startup", help="Compare agent startup time with and without venv relaunch"
+    )
+    startup.add_argument("-n", "--iterations", type=int, default=5)
+    startup.add_argument(
+        "--python",
+        default=sys.executable,
+        help="Interpreter that launches the probe (the system Python, not the venv one)",
+    )
+    startup.set_defaults(func=bench_startup)
+
+    logging = subparsers.add_parser(
+        "logging", help="Per-call overhead of eager vs lazy debug logging"
+    )
+    logging.add_argument("-n", "--iterations", type=int, default=20000)
+    logging.set_defaults(func=bench_logging)
+
+    swipe = subparsers.add_parser(
+        "swipe", help="Check swipe displacement estimates against fixtures"
+    )
+    swipe.add_argument("cases_dir", nargs="?", default="debug/replay")
+    swipe.add_argument(
+        "--node",
+        default="Stage_Rift_SwipeToDeepestFloor",
+        help="Also time this node's CalibratedSwipe (empty to skip)",
+    )
+    swipe.add_argument("-n", "--iterations", type=int, default=3)
+    swipe.set_defaults(func=bench_swipe)
+
+    digits = subparsers.add_parser(
+        "digits", help="Accuracy and latency of the glyph digit reader"
+    )
+    digits.add_argument("cases_dir", nargs="?", default="debug/replay")
+    digits.add_argument(
+        "--samples", type=int, default=120, help="Synthetic samples without fixtures"
+    )
+    digits.set_defaults(func=bench_digits)
+
+    prefilter = subparsers.add_parser(
+        "prefilter", help="Calibrate the text prefilter on replay frames"
+    )
+    prefilter.add_argument("cases_dir", nargs="?", default="debug/replay")
+    prefilter.add_argument("--threshold", type=float, help="Evaluate this one")
+    prefilter.add_argument(
+        "--margin",
+        type=float,
+        default=0.5,
+        help="Calibrated threshold as a fraction of the lowest text score",
+    )
+    prefilter.add_argument(
+        "--min-regions",
+        type=int,
+        default=50,
+        help="Text regions needed before --write stores a threshold",
+    )
+    prefilter.add_argument("--write", action="store_true")
+    prefilter.add_argument(
+        "--windows", type=int, default=5, help="Empty windows sampled per text box"
+    )
+    prefilter.set_defaults(func=bench_prefilter)
+
+    screens = subparsers.add_parser(
+        "screens", help="Leave-one-out accuracy of the screen classifier"
+    )
+    screens.add_argument("screens_dir", nargs="?", default="config/screens")
+    screens.add_argument("--max-distance", type=float, default=0.08)
+    screens.add_argument("--min-margin", type=float, default=0.02)
+    screens.set_defaults(func=bench_screens)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
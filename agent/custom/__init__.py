@@ -1,2 +1,23 @@
-from .action import *
-from .reco import *
+from .registry import register_lazy, preload_in_background
+
+# name -> "module:Class" relative to this package, imported on first dispatch
+RECOGNITIONS = {
+    "SelectBounty": "reco.bounty:SelectBounty",
+    "SelectHighestLevelWish": "reco.select_wish:SelectHighestLevelWish",
+    "CheckShopItem": "reco.shop_item:CheckShopItem",
+    "RiftCleared": "reco.rift_cleared:RiftCleared",
+    "AllRiftCleared": "reco.rift_cleared:AllRiftCleared",
+    "ScreenGate": "reco.screen_gate:ScreenGate",
+    "WaitUntilStable": "reco.wait:WaitUntilStable",
+    "WaitForChange": "reco.wait:WaitForChange",
+}
+
+ACTIONS = {
+    "DisableNode": "action.general:DisableNode",
+    "StopAllTasks": "action.general:StopAllTasks",
+    "CalibratedSwipe": "action.swipe:CalibratedSwipe",
+    "WaitUntilStable": "action.wait:WaitUntilStable",
+    "WaitForChange": "action.wait:WaitForChange",
+}
+
+register_lazy(recognitions=RECOGNITIONS, actions=ACTIONS)
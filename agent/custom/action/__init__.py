@@ -1,6 +0,0 @@
-from .general import *
-
-__all__ = [
-    "DisableNode",
-    "StopAllTasks",
-]
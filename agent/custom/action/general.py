@@ -1,11 +1,9 @@
-from maa.agent.agent_server import AgentServer
 from maa.custom_action import CustomAction
 from maa.context import Context
 
 from utils import logger, parse_param
 
 
-@AgentServer.custom_action("DisableNode")
 class DisableNode(CustomAction):
     def run(
         self,
@@ -15,13 +13,12 @@ class DisableNode(CustomAction):
 
         node_name = parse_param(argv.custom_action_param)
 
-        logger.debug(f"[DisableNode] Disabling node: {node_name}")
+        logger.debug("[DisableNode] Disabling node: {}", node_name)
         context.override_pipeline({f"{node_name}": {"enabled": False}})
 
         return CustomAction.RunResult(success=True)
 
 
-@AgentServer.custom_action("StopAllTasks")
 class StopAllTasks(CustomAction):
     def run(
         self,
@@ -0,0 +1,91 @@
+import json
+import time
+
+from maa.custom_action import CustomAction
+from maa.context import Context
+
+from utils import logger
+from utils.calibration import (
+    calibrated_swipe,
+    swipe_calibration,
+    swipe_points_for,
+    SWIPE_END_CONFIRMATIONS,
+    SWIPE_SETTLE_TIMEOUT,
+)
+from utils.screen import is_empty_frame
+
+
+class CalibratedSwipe(CustomAction):
+    """
+    Swipe that moves the view by the swipe's own length, whatever the
+    device's input lag does to it. The swipe is sized with the device's
+    calibration, its real displacement is measured by phase correlation, and
+    a shortfall larger than `tolerance` is made up with another swipe.
+    All swipes and their settling share a budget of `max_wait` ms, so a
+    screen that never settles holds the task no longer than that.
+
+    Param: {"begin": [x, y], "end": [x, y], "duration": 200,
+            "roi": [x, y, w, h], "tolerance": 40, "max_swipes": 3,
+            "max_wait": 3000}
+    """
+
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> CustomAction.RunResult:
+
+        param = json.loads(argv.custom_action_param)
+        begin, end = param["begin"][:2], param["end"][:2]
+        duration = param.get("duration", 200)
+        roi = param.get("roi")
+        tolerance = param.get("tolerance", 40)
+        deadline = time.perf_counter() + param.get("max_wait", 3000) / 1000
+
+        controller = context.tasker.controller
+        device = str(controller.uuid or "default")
+        axis = "x" if abs(end[0] - begin[0]) >= abs(end[1] - begin[1]) else "y"
+        nominal = end[0] - begin[0] if axis == "x" else end[1] - begin[1]
+
+        remaining = nominal
+        frame = controller.cached_image
+        stalls = 0
+        for _ in range(param.get("max_swipes", 3)):
+            budget = deadline - time.perf_counter()
+            if budget <= 0:
+                logger.debug("[CalibratedSwipe] {}: out of time", argv.node_name)
+                break
+
+            length = swipe_calibration.command_for(device, axis, abs(remaining))
+            bounds = None if is_empty_frame(frame) else frame.shape[1::-1]
+            swipe_begin, swipe_end = swipe_points_for(begin, end, length, bounds)
+            measured, frame = calibrated_swipe(
+                controller,
+                swipe_begin,
+                swipe_end,
+                duration,
+                roi,
+                before=frame,
+                settle_timeout=min(SWIPE_SETTLE_TIMEOUT, budget),
+            )
+
+            if measured == 0.0:
+                stalls += 1
+                if stalls >= SWIPE_END_CONFIRMATIONS:
+                    logger.debug("[CalibratedSwipe] {}: end reached", argv.node_name)
+                    break
+                continue
+            stalls = 0
+
+            remaining -= measured
+            if abs(remaining) <= tolerance or remaining * nominal < 0:
+                break
+
+        logger.debug(
+            "[CalibratedSwipe] {}: moved {:.0f} of {} px",
+            argv.node_name,
+            nominal - remaining,
+            nominal,
+        )
+        swipe_calibration.flush()
+        return CustomAction.RunResult(success=True)
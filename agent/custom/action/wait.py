@@ -0,0 +1,97 @@
+import json
+import time
+
+from maa.custom_action import CustomAction
+from maa.context import Context
+
+from utils import logger
+from utils.screen import screencap, wait_for_stable, wait_for_change
+from utils.telemetry import record_wait
+
+
+class WaitUntilStable(CustomAction):
+    """
+    Waits until the screen stops moving instead of sleeping a fixed delay.
+
+    Param: {"max_wait": 3000, "threshold": 1.0, "stable_frames": 2,
+            "replaces": 1000}
+    `replaces` is the fixed delay in ms this wait stands in for, only used by
+    telemetry_report.py to tell how much time was saved.
+    """
+
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> CustomAction.RunResult:
+
+        param = json.loads(argv.custom_action_param or "{}")
+        max_wait = param.get("max_wait", 3000) / 1000
+
+        start_time = time.perf_counter()
+        frame = wait_for_stable(
+            context.tasker.controller,
+            timeout=max_wait,
+            threshold=param.get("threshold", 1.0),
+            stable_frames=param.get("stable_frames", 2),
+        )
+        waited = time.perf_counter() - start_time
+        settled = frame is not None and waited < max_wait
+
+        logger.debug(
+            "[WaitUntilStable] {}: waited {:.0f} ms", argv.node_name, waited * 1000
+        )
+        record_wait(argv, "stable", waited, param.get("replaces"), settled)
+        return CustomAction.RunResult(success=True)
+
+
+class WaitForChange(CustomAction):
+    """
+    Clicks the recognized box (with "click": true) and waits until the
+    screen changes and settles again, instead of a Click with a fixed
+    post_delay. Returns as soon as the next screen stops moving.
+    "target_offset" shifts the clicked box like the Click action's.
+
+    Param: {"click": true, "target_offset": [0, 0, 0, 0], "max_wait": 5000,
+            "threshold": 3.0, "settle": true, "replaces": 5000}
+    """
+
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> CustomAction.RunResult:
+
+        param = json.loads(argv.custom_action_param or "{}")
+        max_wait = param.get("max_wait", 5000) / 1000
+        controller = context.tasker.controller
+
+        start_time = time.perf_counter()
+        reference = screencap(controller)
+        if param.get("click", False):
+            offset = param.get("target_offset", [0, 0, 0, 0])
+            x, y, w, h = [v + d for v, d in zip(argv.box, offset)]
+            controller.post_click(x + w // 2, y + h // 2).wait()
+
+        frame = None
+        if reference is not None:
+            frame = wait_for_change(
+                controller,
+                reference,
+                timeout=max_wait,
+                threshold=param.get("threshold", 3.0),
+            )
+        if frame is not None and param.get("settle", True):
+            remaining = max_wait - (time.perf_counter() - start_time)
+            wait_for_stable(controller, timeout=max(remaining, 0))
+        waited = time.perf_counter() - start_time
+        settled = frame is not None and waited < max_wait
+
+        logger.debug(
+            "[WaitForChange] {}: {} after {:.0f} ms",
+            argv.node_name,
+            "changed" if frame is not None else "no change",
+            waited * 1000,
+        )
+        record_wait(argv, "change", waited, param.get("replaces"), settled)
+        return CustomAction.RunResult(success=True)
@@ -1,12 +0,0 @@
-from .bounty import *
-from .select_wish import *
-from .shop_item import *
-from .rift_cleared import *
-
-__all__ = [
-    "SelectBounty",
-    "SelectHighestLevelWish",
-    "CheckShopItem",
-    "RiftCleared",
-    "AllRiftCleared",
-]
@@ -1,12 +1,20 @@
 from enum import Enum
 from typing import List
-from maa.agent.agent_server import AgentServer
 from maa.custom_recognition import CustomRecognition
 from maa.context import Context
 import time
 
-import numpy
-from utils import logger, parse_param
+from utils import logger, is_enabled, parse_param
+from utils.calibration import (
+    calibrated_swipe,
+    swipe_calibration,
+    SWIPE_END_CONFIRMATIONS,
+    swipe_points_for,
+)
+from utils.keywords import KeywordIndex
+from utils.reco_cache import run_recognition_in_roi
+from utils.screen import wait_for_change, wait_for_stable
+from utils.template import MultiTemplateMatcher
 
 
 class Floor(Enum):
@@ -16,6 +24,18 @@ class Floor(Enum):
     IV = "iv"
 
 
+BOUNTY_FLOOR_ROI = [0, 185, 214, 483]
+BOUNTY_CAROUSEL_ROI = [0, 0, 0, 0]  # whole frame
+FLOOR_MATCH_THRESHOLD = 0.7  # same as the TemplateMatch default
+
+
+def _floor_template(floor: Floor) -> str:
+    return "stage/bounty-floor-" + floor.value + ".png"
+
+
+floor_matcher = MultiTemplateMatcher([_floor_template(floor) for floor in Floor])
+
+
 class BossInfo:
     def __init__(self, floors: List[Floor], recognition: List[str]):
         self.floors = floors
@@ -54,8 +74,188 @@ bounty_map = {
     ),
 }
 
+boss_index = KeywordIndex(
+    {name: bounty_info.recognition for name, bounty_info in bounty_map.items()}
+)
+
+
+def locate_bosses(context: Context, node_name: str, image) -> dict:
+    """
+    OCR the carousel frame once, unfiltered, and return the OCR result of
+    every visible boss by name. The OCR goes through the recognition cache,
+    so other bounty selections on the same frame reuse it.
+    """
+    carousel_detail = run_recognition_in_roi(
+        context,
+        node_name + "_Carousel",
+        image,
+        BOUNTY_CAROUSEL_ROI,
+        {
+            "type": "OCR",
+            "param": {},
+        },
+        prefilter=False,
+    )
+
+    if carousel_detail is None:
+        return {}
+
+    bosses = boss_index.locate(carousel_detail.all_results)
+    if is_enabled("DEBUG"):
+        logger.debug("[SelectBounty] Visible bosses: {}", list(bosses))
+    return bosses
+
+
+# Swiping one card forward/backward through the boss carousel
+SWIPE_FORWARD = ((1100, 400), (350, 400))
+SWIPE_BACKWARD = ((350, 400), (1100, 400))
+SWIPE_DURATION = 1000
+# Longest swipe along the carousel, for jumps to a card seen before
+MAX_SWIPE_LENGTH = 1000
+CAROUSEL_CENTER_X = 640
+
+# Per floor, for the session: boss name -> x of its card in carousel
+# coordinates (the screen x plus how far the carousel has been scrolled since
+# the first scan), plus the scroll positions of both carousel ends once
+# reached (keys 1 and -1)
+carousel_indexes = {}
+
+
+def _center_x(box) -> float:
+    return box[0] + box[2] / 2
+
+
+class CarouselNavigator:
+    """
+    Walks the bounty carousel of one floor with the fewest swipes, using and
+    filling the session index of that floor.
+
+    Every swipe is measured by phase correlation (see calibrated_swipe), so
+    the scroll position stays exact even when the emulator over- or
+    undershoots. The position is recovered from the visible bosses, a boss
+    seen before is brought to the center with swipes sized by the device's
+    swipe calibration, and a swipe that does not move the view marks an end.
+    """
+
+    def __init__(self, context: Context, node_name: str, index: dict):
+        self.context = context
+        self.controller = context.tasker.controller
+        self.node_name = node_name
+        self.index = index
+        self.cards = index.setdefault("cards", {})
+        self.ends = index.setdefault("ends", {})
+        self.position = None
+        # swipes in a row that did not move the view, per direction
+        self.stalls = {}
+
+    def _observe(self, image) -> dict:
+        bosses = locate_bosses(self.context, self.node_name, image)
+
+        known = [
+            self.cards[name] - _center_x(result.box)
+            for name, result in bosses.items()
+            if name in self.cards
+        ]
+        if self.position is None:
+            if known:
+                self.position = sorted(known)[len(known) // 2]
+            else:
+                # nothing recognizable from the index, start a fresh one here
+                self.cards.clear()
+                self.ends.clear()
+                self.position = 0.0
+
+        for name, result in bosses.items():
+            self.cards.setdefault(name, self.position + _center_x(result.box))
+        return bosses
+
+    def _next_swipe(self, target: str):
+        """(direction, scroll distance or None for one card), None if not there"""
+        card = self.cards.get(target)
+        if card is not None:
+            distance = card - CAROUSEL_CENTER_X - self.position
+            if abs(distance) > 1:
+                return (1 if distance > 0 else -1), abs(distance)
+        for direction in (1, -1):
+            if self.ends.get(direction) is None:
+                return direction, None
+        return None
+
+    def _swipe(self, direction: int, distance, image, timeout: float):
+        begin, end = SWIPE_FORWARD if direction > 0 else SWIPE_BACKWARD
+        if distance is not None:
+            device = str(getattr(self.controller, "uuid", "") or "default")
+            length = min(
+                swipe_calibration.command_for(device, "x", distance), MAX_SWIPE_LENGTH
+            )
+            begin, end = swipe_points_for(
+                begin, end, length, (image.shape[1], image.shape[0])
+            )
+
+        measured, settled = calibrated_swipe(
+            self.controller,
+            begin,
+            end,
+            SWIPE_DURATION,
+            before=image,
+            settle_timeout=timeout,
+        )
+
+        if settled is not None and measured == 0.0:
+            self.stalls[direction] = self.stalls.get(direction, 0) + 1
+            if self.stalls[direction] >= SWIPE_END_CONFIRMATIONS:
+                logger.debug(
+                    "[SelectBounty] Carousel end reached at {:.0f}", self.position
+                )
+                self.ends[direction] = self.position
+            else:
+                logger.debug("[SelectBounty] Swipe did not move, swiping again")
+        else:
+            self.stalls[direction] = 0
+            # the content moves against the finger, the scroll position with it
+            self.position -= measured
+        return settled
+
+    def find(self, target: str, timeout: float):
+        """Return the OCR result of `target` once it is on screen, or None"""
+        start_time = time.time()
+        image = None
+
+        while time.time() - start_time < timeout:
+            remaining = max(0.0, timeout - (time.time() - start_time))
+            if image is None:
+                # wait for the floor click / swipe animation to end before OCR
+                image = wait_for_stable(self.controller, timeout=remaining)
+                if image is None:
+                    logger.debug("[SelectBounty] Screencap failed, retrying...")
+                    continue
+
+            bosses = self._observe(image)
+            if target in bosses:
+                return bosses[target]
+
+            swipe = self._next_swipe(target)
+            if swipe is None:
+                logger.debug(
+                    "[SelectBounty] {} is not in the carousel ({} bosses indexed)",
+                    target,
+                    len(self.cards),
+                )
+                return None
+
+            direction, distance = swipe
+            logger.debug(
+                "[SelectBounty] Boss not found at {:.0f}, swiping {} {}",
+                self.position,
+                "forward" if direction > 0 else "backward",
+                "one card" if distance is None else f"{distance:.0f} px",
+            )
+            image = self._swipe(direction, distance, image, remaining)
+
+        logger.debug("[SelectBounty] Bounty not found after timeout")
+        return None
+
 
-@AgentServer.custom_recognition("SelectBounty")
 class SelectBounty(CustomRecognition):
     def analyze(
         self,
@@ -64,92 +264,98 @@ class SelectBounty(CustomRecognition):
     ) -> CustomRecognition.AnalyzeResult:
 
         bounty_name = parse_param(argv.custom_recognition_param)
-        logger.debug(f"[SelectBounty] Received bounty_name: {bounty_name}")
+        logger.debug("[SelectBounty] Received bounty_name: {}", bounty_name)
 
         node_name = argv.node_name + "_" + bounty_name
-        logger.debug(f"[SelectBounty] node_name: {node_name}")
+        logger.debug("[SelectBounty] node_name: {}", node_name)
         bounty_info = bounty_map[bounty_name]
         logger.debug(
-            f"[SelectBounty] bounty_info: floors={bounty_info.floors}, recognition={bounty_info.recognition}"
+            "[SelectBounty] bounty_info: floors={}, recognition={}",
+            bounty_info.floors,
+            bounty_info.recognition,
         )
 
         # select the higest floor available, if none is available, select the lowest floor
-        highest_floor = None
-        for floor in bounty_info.floors:
-            floor_node_name = node_name + "_" + floor.value
-            floor_detail = context.run_recognition(
-                floor_node_name,
-                argv.image,
-                pipeline_override={
-                    floor_node_name: {
-                        "recognition": {
-                            "type": "TemplateMatch",
-                            "param": {
-                                "roi": [0, 185, 214, 483],
-                                "template": [
-                                    "stage/bounty-floor-" + floor.value + ".png"
-                                ],
-                                "order_by": "Score",
-                            },
-                        },
-                    }
-                },
-            )
-
-            if floor_detail is None or floor_detail.box is None:
-                continue
-
-            highest_floor = floor_detail
+        highest_floor, highest_floor_box = self._find_highest_floor(
+            context, argv, node_name, bounty_info
+        )
 
-        if highest_floor is None:
+        if highest_floor_box is None:
             logger.debug("[SelectBounty] No floor found")
             return CustomRecognition.AnalyzeResult(box=None, detail="No floor found")
 
-        logger.debug(f"[SelectBounty] Floor found at: {highest_floor.box}")
-        click_floor_job = context.tasker.controller.post_click(
-            highest_floor.box.x, highest_floor.box.y
+        logger.debug("[SelectBounty] Floor found at: {}", highest_floor_box)
+        controller = context.tasker.controller
+        click_floor_job = controller.post_click(
+            highest_floor_box[0], highest_floor_box[1]
         )
         click_floor_job.wait()
         logger.debug("[SelectBounty] Clicked floor, waiting for boss selection...")
 
-        # select boss
-        start_time = time.time()
-        timeout = 10  # seconds
+        # make sure the boss list has started to show up before waiting for it to settle
+        wait_for_change(controller, argv.image, timeout=1.0)
 
-        boss_detail = None
+        # select boss, jumping to its card if an earlier selection has seen it
+        navigator = CarouselNavigator(
+            context, node_name, carousel_indexes.setdefault(highest_floor, {})
+        )
+        boss_result = navigator.find(bounty_name, timeout=10)
+        swipe_calibration.flush()
 
-        while time.time() - start_time < timeout:
-            time.sleep(1)
-            screencap_job = context.tasker.controller.post_screencap()
-            screencap_job.wait()
-            image = screencap_job.get()
+        if boss_result is None:
+            logger.debug("[SelectBounty] Bounty not found")
+            return CustomRecognition.AnalyzeResult(box=None, detail="Bounty not found")
+
+        logger.debug("[SelectBounty] Boss found at: {}", boss_result.box)
+        return CustomRecognition.AnalyzeResult(
+            box=boss_result.box, detail="Boss selected"
+        )
+
+    def _find_highest_floor(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+        node_name: str,
+        bounty_info: BossInfo,
+    ):
+        """
+        Match every floor template in one pass and return the highest available
+        floor and its box, (None, None) if there is none. Falls back to one TemplateMatch per floor when the
+        templates cannot be loaded from the resource directory.
+        """
+        try:
+            matches = floor_matcher.match(argv.image, BOUNTY_FLOOR_ROI)
+        except FileNotFoundError as e:
+            logger.debug("[SelectBounty] {}, falling back to TemplateMatch", e)
+            matches = None
 
-            if image is None or numpy.array(image).size == 0:
-                logger.debug("[SelectBounty] Screencap failed, retrying...")
+        highest_floor, highest_floor_box = None, None
+        for floor in bounty_info.floors:
+            if matches is not None:
+                match = matches.get(_floor_template(floor))
+                if match is None or match.score < FLOOR_MATCH_THRESHOLD:
+                    continue
+                highest_floor, highest_floor_box = floor, match.box
                 continue
 
-            boss_detail = context.run_recognition(
-                node_name,
-                image,
-                pipeline_override={
-                    node_name: {
-                        "recognition": {
-                            "type": "OCR",
-                            "param": {"expected": bounty_info.recognition},
-                        },
-                    }
+            floor_node_name = node_name + "_" + floor.value
+            floor_detail = run_recognition_in_roi(
+                context,
+                floor_node_name,
+                argv.image,
+                BOUNTY_FLOOR_ROI,
+                {
+                    "type": "TemplateMatch",
+                    "param": {
+                        "template": [_floor_template(floor)],
+                        "order_by": "Score",
+                    },
                 },
             )
 
-            if boss_detail is not None and boss_detail.box is not None:
-                logger.debug(f"[SelectBounty] Boss found at: {boss_detail.box}")
-                return CustomRecognition.AnalyzeResult(
-                    box=boss_detail.box, detail="Boss selected"
-                )
+            if floor_detail is None or floor_detail.box is None:
+                continue
 
-            logger.debug("[SelectBounty] Boss not found, swiping to next...")
-            swipe_job = context.tasker.controller.post_swipe(1100, 400, 350, 400, 1000)
-            swipe_job.wait()
+            highest_floor, highest_floor_box = floor, list(floor_detail.box)
 
-        logger.debug("[SelectBounty] Bounty not found after timeout")
-        return CustomRecognition.AnalyzeResult(box=None, detail="Bounty not found")
+        return highest_floor, highest_floor_box
@@ -1,12 +1,53 @@
 import re
-from maa.agent.agent_server import AgentServer
-from maa.custom_recognition import CustomRecognition
+from typing import List
+from maa.custom_recognition import CustomRecognition, RecognitionResult
 from maa.context import Context
 
-from utils import logger, parse_rift_floor_number
+from utils import logger, parse_rift_floor_number, box_center_in, roi_contains
+from utils.reco_cache import run_recognition_in_roi
+
+# Pipeline node with the unfiltered OCR over every rift card on the Weekly
+# Rifts screen
+RIFT_CARDS_NODE = "Stage_Rift_Cards"
+
+
+def _sweep_rift_cards(
+    context: Context, image, roi: List[int] = None
+) -> List[RecognitionResult]:
+    """
+    Run the OCR of RIFT_CARDS_NODE and return the results inside `roi`, all of
+    them without one. The sweep goes through the recognition cache with the
+    node's parameters, so RiftCleared and AllRiftCleared share it on the same
+    frame; a `roi` reaching outside the node's roi is swept on its own.
+    """
+    node = context.get_node_data(RIFT_CARDS_NODE)
+    if not node:
+        logger.error("[RiftCleared] Pipeline node {} not found", RIFT_CARDS_NODE)
+        return []
+
+    recognition = node["recognition"]
+    cards_roi = recognition["param"]["roi"]
+    if roi is None or roi[2] <= 0 or roi[3] <= 0:
+        roi = cards_roi
+
+    sweep_roi = cards_roi if roi_contains(cards_roi, roi) else roi
+    sweep_detail = run_recognition_in_roi(
+        context,
+        RIFT_CARDS_NODE,
+        image,
+        sweep_roi,
+        recognition,
+        prefilter=False,
+    )
+
+    if sweep_detail is None:
+        return []
+
+    return [
+        result for result in sweep_detail.all_results if box_center_in(result.box, roi)
+    ]
 
 
-@AgentServer.custom_recognition("RiftCleared")
 class RiftCleared(CustomRecognition):
     """
     Custom recognition that checks if a rift is cleared by comparing
@@ -23,71 +64,50 @@ class RiftCleared(CustomRecognition):
         node_name = argv.node_name
         roi = [argv.roi[0], argv.roi[1], argv.roi[2], argv.roi[3]]
 
-        best_floor_node = node_name + "_BestFloor"
-        best_floor_detail = context.run_recognition(
-            best_floor_node,
-            argv.image,
-            pipeline_override={
-                best_floor_node: {
-                    "recognition": {
-                        "type": "OCR",
-                        "param": {
-                            "expected": ["Floor"],
-                            "roi": roi,
-                        },
-                    }
-                }
-            },
-        )
+        results = _sweep_rift_cards(context, argv.image, roi)
 
-        if best_floor_detail is None or best_floor_detail.best_result is None:
-            logger.debug(f"[{node_name}] Best floor not found.")
+        best_floor_results = [
+            result for result in results if re.search("Floor", result.text)
+        ]
+
+        if not best_floor_results:
+            logger.debug("[{}] Best floor not found.", node_name)
             return CustomRecognition.AnalyzeResult(
                 box=None, detail="Best floor not found"
             )
 
-        best_floor_text = best_floor_detail.best_result.text
+        best_floor_result = best_floor_results[0]
+        best_floor_text = best_floor_result.text
         best_floor_number = self._parse_floor_number(best_floor_text)
 
         if best_floor_number is None:
             logger.debug(
-                f"[{node_name}] Could not parse best floor number from: {best_floor_text}"
+                "[{}] Could not parse best floor number from: {}",
+                node_name,
+                best_floor_text,
             )
             return CustomRecognition.AnalyzeResult(
                 box=None, detail="Could not parse best floor number"
             )
 
-        claimed_floor_node = node_name + "_ClaimedFloor"
-        claimed_floor_detail = context.run_recognition(
-            claimed_floor_node,
-            argv.image,
-            pipeline_override={
-                claimed_floor_node: {
-                    "recognition": {
-                        "type": "OCR",
-                        "param": {
-                            "expected": ["Claimed"],
-                            "roi": roi,
-                        },
-                    }
-                }
-            },
-        )
+        claimed_floor_results = [
+            result for result in results if re.search("Claimed", result.text)
+        ]
 
-        if claimed_floor_detail is None or claimed_floor_detail.best_result is None:
-            logger.debug(f"[{node_name}] No claimed floor found")
+        if not claimed_floor_results:
+            logger.debug("[{}] No claimed floor found", node_name)
             return CustomRecognition.AnalyzeResult(
-                box=best_floor_detail.box, detail="Rift not cleared"
+                box=best_floor_result.box, detail="Rift not cleared"
             )
 
-        claimed_floor_number = parse_rift_floor_number(
-            claimed_floor_detail.best_result.text
-        )
+        claimed_floor_text = claimed_floor_results[0].text
+        claimed_floor_number = parse_rift_floor_number(claimed_floor_text)
 
         if claimed_floor_number is None:
             logger.debug(
-                f"[{node_name}] "
-                f"Could not parse claimed floor number from: {claimed_floor_text}"
+                "[{}] Could not parse claimed floor number from: {}",
+                node_name,
+                claimed_floor_text,
             )
             return CustomRecognition.AnalyzeResult(
                 box=None, detail="Could not parse claimed floor number"
@@ -95,14 +115,17 @@ class RiftCleared(CustomRecognition):
 
         if claimed_floor_number < best_floor_number:
             logger.debug(
-                f"[{node_name}] Rift not cleared - Claimed {claimed_floor_number}F < Best {best_floor_number}F"
+                "[{}] Rift not cleared - Claimed {}F < Best {}F",
+                node_name,
+                claimed_floor_number,
+                best_floor_number,
             )
             return CustomRecognition.AnalyzeResult(
-                box=best_floor_detail.box,
+                box=best_floor_result.box,
                 detail="Rift not cleared - has unclaimed rewards",
             )
 
-        logger.debug(f"[{node_name}] Rift is cleared")
+        logger.debug("[{}] Rift is cleared", node_name)
         return CustomRecognition.AnalyzeResult(box=None, detail="Rift is cleared")
 
     def _parse_floor_number(self, text: str) -> int:
@@ -123,7 +146,6 @@ class RiftCleared(CustomRecognition):
         return None
 
 
-@AgentServer.custom_recognition("AllRiftCleared")
 class AllRiftCleared(CustomRecognition):
     def analyze(
         self,
@@ -132,31 +154,19 @@ class AllRiftCleared(CustomRecognition):
     ) -> CustomRecognition.AnalyzeResult:
 
         node_name = argv.node_name + "_ClaimedFloor"
-        roi = [argv.roi[0], argv.roi[1], argv.roi[2], argv.roi[3]]
 
-        detail = context.run_recognition(
-            node_name,
-            argv.image,
-            pipeline_override={
-                node_name: {
-                    "recognition": {
-                        "type": "OCR",
-                        "param": {
-                            "expected": ["Claimed"],
-                            "roi": roi,
-                        },
-                    }
-                }
-            },
-        )
+        results = _sweep_rift_cards(context, argv.image)
+        claimed_results = [
+            result for result in results if re.search("Claimed", result.text)
+        ]
 
-        if detail is None or len(detail.filterd_results) < 5:
-            logger.debug(f"[{node_name}] All rifts are not cleared.")
+        if len(claimed_results) < 5:
+            logger.debug("[{}] All rifts are not cleared.", node_name)
             return CustomRecognition.AnalyzeResult(
                 box=None, detail="All rifts are not cleared"
             )
 
-        logger.debug(f"[{node_name}] All rifts are cleared")
+        logger.debug("[{}] All rifts are cleared", node_name)
         return CustomRecognition.AnalyzeResult(
-            box=detail.box, detail="All rifts are cleared"
+            box=claimed_results[0].box, detail="All rifts are cleared"
         )
@@ -0,0 +1,64 @@
+import json
+
+from maa.custom_recognition import CustomRecognition
+from maa.context import Context
+
+from utils import logger
+from utils.reco_cache import run_recognition_in_roi
+from utils.screen_classifier import screen_classifier
+
+
+class ScreenGate(CustomRecognition):
+    """
+    Wraps a node's recognition with a screen check: when the frame is
+    confidently classified as a screen not in `screens`, the node fails at
+    once instead of running its OCR. Unknown screens (or no reference set)
+    always run the wrapped recognition. No pipeline node uses it until
+    reference screens ship under config/screens.
+
+    Param: {"screens": ["battle"], "recognition": {"type": "OCR", "param": {...}}}
+    """
+
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> CustomRecognition.AnalyzeResult:
+
+        try:
+            param = json.loads(argv.custom_recognition_param)
+            screens = param["screens"]
+            recognition = param["recognition"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(
+                "[ScreenGate] {}: invalid param {!r}: {}",
+                argv.node_name,
+                argv.custom_recognition_param,
+                e,
+            )
+            return CustomRecognition.AnalyzeResult(box=None, detail="Invalid param")
+
+        label, distance, margin = screen_classifier.classify(argv.image)
+        if label is not None and label not in screens:
+            logger.debug(
+                "[ScreenGate] {}: screen is {} (distance {:.3f}, margin {:.3f}), skipping",
+                argv.node_name,
+                label,
+                distance,
+                margin,
+            )
+            return CustomRecognition.AnalyzeResult(
+                box=None, detail=f"Screen is {label}"
+            )
+
+        roi = recognition.get("param", {}).get("roi", [0, 0, 0, 0])
+        detail = run_recognition_in_roi(
+            context, argv.node_name + "_Gated", argv.image, roi, recognition
+        )
+
+        if detail is None or detail.box is None:
+            return CustomRecognition.AnalyzeResult(box=None, detail="Not recognized")
+
+        return CustomRecognition.AnalyzeResult(
+            box=detail.box, detail=f"Recognized on screen {label or 'unknown'}"
+        )
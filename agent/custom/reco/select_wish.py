@@ -1,11 +1,17 @@
+import re
 from typing import List
-from maa.agent.agent_server import AgentServer
 from maa.custom_recognition import CustomRecognition, RecognitionResult
 from maa.context import Context
-from utils import logger, parse_param
+from utils import logger, parse_param, box_center_in
+from utils.digits import read_field
+from utils.reco_cache import run_recognition_in_roi
+
+WISH_GRID_ROI = [141, 90, 1101, 598]
+TICKET_ROI = [1131, 116, 67, 41]
+# One glyph bank field for every ticket number, the counter is the same text
+TICKET_FIELD = "SelectHighestLevelWish_Ticket"
 
 
-@AgentServer.custom_recognition("SelectHighestLevelWish")
 class SelectHighestLevelWish(CustomRecognition):
     """
     Custom recognition that finds the highest level wish for a given type.
@@ -20,7 +26,7 @@ class SelectHighestLevelWish(CustomRecognition):
 
         # e.g. wish_type = "Credit/1", "Vanguard/2"
         wish_type = parse_param(argv.custom_recognition_param)
-        logger.debug(f"[SelectHighestLevelWish] Received wish_type: {wish_type}")
+        logger.debug("[SelectHighestLevelWish] Received wish_type: {}", wish_type)
 
         if not wish_type:
             logger.debug("[SelectHighestLevelWish] No wish type specified")
@@ -41,179 +47,148 @@ class SelectHighestLevelWish(CustomRecognition):
 
         new_context = context.clone()
 
-        # First, find the ticket number on the page
-        ticket_node = argv.node_name + "_" + ticket_number
-        ticket_detail = new_context.run_recognition(
-            ticket_node,
-            argv.image,
-            pipeline_override={
-                ticket_node: {
-                    "recognition": {
-                        "type": "OCR",
-                        "param": {
-                            "expected": [ticket_ocr_number],
-                            "roi": [1131, 116, 67, 41],
-                        },
-                    }
-                }
-            },
-        )
+        # First, read the ticket counter ("3/3") on the page
+        ticket_text = read_field(new_context, TICKET_FIELD, argv.image, TICKET_ROI)
 
-        if ticket_detail is None or ticket_detail.best_result is None:
+        if not re.search(ticket_ocr_number, ticket_text):
             logger.debug(
-                f"[SelectHighestLevelWish] Ticket number '{ticket_number}' already used up"
+                "[SelectHighestLevelWish] Ticket number '{}' already used up",
+                ticket_number,
             )
             context.override_pipeline({f"{argv.node_name}": {"enabled": False}})
             return CustomRecognition.AnalyzeResult(
                 box=None, detail=f"Ticket number '{ticket_number}' already used up"
             )
 
-        # Then, find all stage types on the page
-        wishes_node = argv.node_name + "_" + wish_type
-        wishes_detail = new_context.run_recognition(
-            wishes_node,
+        # Then, OCR the whole wish grid once; levels and badges are matched by geometry
+        grid_node = argv.node_name + "_Grid"
+        grid_detail = run_recognition_in_roi(
+            new_context,
+            grid_node,
             argv.image,
-            pipeline_override={
-                wishes_node: {
-                    "recognition": {
-                        "type": "OCR",
-                        "param": {
-                            "expected": [wish_type],
-                            "roi": [141, 90, 1101, 598],
-                        },
-                    }
-                }
+            WISH_GRID_ROI,
+            {
+                "type": "OCR",
+                "param": {},
             },
+            prefilter=False,
         )
 
-        if wishes_detail is None or len(wishes_detail.filterd_results) == 0:
+        grid_results = [] if grid_detail is None else grid_detail.all_results
+        wishes_recognitions = [
+            result for result in grid_results if re.search(wish_type, result.text)
+        ]
+
+        if len(wishes_recognitions) == 0:
             logger.debug(
-                f"[SelectHighestLevelWish] Wish type '{wish_type}' not found on page"
+                "[SelectHighestLevelWish] Wish type '{}' not found on page", wish_type
             )
             return CustomRecognition.AnalyzeResult(
                 box=None, detail=f"Wish type '{wish_type}' not found"
             )
 
         logger.debug(
-            f"[SelectHighestLevelWish] Found {len(wishes_detail.filterd_results)} wishes for type '{wish_type}'"
+            "[SelectHighestLevelWish] Found {} wishes for type '{}'",
+            len(wishes_recognitions),
+            wish_type,
         )
 
         # Find the highest level dungeon for this stage type
-        return self._find_highest_level_dungeon(
-            new_context, argv, wishes_detail.filterd_results
-        )
+        return self._find_highest_level_dungeon(wishes_recognitions, grid_results)
 
     def _find_highest_level_dungeon(
         self,
-        context: Context,
-        argv: CustomRecognition.AnalyzeArg,
         wishes_recognitions: List[RecognitionResult],
+        grid_results: List[RecognitionResult],
     ) -> CustomRecognition.AnalyzeResult:
         """
         Find the highest level available dungeon for the given stage type.
+        Level labels and "Fulfilled" badges are taken from the grid OCR results
+        by their position relative to each wish card, so no extra OCR is run.
         """
         known_highest_level = -1
         known_highest_level_box = None
 
+        level_results = [
+            result for result in grid_results if re.search(r"^.+[0-9]+$", result.text)
+        ]
+        fulfilled_results = [
+            result
+            for result in grid_results
+            if re.search(r"Wish|Fulfilled|filled", result.text)
+        ]
+
         logger.debug(
-            f"[SelectHighestLevelWish] Checking {len(wishes_recognitions)} wish recognitions for highest level"
+            "[SelectHighestLevelWish] Checking {} wish recognitions for highest level",
+            len(wishes_recognitions),
         )
         for i, recognition in enumerate(wishes_recognitions):
-            logger.debug(
-                f"[SelectHighestLevelWish] Checking recognition {i}: {recognition}"
-            )
             if recognition.box is None or len(recognition.box) != 4:
                 logger.debug(
-                    f"[SelectHighestLevelWish] Recognition {i} has invalid box: {recognition.box}"
+                    "[SelectHighestLevelWish] Recognition {} has invalid box: {}",
+                    i,
+                    recognition.box,
                 )
                 continue
 
-            wish_node = argv.node_name + "_Level_" + str(i)
-            logger.debug(
-                f"[SelectHighestLevelWish] wish_node: {wish_node}, box: {recognition.box}"
-            )
-            wish_detail = context.run_recognition(
-                wish_node,
-                argv.image,
-                pipeline_override={
-                    wish_node: {
-                        "recognition": {
-                            "type": "OCR",
-                            "param": {
-                                "expected": ["^.+[0-9]+$"],
-                                "roi": [
-                                    recognition.box[0],
-                                    recognition.box[1] - 30,
-                                    recognition.box[2] + 10,
-                                    recognition.box[3] + 40,
-                                ],
-                            },
-                        },
-                    },
-                },
-            )
+            box = recognition.box
+            level_roi = [box[0], box[1] - 30, box[2] + 10, box[3] + 40]
+            level_candidates = [
+                result
+                for result in level_results
+                if box_center_in(result.box, level_roi)
+            ]
 
-            if wish_detail is None or wish_detail.best_result is None:
+            if not level_candidates:
                 logger.debug(
-                    f"[SelectHighestLevelWish] wish_detail is None or has no best_result for node {wish_node}"
+                    "[SelectHighestLevelWish] No level label found for recognition {} at {}",
+                    i,
+                    box,
                 )
                 continue
 
+            level_result = max(level_candidates, key=lambda result: result.score)
+
             # Level is in the format of "Lv.55"
-            wish_level_str = wish_detail.best_result.text
-            logger.debug(f"[SelectHighestLevelWish] wish_level_str: {wish_level_str}")
+            wish_level_str = level_result.text
+            logger.debug("[SelectHighestLevelWish] wish_level_str: {}", wish_level_str)
             try:
                 wish_level = int(wish_level_str.split(".")[1])
             except Exception as e:
                 logger.debug(
-                    f"[SelectHighestLevelWish] Failed to parse wish level from '{wish_level_str}': {e}"
+                    "[SelectHighestLevelWish] Failed to parse wish level from '{}': {}",
+                    wish_level_str,
+                    e,
                 )
                 continue
 
-            logger.debug(f"[SelectHighestLevelWish] Parsed wish_level: {wish_level}")
+            logger.debug("[SelectHighestLevelWish] Parsed wish_level: {}", wish_level)
 
             if wish_level < known_highest_level:
                 logger.debug(
-                    f"[SelectHighestLevelWish] wish_level {wish_level} < known_highest_level {known_highest_level}, skipping"
+                    "[SelectHighestLevelWish] wish_level {} < known_highest_level {}, skipping",
+                    wish_level,
+                    known_highest_level,
                 )
                 continue
 
-            fulfilled_node = wish_node + "_Fulfilled"
-            logger.debug(
-                f"[SelectHighestLevelWish] Checking if wish is fulfilled at node: {fulfilled_node}"
-            )
-            fulfilled_detail = context.run_recognition(
-                fulfilled_node,
-                argv.image,
-                pipeline_override={
-                    fulfilled_node: {
-                        "recognition": {
-                            "type": "OCR",
-                            "param": {
-                                "expected": ["Wish", "Fulfilled", "filled"],
-                                "roi": [
-                                    recognition.box[0] + 60,
-                                    recognition.box[1] - 30,
-                                    recognition.box[2] + 60,
-                                    recognition.box[3] + 30,
-                                ],
-                            },
-                        },
-                    },
-                },
-            )
-
-            if fulfilled_detail is not None:
+            fulfilled_roi = [box[0] + 60, box[1] - 30, box[2] + 60, box[3] + 30]
+            if any(
+                box_center_in(result.box, fulfilled_roi) for result in fulfilled_results
+            ):
                 logger.debug(
-                    f"[SelectHighestLevelWish] Wish at node {fulfilled_node} is already fulfilled, skipping"
+                    "[SelectHighestLevelWish] Wish at recognition {} is already fulfilled, skipping",
+                    i,
                 )
                 continue
 
             logger.debug(
-                f"[SelectHighestLevelWish] New highest level found: {wish_level} at box {wish_detail.best_result.box}"
+                "[SelectHighestLevelWish] New highest level found: {} at box {}",
+                wish_level,
+                level_result.box,
             )
             known_highest_level = wish_level
-            known_highest_level_box = wish_detail.best_result.box
+            known_highest_level_box = level_result.box
 
         if known_highest_level == -1:
             logger.debug(
@@ -225,7 +200,9 @@ class SelectHighestLevelWish(CustomRecognition):
             )
 
         logger.debug(
-            f"[SelectHighestLevelWish] Highest level dungeon found: {known_highest_level} at box {known_highest_level_box}"
+            "[SelectHighestLevelWish] Highest level dungeon found: {} at box {}",
+            known_highest_level,
+            known_highest_level_box,
         )
         return CustomRecognition.AnalyzeResult(
             box=known_highest_level_box,
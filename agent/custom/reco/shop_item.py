@@ -1,12 +1,83 @@
-from maa.agent.agent_server import AgentServer
-from maa.custom_recognition import CustomRecognition
+import re
+from typing import List
+from maa.custom_recognition import CustomRecognition, RecognitionResult
 from maa.context import Context
 
 
-from utils import logger, parse_param
+from utils import logger, parse_param, box_center_in, roi_contains
+from utils.reco_cache import run_recognition_in_roi, recognition_cache
+
+# Pipeline node with the unfiltered OCR over every item card on the Daily
+# Limited and Cash Shop pages
+SHOP_GRID_NODE = "Mall_ItemGrid"
+
+# The "Sold Out" badge, also when OCR merges it into the item name or splits
+# off "Out"; the word boundaries keep names like "Soldier" out
+SOLD_OUT = re.compile(r"\bs[o0]ld(?:\s*[o0]ut)?\b", re.IGNORECASE)
+
+
+class MallPage:
+    """
+    Index of one shop page built from a single OCR of the grid:
+    item texts with their boxes, and the boxes of "Sold Out" badges.
+    """
+
+    def __init__(self, results: List[RecognitionResult]):
+        self.items = []
+        self.sold_out_boxes = []
+        for result in results:
+            if SOLD_OUT.search(result.text):
+                self.sold_out_boxes.append(result.box)
+            # what is left of a text merged with the badge is the item name
+            text = SOLD_OUT.sub(" ", result.text).strip()
+            if text:
+                self.items.append((text, result.box))
+
+    def find_item(self, item_name: str, card_roi: List[int]):
+        """Box of the first text matching `item_name` inside the card, or None"""
+        for text, box in self.items:
+            if re.search(item_name, text) and box_center_in(box, card_roi):
+                return box
+        return None
+
+    def is_sold_out(self, card_roi: List[int]) -> bool:
+        return any(box_center_in(box, card_roi) for box in self.sold_out_boxes)
+
+
+def scan_mall_page(context: Context, image, roi: List[int]) -> MallPage:
+    """
+    OCR the shop grid of SHOP_GRID_NODE once per frame and index it. Every
+    CheckShopItem node on the same frame resolves against the same page
+    without further recognition: the page is kept in the recognition cache,
+    keyed like the grid OCR it is built from. A `roi` reaching outside the
+    grid is scanned on its own.
+    """
+    node = context.get_node_data(SHOP_GRID_NODE)
+    if not node:
+        logger.error("[CheckShopItem] Pipeline node {} not found", SHOP_GRID_NODE)
+        return MallPage([])
+
+    recognition = node["recognition"]
+    grid_roi = recognition["param"]["roi"]
+    scan_roi = grid_roi if roi_contains(grid_roi, roi) else roi
+
+    def build() -> MallPage:
+        scan_detail = run_recognition_in_roi(
+            context,
+            SHOP_GRID_NODE,
+            image,
+            scan_roi,
+            recognition,
+            prefilter=False,
+        )
+        return MallPage([] if scan_detail is None else scan_detail.all_results)
+
+    key = recognition_cache.make_key(
+        image, {**recognition, "param": {**recognition["param"], "roi": scan_roi}}
+    )
+    return recognition_cache.get_or_build(("MallPage",) + key, build)
 
 
-@AgentServer.custom_recognition("CheckShopItem")
 class CheckShopItem(CustomRecognition):
     """
     Custom recognition that checks if a shop item is available for purchase.
@@ -23,51 +94,20 @@ class CheckShopItem(CustomRecognition):
 
         parent_node_name = argv.node_name
         roi = [argv.roi[0], argv.roi[1], argv.roi[2], argv.roi[3]]
-        node_name = argv.node_name + "_" + item_name
-        reco_detail = context.run_recognition(
-            node_name,
-            argv.image,
-            pipeline_override={
-                node_name: {
-                    "recognition": {
-                        "type": "OCR",
-                        "param": {"expected": [item_name], "roi": roi},
-                        "timeout": 10000,
-                    }
-                }
-            },
-        )
 
-        if reco_detail is None:
-            logger.debug(f"[CheckShopItem] Item '{item_name}' not found.")
+        page = scan_mall_page(context, argv.image, roi)
+        item_box = page.find_item(item_name, roi)
+
+        if item_box is None:
+            logger.debug("[CheckShopItem] Item '{}' not found.", item_name)
             return CustomRecognition.AnalyzeResult(
                 box=None, detail="Item not available"
             )
 
-        sold_out_node = node_name + "_SoldOut"
-        sold_out_detail = context.run_recognition(
-            sold_out_node,
-            argv.image,
-            pipeline_override={
-                sold_out_node: {
-                    "recognition": {
-                        "type": "OCR",
-                        "param": {
-                            "expected": ["Sold Out", "sold out", "sold", "Sold"],
-                            "roi": roi,
-                        },
-                        "timeout": 10000,
-                    }
-                }
-            },
-        )
-
-        if sold_out_detail is not None:
-            logger.debug(f"[CheckShopItem] Item '{item_name}' is sold out.")
+        if page.is_sold_out(roi):
+            logger.debug("[CheckShopItem] Item '{}' is sold out.", item_name)
             context.override_pipeline({f"{parent_node_name}": {"enabled": False}})
             return CustomRecognition.AnalyzeResult(box=None, detail="Item sold out")
 
-        logger.debug(f"[CheckShopItem] Item '{item_name}' is available for purchase.")
-        return CustomRecognition.AnalyzeResult(
-            box=reco_detail.box, detail="Item available"
-        )
+        logger.debug("[CheckShopItem] Item '{}' is available for purchase.", item_name)
+        return CustomRecognition.AnalyzeResult(box=item_box, detail="Item available")
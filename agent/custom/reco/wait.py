@@ -0,0 +1,114 @@
+import json
+import time
+
+from maa.custom_recognition import CustomRecognition
+from maa.context import Context
+
+from utils import logger
+from utils.reco_cache import run_recognition_in_roi
+from utils.screen import wait_for_stable, wait_for_change
+from utils.telemetry import record_wait
+
+
+def _recognize(context, argv, image, recognition):
+    """Run the wrapped recognition on `image`, or hit the whole frame without one"""
+    if recognition is None:
+        height, width = image.shape[:2]
+        return [0, 0, width, height]
+
+    roi = recognition.get("param", {}).get("roi", [0, 0, 0, 0])
+    detail = run_recognition_in_roi(
+        context, argv.node_name + "_Waited", image, roi, recognition
+    )
+    if detail is None or detail.box is None:
+        return None
+    return detail.box
+
+
+class WaitUntilStable(CustomRecognition):
+    """
+    Recognition counterpart of a pre_delay: once the wrapped recognition
+    hits, waits until the screen stops moving and recognizes again on the
+    settled frame, so the action never runs on a half-drawn screen. Misses
+    cost no wait at all.
+
+    Param: {"recognition": {"type": "OCR", "param": {...}}, "max_wait": 3000,
+            "threshold": 1.0, "replaces": 1000}
+    Without "recognition" it hits once the screen is stable.
+    """
+
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> CustomRecognition.AnalyzeResult:
+
+        param = json.loads(argv.custom_recognition_param or "{}")
+        recognition = param.get("recognition")
+        max_wait = param.get("max_wait", 3000) / 1000
+
+        if _recognize(context, argv, argv.image, recognition) is None:
+            return CustomRecognition.AnalyzeResult(box=None, detail="Not recognized")
+
+        start_time = time.perf_counter()
+        frame = wait_for_stable(
+            context.tasker.controller,
+            timeout=max_wait,
+            threshold=param.get("threshold", 1.0),
+        )
+        waited = time.perf_counter() - start_time
+        record_wait(argv, "stable", waited, param.get("replaces"), waited < max_wait)
+        logger.debug(
+            "[WaitUntilStable] {}: settled in {:.0f} ms", argv.node_name, waited * 1000
+        )
+
+        box = _recognize(
+            context, argv, frame if frame is not None else argv.image, recognition
+        )
+        if box is None:
+            return CustomRecognition.AnalyzeResult(
+                box=None, detail="Not recognized after settling"
+            )
+        return CustomRecognition.AnalyzeResult(box=box, detail="Stable")
+
+
+class WaitForChange(CustomRecognition):
+    """
+    Hits as soon as the screen differs from the frame the node was
+    evaluated on (and, with "recognition", the wrapped recognition hits on
+    the changed frame), e.g. to leave a loading screen without a fixed delay.
+
+    Param: {"recognition": {...}, "max_wait": 5000, "threshold": 3.0,
+            "replaces": 5000}
+    """
+
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> CustomRecognition.AnalyzeResult:
+
+        param = json.loads(argv.custom_recognition_param or "{}")
+        recognition = param.get("recognition")
+        max_wait = param.get("max_wait", 5000) / 1000
+
+        start_time = time.perf_counter()
+        frame = wait_for_change(
+            context.tasker.controller,
+            argv.image,
+            timeout=max_wait,
+            threshold=param.get("threshold", 3.0),
+        )
+        waited = time.perf_counter() - start_time
+        record_wait(argv, "change", waited, param.get("replaces"), frame is not None)
+
+        if frame is None:
+            logger.debug(
+                "[WaitForChange] {}: no change in {:.1f}s", argv.node_name, max_wait
+            )
+            return CustomRecognition.AnalyzeResult(box=None, detail="No change")
+
+        box = _recognize(context, argv, frame, recognition)
+        if box is None:
+            return CustomRecognition.AnalyzeResult(box=None, detail="Not recognized")
+        return CustomRecognition.AnalyzeResult(box=box, detail="Changed")
@@ -0,0 +1,136 @@
+import sys
+import time
+import threading
+import importlib
+
+from maa.agent.agent_server import AgentServer
+from maa.custom_action import CustomAction
+from maa.custom_recognition import CustomRecognition
+from maa.context import Context
+
+from utils import logger
+from utils.telemetry import instrumented_call
+
+_import_lock = threading.RLock()
+
+
+def _load_target(name: str, target: str):
+    """
+    Import "module.path:ClassName" (module path relative to the custom package)
+    and return an instance of the class, logging how long the import took.
+    """
+    module_path, class_name = target.split(":")
+
+    with _import_lock:
+        modules_before = len(sys.modules)
+        start_time = time.perf_counter()
+        module = importlib.import_module("." + module_path, __package__)
+        instance = getattr(module, class_name)()
+        elapsed = (time.perf_counter() - start_time) * 1000
+
+    logger.debug(
+        "[Registry] Loaded {} from {} in {:.1f} ms (+{} modules)",
+        name,
+        module.__name__,
+        elapsed,
+        len(sys.modules) - modules_before,
+    )
+    return instance
+
+
+class LazyRecognition(CustomRecognition):
+    """
+    Registered in place of a custom recognition, imports the real one on first
+    dispatch and records telemetry for every call.
+    """
+
+    def __init__(self, name: str, target: str):
+        super().__init__()
+        self.name = name
+        self.target = target
+        self._impl = None
+
+    def load(self) -> CustomRecognition:
+        if self._impl is None:
+            with _import_lock:
+                if self._impl is None:
+                    self._impl = _load_target(self.name, self.target)
+        return self._impl
+
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> CustomRecognition.AnalyzeResult:
+        return instrumented_call(
+            "analyze", self.name, self.load().analyze, context, argv
+        )
+
+
+class LazyAction(CustomAction):
+    """
+    Registered in place of a custom action, imports the real one on first
+    dispatch and records telemetry for every call.
+    """
+
+    def __init__(self, name: str, target: str):
+        super().__init__()
+        self.name = name
+        self.target = target
+        self._impl = None
+
+    def load(self) -> CustomAction:
+        if self._impl is None:
+            with _import_lock:
+                if self._impl is None:
+                    self._impl = _load_target(self.name, self.target)
+        return self._impl
+
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> CustomAction.RunResult:
+        return instrumented_call("run", self.name, self.load().run, context, argv)
+
+
+_lazy_entries = []
+
+
+def register_lazy(recognitions: dict, actions: dict):
+    """
+    Register every name with AgentServer without importing its implementation.
+    """
+    for name, target in recognitions.items():
+        entry = LazyRecognition(name, target)
+        AgentServer.register_custom_recognition(name=name, recognition=entry)
+        _lazy_entries.append(entry)
+
+    for name, target in actions.items():
+        entry = LazyAction(name, target)
+        AgentServer.register_custom_action(name=name, action=entry)
+        _lazy_entries.append(entry)
+
+    logger.debug(
+        "[Registry] Registered {} recognitions and {} actions",
+        len(recognitions),
+        len(actions),
+    )
+
+
+def preload_in_background() -> threading.Thread:
+    """
+    Import every registered implementation on a daemon thread, so the first
+    dispatch does not pay for it once AgentServer is already up.
+    """
+
+    def preload():
+        for entry in _lazy_entries:
+            try:
+                entry.load()
+            except Exception:
+                logger.exception("[Registry] Failed to preload {}", entry.name)
+
+    thread = threading.Thread(target=preload, name="custom-preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+List or export frames recorded by utils/recorder.py (LARINA_RECORD_FRAMES=1).
+
+Usage: python agent/frame_export.py [--node NAME] [--last 20] [--prev]
+       python agent/frame_export.py --node NAME --out debug/replay/case-1
+Exported frames come with a replay case skeleton for benchmark.py.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+if current_script_dir not in sys.path:
+    sys.path.insert(0, current_script_dir)
+
+from utils.recorder import FrameRingReader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dir", default="debug/frames")
+    parser.add_argument("--prev", action="store_true", help="Read the previous run")
+    parser.add_argument("--node", help="Only frames seen by this node")
+    parser.add_argument("--since", type=float, help="Unix timestamp")
+    parser.add_argument("--until", type=float, help="Unix timestamp")
+    parser.add_argument("--last", type=int, default=20, help="Keep the last N frames")
+    parser.add_argument("--out", help="Export the frames to this directory")
+    args = parser.parse_args()
+
+    reader = FrameRingReader(args.dir, previous=args.prev)
+    if not os.path.exists(reader.index_path):
+        print(f"No recorded frames under {args.dir}")
+        sys.exit(1)
+
+    entries = list(reader.entries(args.node, args.since, args.until))[-args.last :]
+
+    if args.out:
+        names = reader.export(entries, args.out)
+        print(f"Exported {len(names)} frames to {args.out}")
+        return
+
+    print(f"{'time':<20} {'seq':>6} {'source':<10} node")
+    for entry in entries:
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["time"]))
+        print(
+            f"{timestamp:<20} {entry['sequence']:>6} {entry['source']:<10} {entry['node']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
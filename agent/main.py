@@ -3,9 +3,15 @@
 import os
 import sys
 import json
+import time
+import hashlib
 import subprocess
 from pathlib import Path
 
+START_TIME = time.perf_counter()
+# Modules the interpreter loaded on its own (site, .pth files), see _activate_venv_in_process
+MODULES_AT_START = set(sys.modules)
+
 # utf-8
 sys.stdout.reconfigure(encoding="utf-8")
 
@@ -28,36 +34,126 @@ from utils import logger
 
 VENV_NAME = ".venv"  # Virtual environment directory name
 VENV_DIR = Path(project_root_dir) / VENV_NAME
+# Interpreter pip runs under: the venv's one once it is activated in-process
+PIP_PYTHON = sys.executable
 
 ### Virtual Environment Related ###
 
 
 def _is_running_in_our_venv():
     """Check if the script is running in the specific venv managed by this script."""
-    current_python = Path(sys.executable).resolve()
+    current_prefix = Path(sys.prefix).resolve()
+
+    logger.debug(f"Current Python prefix: {current_prefix}")
+
+    if current_prefix == VENV_DIR.resolve():
+        return True
+
+    logger.debug("Currently not in target virtual environment")
+    return False
+
+
+def _read_pyvenv_cfg() -> dict:
+    config = {}
+    cfg_path = VENV_DIR / "pyvenv.cfg"
+    if not cfg_path.exists():
+        return config
+
+    for line in cfg_path.read_text(encoding="utf-8").splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            config[key.strip()] = value.strip()
+    return config
+
+
+def _normalize_path(path: str) -> str:
+    """Compare paths the way the OS does: resolved links, case on Windows"""
+    return os.path.normcase(os.path.realpath(path))
+
+
+def _modules_imported_from(paths: set) -> list:
+    """Top-level names of the modules imported since startup from under `paths`"""
+    names = set()
+    for name in set(sys.modules) - MODULES_AT_START:
+        file = getattr(sys.modules.get(name), "__file__", None)
+        if file and any(
+            _normalize_path(file).startswith(path + os.sep) for path in paths
+        ):
+            names.add(name.partition(".")[0])
+    return sorted(names)
 
-    logger.debug(f"Current Python interpreter: {current_python}")
+
+def _activate_venv_in_process(python_in_venv: Path) -> bool:
+    """
+    Activate the venv inside the current interpreter (like virtualenv's activate_this.py)
+    instead of starting a second Python process. Only possible when the venv was
+    created for the same Python version and nothing has been imported from the base
+    interpreter's site-packages yet (e.g. loguru by utils.logger), which would mix two
+    environments in one process; returns False otherwise.
+    """
+    import site
+
+    global PIP_PYTHON
+
+    venv_cfg = _read_pyvenv_cfg()
+    venv_version = venv_cfg.get("version_info") or venv_cfg.get("version", "")
+    current_version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if not (
+        venv_version == current_version
+        or venv_version.startswith(current_version + ".")
+    ):
+        logger.debug(
+            f"Venv Python version {venv_version or 'unknown'} does not match {current_version}"
+        )
+        return False
 
     if sys.platform.startswith("win"):
-        # Windows: If in virtual environment, Python should be in Scripts directory
-        if current_python.parent.name == "Scripts":
-            return True
-        else:
-            logger.debug("Currently not in target virtual environment")
-            return False
+        bin_dir = VENV_DIR / "Scripts"
+        site_packages = VENV_DIR / "Lib" / "site-packages"
     else:
-        # Linux/Unix: If in virtual environment, Python should be in bin directory
-        if current_python.parent.name == "bin":
-            return True
-        else:
-            logger.debug("Currently not in target virtual environment")
-            return False
+        bin_dir = VENV_DIR / "bin"
+        site_packages = VENV_DIR / "lib" / f"python{current_version}" / "site-packages"
+
+    if not site_packages.exists():
+        logger.debug(f"Venv site-packages not found at {site_packages}")
+        return False
+
+    base_site_packages = {
+        _normalize_path(path)
+        for path in site.getsitepackages() + [site.getusersitepackages()]
+    }
+    imported = _modules_imported_from(base_site_packages)
+    if imported:
+        logger.debug(
+            f"Already imported from the base interpreter: {', '.join(imported)}"
+        )
+        return False
+
+    os.environ["PATH"] = os.pathsep.join([str(bin_dir), os.environ.get("PATH", "")])
+    os.environ["VIRTUAL_ENV"] = str(VENV_DIR)
+
+    # Keep the venv isolated from the base interpreter's packages, like a real venv
+    if venv_cfg.get("include-system-site-packages", "false").lower() != "true":
+        sys.path[:] = [
+            path for path in sys.path if _normalize_path(path) not in base_site_packages
+        ]
+
+    prev_length = len(sys.path)
+    site.addsitedir(str(site_packages))
+    sys.path[:] = sys.path[prev_length:] + sys.path[:prev_length]
+
+    sys.real_prefix = sys.prefix
+    sys.prefix = sys.exec_prefix = str(VENV_DIR)
+    # sys.executable stays the interpreter that really runs, pip installs into the venv
+    PIP_PYTHON = str(python_in_venv)
+    return True
 
 
 def ensure_venv_and_relaunch_if_needed():
     """
     Ensure venv exists, and if not already running in the script-managed venv,
-    relaunch the script within it. Supports Linux and Windows systems.
+    activate it in-process, or relaunch the script within it when that is not
+    possible (or LARINA_VENV_RELAUNCH=1). Supports Linux and Windows systems.
     """
     logger.debug(
         f"Detected system: {sys.platform}. Current Python interpreter: {sys.executable}"
@@ -111,6 +207,15 @@ def ensure_venv_and_relaunch_if_needed():
         )
         sys.exit(1)
 
+    if os.environ.get("LARINA_VENV_RELAUNCH") != "1":
+        start_time = time.perf_counter()
+        if _activate_venv_in_process(python_in_venv):
+            logger.debug(
+                f"Activated virtual environment in-process in {(time.perf_counter() - start_time) * 1000:.1f} ms"
+            )
+            return
+        logger.debug("In-process activation not possible, falling back to relaunch")
+
     logger.debug(f"Restarting using virtual environment Python")
 
     try:
@@ -159,6 +264,70 @@ def read_pip_config() -> dict:
 
 ### Dependency Installation Related ###
 
+DEPENDENCY_CACHE_PATH = Path("./config") / "pip_fingerprint.json"
+
+
+def _dependency_fingerprint(req_path: Path) -> str:
+    """Hash of requirements.txt, the local wheels listing and the interpreter version"""
+    digest = hashlib.sha256()
+    digest.update(req_path.read_bytes())
+
+    deps_dir = Path(project_root_dir) / "deps"
+    for whl in sorted(deps_dir.glob("*.whl")):
+        digest.update(f"{whl.name}:{whl.stat().st_size}".encode())
+
+    digest.update(sys.version.encode())
+    digest.update(PIP_PYTHON.encode())
+    return digest.hexdigest()
+
+
+def _requirements_satisfied(req_path: Path) -> bool:
+    """Check with importlib.metadata that every requirement is installed at its pinned version"""
+    from importlib import metadata
+
+    for line in req_path.read_text(encoding="utf-8").splitlines():
+        requirement = line.split("#")[0].strip()
+        if not requirement:
+            continue
+
+        name, _, pinned_version = requirement.partition("==")
+        name = name.strip()
+        try:
+            installed_version = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            logger.debug(f"{name} is not installed")
+            return False
+
+        if pinned_version and installed_version != pinned_version.strip():
+            logger.debug(
+                f"{name} {installed_version} installed, {pinned_version.strip()} required"
+            )
+            return False
+
+    return True
+
+
+def read_dependency_cache() -> dict:
+    if not DEPENDENCY_CACHE_PATH.exists():
+        return {}
+    try:
+        with open(DEPENDENCY_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        logger.exception("Failed to read dependency fingerprint cache, ignoring it")
+        return {}
+
+
+def write_dependency_cache(fingerprint: str, install_seconds: float):
+    DEPENDENCY_CACHE_PATH.parent.mkdir(exist_ok=True)
+    with open(DEPENDENCY_CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(
+            {"fingerprint": fingerprint, "install_seconds": install_seconds},
+            f,
+            indent=4,
+            ensure_ascii=False,
+        )
+
 
 def find_local_wheels_dir():
     """Find whl files in local deps directory"""
@@ -234,7 +403,7 @@ def install_requirements(req_file="requirements.txt", pip_config=None) -> bool:
         logger.debug(f"Installing using local whl files, directory: {deps_dir}")
 
         cmd = [
-            sys.executable,
+            PIP_PYTHON,
             "-m",
             "pip",
             "install",
@@ -262,7 +431,7 @@ def install_requirements(req_file="requirements.txt", pip_config=None) -> bool:
     if primary_mirror:
         # Use primary mirror source, only add one backup source to avoid conflicts
         cmd = [
-            sys.executable,
+            PIP_PYTHON,
             "-m",
             "pip",
             "install",
@@ -294,7 +463,7 @@ def install_requirements(req_file="requirements.txt", pip_config=None) -> bool:
     else:
         # If no primary mirror source is configured, use pip's local global configuration
         cmd = [
-            sys.executable,
+            PIP_PYTHON,
             "-m",
             "pip",
             "install",
@@ -323,9 +492,29 @@ def check_and_install_dependencies():
     logger.debug(f"Enable pip dependency installation: {enable_pip_install}")
 
     if enable_pip_install:
+        req_path = Path(project_root_dir) / "requirements.txt"
+        fingerprint = req_path.exists() and _dependency_fingerprint(req_path)
+        cache = read_dependency_cache()
+
+        if (
+            fingerprint
+            and cache.get("fingerprint") == fingerprint
+            and _requirements_satisfied(req_path)
+        ):
+            logger.debug(
+                "Dependencies unchanged since last install, skipping pip "
+                f"(saved ~{cache.get('install_seconds', 0):.1f}s)"
+            )
+            return
+
         logger.debug("Starting dependency installation/update")
+        start_time = time.perf_counter()
         if install_requirements(pip_config=pip_config):
-            logger.debug("Dependency check and installation completed")
+            install_seconds = time.perf_counter() - start_time
+            write_dependency_cache(fingerprint, install_seconds)
+            logger.debug(
+                f"Dependency check and installation completed in {install_seconds:.1f}s"
+            )
         else:
             logger.warning(
                 "Dependency installation failed, program may not run correctly"
@@ -339,32 +528,55 @@ def check_and_install_dependencies():
 ### Core Business ###
 
 
-def agent(is_dev_mode=False):
-    try:
-        # Clear module cache
-        utils_modules = [
-            name for name in list(sys.modules.keys()) if name.startswith("utils")
-        ]
-        for module_name in utils_modules:
-            del sys.modules[module_name]
+def prepare_agent():
+    """
+    The startup phases of agent() before it serves: reload utils, import
+    MaaFramework and register the custom recognitions/actions. Returns the
+    startup profiler, which startup_probe.py reports at this point.
+    """
+    # Clear module cache
+    utils_modules = [
+        name for name in list(sys.modules.keys()) if name.startswith("utils")
+    ]
+    for module_name in utils_modules:
+        del sys.modules[module_name]
 
-        # Dynamically import all content from utils
-        import utils
-        import importlib
+    # Dynamically import all content from utils
+    import utils
+    import importlib
 
-        importlib.reload(utils)
+    importlib.reload(utils)
 
-        # Import all public attributes from utils to current namespace
-        for attr_name in dir(utils):
-            if not attr_name.startswith("_"):
-                globals()[attr_name] = getattr(utils, attr_name)
+    # Import all public attributes from utils to current namespace
+    for attr_name in dir(utils):
+        if not attr_name.startswith("_"):
+            globals()[attr_name] = getattr(utils, attr_name)
 
-        from maa.agent.agent_server import AgentServer
-        from maa.toolkit import Toolkit
+    from utils.startup import StartupProfiler
 
-        import custom
+    profiler = StartupProfiler(origin=START_TIME)
+    profiler.mark("environment and utils")
+
+    from maa.agent.agent_server import AgentServer
+    from maa.toolkit import Toolkit
 
-        Toolkit.init_option("./")
+    profiler.mark("import maa")
+
+    # Only registers names, implementations are imported on first dispatch
+    import custom
+
+    profiler.mark("register custom recognitions/actions")
+
+    Toolkit.init_option("./")
+    return profiler
+
+
+def agent(is_dev_mode=False):
+    try:
+        profiler = prepare_agent()
+
+        from maa.agent.agent_server import AgentServer
+        import custom
 
         if len(sys.argv) < 2:
             logger.error("Missing required socket_id parameter")
@@ -375,6 +587,10 @@ def agent(is_dev_mode=False):
 
         AgentServer.start_up(socket_id)
         logger.debug("AgentServer started")
+        profiler.mark("AgentServer.start_up")
+        profiler.report()
+
+        custom.preload_in_background()
         AgentServer.join()
         AgentServer.shut_down()
         logger.debug("AgentServer closed")
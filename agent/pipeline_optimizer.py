@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+Reorder pipeline candidates and tighten timeouts from telemetry sessions.
+
+Usage: python agent/pipeline_optimizer.py [session.jsonl ...] [--min-samples 20]
+       python agent/pipeline_optimizer.py --frames debug/replay --dry-run
+       python agent/pipeline_optimizer.py --reorder Stage_Rift_Front.next
+Without files, every session under debug/telemetry is used.
+
+MaaFramework tries the `next` and `interrupt` candidates of a node in list
+order, so the candidates that fire most often for the least recognition
+cost should come first. The "node" records written by utils/telemetry.py
+tell which candidate ran after each node; every node with at least
+`--min-samples` of them gets its candidates sorted by hit probability per
+millisecond of estimated recognition cost. DirectHit and disabled
+candidates never move, and nothing moves across them.
+
+The list order is also a priority: when two candidates match the same
+frame, the first one wins, and telemetry only ever sees that one. A
+reordering therefore changes behaviour unless the candidates it swaps
+never match together, so by default no list is reordered. A proposal is
+applied when every pair of candidates it swaps was probed on the recorded
+frames under `--frames` (see roi_shrink.py) and never hit on the same
+one, or when its list is opted in with `--reorder NODE[.next|.interrupt]`.
+Candidates with a custom recognition cannot be probed offline.
+
+The time between a node and the candidate that ran after it also bounds how
+long the node waits, so `timeout` is lowered to its p99 times `--margin`.
+
+The result is an override bundle (default assets/resource/optimized) that
+only holds the changed fields; load it after resource/base, e.g.
+    python check_resource.py assets/resource/base assets/resource/optimized
+install.py ships it and appends it to the resource paths of interface.json
+when it exists. To use it straight from assets/, add
+"{PROJECT_DIR}/resource/optimized" after the base path in
+assets/interface.json; delete the bundle to go back to the base pipeline.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import argparse
+from pathlib import Path
+from collections import defaultdict
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+if current_script_dir not in sys.path:
+    sys.path.insert(0, current_script_dir)
+
+from telemetry_report import load_records, percentile
+
+PIPELINE_DIR = Path("assets/resource/base/pipeline")
+DEFAULT_PIPELINE = Path("assets/resource/default_pipeline.json")
+OUTPUT_DIR = Path("assets/resource/optimized")
+OVERRIDES_FILE = "optimized.json"
+# Node fields this tool overrides, see write_overrides
+OPTIMIZED_FIELDS = ("next", "interrupt", "timeout")
+FRAMEWORK_TIMEOUT = 20000  # MaaFramework's own default, in ms
+SCREEN_AREA = 1280 * 720
+
+_COMMENT = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.S)
+
+
+def load_json(path: Path) -> dict:
+    """Load a pipeline JSON file, which may hold // and /* */ comments"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return json.loads(_COMMENT.sub(lambda m: m.group(1) or "", text))
+
+
+def load_pipeline(pipeline_dir: Path) -> dict:
+    nodes = {}
+    for path in sorted(pipeline_dir.glob("**/*.json")):
+        nodes.update(
+            (name, node)
+            for name, node in load_json(path).items()
+            if isinstance(node, dict) and not name.startswith("__")
+        )
+    return nodes
+
+
+def _recognition(node: dict):
+    recognition = node.get("recognition", "DirectHit")
+    if isinstance(recognition, str):
+        return recognition, node
+    return recognition.get("type", "DirectHit"), recognition.get("param", {})
+
+
+def estimate_cost(node: dict, measured_ms: float = None) -> float:
+    """
+    Rough recognition cost of a node in ms: OCR grows with its ROI area,
+    template matching with area and template count. Measured custom
+    recognition times from telemetry win over the estimate.
+    """
+    if measured_ms is not None:
+        return measured_ms
+
+    reco_type, param = _recognition(node)
+    roi = param.get("roi", [0, 0, 0, 0])
+    if isinstance(roi, list) and len(roi) == 4 and roi[2] > 0 and roi[3] > 0:
+        area = roi[2] * roi[3] / SCREEN_AREA
+    else:
+        area = 1.0
+
+    if reco_type == "DirectHit":
+        return 0.0
+    if reco_type == "OCR":
+        return 15.0 + 60.0 * area
+    if reco_type == "TemplateMatch":
+        templates = param.get("template", [])
+        count = len(templates) if isinstance(templates, list) else 1
+        return 1.0 + 8.0 * area * max(count, 1)
+    if reco_type == "ColorMatch":
+        return 1.0 + 3.0 * area
+    if reco_type == "Custom":
+        return 50.0
+    return 20.0
+
+
+def _is_pinned(name: str, nodes: dict) -> bool:
+    """Candidates that must keep their place: always-hit, disabled or unknown"""
+    node = nodes.get(name)
+    if node is None or name.startswith("["):
+        return True
+    return _recognition(node)[0] == "DirectHit" or node.get("enabled") is False
+
+
+def expected_cost(order: list, probability: dict, cost: dict) -> float:
+    """Cost of one pass over `order` until the candidate that fires"""
+    total, reach = 0.0, 1.0
+    for name in order:
+        total += reach * cost[name]
+        reach = max(reach - probability[name], 0.0)
+    return total
+
+
+def reorder(candidates: list, counts: dict, nodes: dict, cost: dict, samples: int):
+    """
+    Sort `candidates` by hit probability per ms between pinned candidates.
+    Returns (order, probability); probabilities are smoothed so that
+    candidates never seen firing still sort by cost.
+    """
+    probability = {
+        name: (counts.get(name, 0) + 0.5) / (samples + 0.5 * len(candidates))
+        for name in candidates
+    }
+
+    order, segment = [], []
+    for name in candidates + [None]:
+        if name is None or _is_pinned(name, nodes):
+            segment.sort(key=lambda item: -probability[item] / max(cost[item], 0.5))
+            order.extend(segment)
+            segment = []
+            if name is not None:
+                order.append(name)
+        else:
+            segment.append(name)
+    return order, probability
+
+
+def swapped_pairs(before: list, after: list) -> list:
+    """Pairs of candidates whose relative order differs between the lists"""
+    position = {name: i for i, name in enumerate(after)}
+    return [
+        (first, second)
+        for i, first in enumerate(before)
+        for second in before[i + 1 :]
+        if position[first] > position[second]
+    ]
+
+
+def exclusivity_problem(before: list, after: list, probes: list):
+    """
+    Why reordering `before` into `after` may change which candidate wins,
+    None when every swapped pair was probed on `probes` ([{name: (hit
+    boxes, ms)} per frame], see roi_shrink.Replayer) and never hit together.
+    """
+    if not probes:
+        return "no probed frames"
+
+    for first, second in swapped_pairs(before, after):
+        for name in (first, second):
+            if name not in probes[0]:
+                return f"{name} cannot be probed"
+            if not any(frame[name][0] for frame in probes):
+                return f"{name} never hit on the probed frames"
+        together = sum(bool(frame[first][0] and frame[second][0]) for frame in probes)
+        if together:
+            return f"{first} and {second} both hit on {together} frames"
+    return None
+
+
+def probeable_recognitions(nodes: dict) -> dict:
+    """name -> recognition object of the candidates MaaFramework can run offline"""
+    candidates = set()
+    for node in nodes.values():
+        for field in ("next", "interrupt"):
+            names = node.get(field, [])
+            candidates.update([names] if isinstance(names, str) else names)
+
+    found = {}
+    for name in sorted(candidates):
+        recognition = nodes.get(name, {}).get("recognition")
+        if isinstance(recognition, dict) and recognition.get("type") not in (
+            None,
+            "Custom",
+        ):
+            found[name] = recognition
+    return found
+
+
+def probe_frames(frames_dir: Path, nodes: dict, resource_dirs: list) -> list:
+    """Run every probeable candidate on every frame under `frames_dir`"""
+    from roi_shrink import Replayer, load_frames
+
+    frames = load_frames(frames_dir)
+    recognitions = probeable_recognitions(nodes)
+    print(f"Probing {len(recognitions)} candidates on {len(frames)} frames")
+    return Replayer(resource_dirs).run(frames, recognitions) if frames else []
+
+
+def _opted_in(parent: str, field: str, opt_in) -> bool:
+    return bool(opt_in) and (parent in opt_in or f"{parent}.{field}" in opt_in)
+
+
+def _round_up(value: float, step: int = 500) -> int:
+    return int(math.ceil(value / step) * step)
+
+
+def optimize(records: list, nodes: dict, args, probes: list = None) -> tuple:
+    transitions = defaultdict(lambda: defaultdict(int))
+    gaps = defaultdict(list)
+    measured = defaultdict(list)
+    for record in records:
+        if record["kind"] == "node" and record.get("prev"):
+            transitions[record["prev"]][record["name"]] += 1
+            if record.get("gap_ms") is not None:
+                gaps[record["prev"]].append(record["gap_ms"])
+        elif record["kind"] == "analyze" and record.get("node"):
+            measured[record["node"]].append(record["ms"])
+
+    default_timeout = FRAMEWORK_TIMEOUT
+    if args.defaults.exists():
+        default_timeout = (
+            load_json(args.defaults).get("Default", {}).get("timeout", default_timeout)
+        )
+
+    overrides, report = {}, []
+    for parent, counts in sorted(transitions.items()):
+        node = nodes.get(parent)
+        if node is None:
+            continue
+
+        for field in ("next", "interrupt"):
+            candidates = node.get(field, [])
+            if isinstance(candidates, str):
+                candidates = [candidates]
+            samples = sum(counts.get(name, 0) for name in candidates)
+            if len(candidates) < 2 or samples < args.min_samples:
+                continue
+
+            cost = {
+                name: estimate_cost(
+                    nodes.get(name, {}),
+                    (
+                        sum(measured[name]) / len(measured[name])
+                        if measured.get(name)
+                        else None
+                    ),
+                )
+                for name in candidates
+            }
+            order, probability = reorder(candidates, counts, nodes, cost, samples)
+            before = expected_cost(candidates, probability, cost)
+            after = expected_cost(order, probability, cost)
+            if order == candidates or after > before * (1 - args.min_gain):
+                continue
+
+            if _opted_in(parent, field, args.reorder):
+                status = "opted in"
+            else:
+                problem = exclusivity_problem(candidates, order, probes)
+                status = "kept, " + problem if problem else "proven exclusive"
+            if not status.startswith("kept"):
+                overrides.setdefault(parent, {})[field] = order
+            report.append(
+                f"{parent}.{field} (n={samples}, expected {before:.1f} -> "
+                f"{after:.1f} ms per pass, {status})\n"
+                + "".join(
+                    f"    {old:<36} -> {new:<36} p={probability[new]:.2f} "
+                    f"cost={cost[new]:.1f}\n"
+                    for old, new in zip(candidates, order)
+                )
+            )
+
+        node_gaps = gaps.get(parent, [])
+        if len(node_gaps) >= args.min_samples and node.get("next"):
+            timeout = node.get("timeout", default_timeout)
+            p99 = percentile(node_gaps, 99)
+            proposed = max(_round_up(p99 * args.margin), args.min_timeout)
+            if proposed < timeout:
+                overrides.setdefault(parent, {})["timeout"] = proposed
+                report.append(
+                    f"{parent}.timeout {timeout} -> {proposed} ms "
+                    f"(p99 gap {p99:.0f} ms, n={len(node_gaps)})\n"
+                )
+
+    return overrides, report
+
+
+def write_overrides(path: Path, overrides: dict, fields: tuple, scope=None):
+    """
+    Merge `overrides` into the override file at `path`, replacing only
+    `fields` of the nodes in `scope` (default: every node): each tool writing
+    to the bundle owns its fields and keeps the others' (a node defined twice
+    in one bundle would make MaaFramework reject it). Nodes left without
+    fields are dropped.
+    """
+    existing = load_json(path) if path.exists() else {}
+    merged = {}
+    for name in list(existing) + [name for name in overrides if name not in existing]:
+        node = {
+            field: value
+            for field, value in existing.get(name, {}).items()
+            if field not in fields or (scope is not None and name not in scope)
+        }
+        node.update(overrides.get(name, {}))
+        if node:
+            merged[name] = node
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=4)
+
+
+def validate(overrides: dict, nodes: dict):
+    """Reordered lists must be permutations of the originals"""
+    for name, fields in overrides.items():
+        for field in ("next", "interrupt"):
+            if field not in fields:
+                continue
+            original = nodes[name].get(field, [])
+            if isinstance(original, str):
+                original = [original]
+            if sorted(fields[field]) != sorted(original):
+                raise ValueError(f"{name}.{field} is not a reordering of the original")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--pipeline", type=Path, default=PIPELINE_DIR)
+    parser.add_argument("--defaults", type=Path, default=DEFAULT_PIPELINE)
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--report", type=Path, help="Also write the diff report here")
+    parser.add_argument("--min-samples", type=int, default=20)
+    parser.add_argument(
+        "--min-gain",
+        type=float,
+        default=0.1,
+        help="Only reorder when the expected cost drops by this fraction",
+    )
+    parser.add_argument(
+        "--frames",
+        type=Path,
+        help="Recorded frames to prove reordered candidates never match together",
+    )
+    parser.add_argument(
+        "--resource",
+        type=Path,
+        default=Path("assets/resource"),
+        help="Resource bundle the candidates are probed with",
+    )
+    parser.add_argument(
+        "--reorder",
+        action="append",
+        metavar="NODE[.FIELD]",
+        help="Reorder this list even if its candidates may match together",
+    )
+    parser.add_argument("--margin", type=float, default=1.5)
+    parser.add_argument("--min-timeout", type=int, default=3000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    files = args.files or sorted(Path("debug/telemetry").glob("*.jsonl"))
+    if not files:
+        print("No telemetry session found under debug/telemetry")
+        sys.exit(1)
+
+    nodes = load_pipeline(args.pipeline)
+    records = load_records(files)
+    probes = None
+    if args.frames:
+        resource_dirs = [args.resource]
+        if args.pipeline.parent != args.resource:
+            resource_dirs.append(args.pipeline.parent)
+        probes = probe_frames(args.frames, nodes, resource_dirs)
+    overrides, report = optimize(records, nodes, args, probes)
+    validate(overrides, nodes)
+
+    node_records = sum(record["kind"] == "node" for record in records)
+    print(f"{node_records} node records from {len(files)} sessions")
+    print(f"{len(overrides)} nodes changed\n")
+    print("\n".join(report))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write("\n".join(report))
+
+    if args.dry_run:
+        return
+
+    out_path = args.out / "pipeline" / OVERRIDES_FILE
+    write_overrides(out_path, overrides, OPTIMIZED_FIELDS)
+    print(f"Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
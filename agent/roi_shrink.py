@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Propose tighter OCR ROIs from where the matches land on recorded frames.
+
+Usage: python agent/roi_shrink.py <frames_dir> [--margin 24] [--min-hits 10]
+       python agent/roi_shrink.py <frames_dir> --write
+Frames are the PNGs under <frames_dir>, e.g. exported by frame_export.py or
+the replay cases of benchmark.py, one subdirectory per session.
+
+Every frame is fed through MaaFramework (with the OCR model configured, see
+configure.py) and every OCR node of the pipeline is run on it. The frames
+are split first: `--holdout` of the sessions (or of the frames, with a
+single session) are held out. The boxes of the hits on the other frames,
+grown by `--margin`, give the proposed ROI, clamped to the original one.
+Each proposal is then replayed on every frame; it is only kept when it
+hits on exactly the frames the original did and the original hit at least
+once on the held-out frames, so a ROI is never judged only on the frames
+it was fitted to. The report gives the area reduction and the measured OCR
+time before and after.
+
+`--write` merges the proposals, as a "recognition": {"param": {"roi"}}
+override that leaves the rest of each node to resource/base, into the
+override file pipeline_optimizer.py writes, by default
+assets/resource/optimized/pipeline/optimized.json, to be loaded after
+resource/base.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+if current_script_dir not in sys.path:
+    sys.path.insert(0, current_script_dir)
+
+import numpy
+from PIL import Image
+
+from maa.resource import Resource
+from maa.tasker import Tasker, LoggingLevelEnum
+from maa.controller import CustomController
+from maa.custom_recognition import CustomRecognition
+from maa.context import Context
+
+from pipeline_optimizer import (
+    load_pipeline,
+    write_overrides,
+    PIPELINE_DIR,
+    OUTPUT_DIR,
+    OVERRIDES_FILE,
+)
+from telemetry_report import percentile
+
+RESOURCE_DIR = Path("assets/resource")
+PROBE_ENTRY = "RoiShrink_Probe"
+
+
+class FrameController(CustomController):
+    """Controller whose screen is whatever frame is set on it"""
+
+    def __init__(self):
+        super().__init__()
+        self.frame = None
+
+    def connect(self) -> bool:
+        return True
+
+    def request_uuid(self) -> str:
+        return "roi-shrink"
+
+    def screencap(self) -> numpy.ndarray:
+        return self.frame
+
+    def start_app(self, intent: str) -> bool:
+        return True
+
+    def stop_app(self, intent: str) -> bool:
+        return True
+
+    def click(self, x: int, y: int) -> bool:
+        return True
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int) -> bool:
+        return True
+
+    def touch_down(self, contact, x, y, pressure) -> bool:
+        return True
+
+    def touch_move(self, contact, x, y, pressure) -> bool:
+        return True
+
+    def touch_up(self, contact) -> bool:
+        return True
+
+    def click_key(self, keycode: int) -> bool:
+        return True
+
+    def input_text(self, text: str) -> bool:
+        return True
+
+    def key_down(self, keycode: int) -> bool:
+        return True
+
+    def key_up(self, keycode: int) -> bool:
+        return True
+
+
+class RoiProbe(CustomRecognition):
+    """
+    Runs every node of `recognitions` (name -> recognition object) on the
+    frame and keeps (hit boxes, ms) per node and frame in `results`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.recognitions = {}
+        self.results = {}
+
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> CustomRecognition.AnalyzeResult:
+
+        for name, recognition in self.recognitions.items():
+            start_time = time.perf_counter()
+            detail = context.run_recognition(
+                name, argv.image, {name: {"recognition": recognition}}
+            )
+            elapsed = (time.perf_counter() - start_time) * 1000
+
+            boxes = []
+            if detail is not None and detail.box is not None:
+                boxes = [list(result.box) for result in detail.filterd_results]
+                boxes = boxes or [list(detail.box)]
+            self.results[name] = (boxes, elapsed)
+
+        return CustomRecognition.AnalyzeResult(box=[0, 0, 1, 1], detail="Probed")
+
+
+def ocr_nodes(nodes: dict) -> dict:
+    """name -> recognition object of the OCR nodes with a fixed list ROI"""
+    found = {}
+    for name, node in nodes.items():
+        recognition = node.get("recognition")
+        if not isinstance(recognition, dict) or recognition.get("type") != "OCR":
+            continue
+        param = recognition.get("param", {})
+        roi = param.get("roi")
+        if not isinstance(roi, list) or len(roi) != 4 or "roi_offset" in param:
+            continue
+        found[name] = recognition
+    return found
+
+
+def propose_roi(boxes: list, roi: list, margin: int) -> list:
+    """Bounding box of `boxes` grown by `margin`, clamped to `roi`"""
+    left = max(min(box[0] for box in boxes) - margin, roi[0])
+    top = max(min(box[1] for box in boxes) - margin, roi[1])
+    right = min(max(box[0] + box[2] for box in boxes) + margin, roi[0] + roi[2])
+    bottom = min(max(box[1] + box[3] for box in boxes) + margin, roi[1] + roi[3])
+    return [left, top, right - left, bottom - top]
+
+
+def with_roi(recognition: dict, roi: list) -> dict:
+    return {**recognition, "param": {**recognition.get("param", {}), "roi": roi}}
+
+
+def roi_override(roi: list) -> dict:
+    """Node override replacing only the ROI, MaaFramework keeps the other params"""
+    return {"recognition": {"param": {"roi": roi}}}
+
+
+class Replayer:
+    def __init__(self, resource_dirs: list):
+        self.resource = Resource()
+        for resource_dir in resource_dirs:
+            if not self.resource.post_bundle(resource_dir).wait().status.succeeded:
+                raise RuntimeError(f"Failed to load {resource_dir}")
+
+        self.probe = RoiProbe()
+        self.resource.register_custom_recognition("RoiShrinkProbe", self.probe)
+
+        self.controller = FrameController()
+        self.controller.post_connection().wait()
+        self.tasker = Tasker()
+        if not self.tasker.bind(self.resource, self.controller):
+            raise RuntimeError("Failed to bind the tasker")
+
+    def run(self, frames: list, recognitions: dict) -> list:
+        """[{name: (hit boxes, ms)} per frame]"""
+        self.probe.recognitions = recognitions
+        pipeline_override = {
+            PROBE_ENTRY: {
+                "recognition": {
+                    "type": "Custom",
+                    "param": {"custom_recognition": "RoiShrinkProbe"},
+                },
+                "action": {"type": "DoNothing"},
+            }
+        }
+
+        results = []
+        for frame in frames:
+            self.controller.frame = frame
+            self.probe.results = {}
+            self.tasker.post_task(PROBE_ENTRY, pipeline_override).wait()
+            results.append(self.probe.results)
+        return results
+
+
+def load_frames(frames_dir: Path, paths: list = None) -> list:
+    frames = []
+    for path in paths or sorted(frames_dir.glob("**/*.png")):
+        with Image.open(path) as image:
+            frames.append(
+                numpy.ascontiguousarray(numpy.asarray(image.convert("RGB"))[:, :, ::-1])
+            )
+    return frames
+
+
+def holdout_split(paths: list, fraction: float) -> set:
+    """
+    Indices of the held-out frames: every n-th session (directory) when
+    that holds any out, otherwise every n-th frame, n = 1 / `fraction`.
+    """
+    step = max(2, round(1 / fraction)) if fraction > 0 else 0
+    if not step:
+        return set()
+
+    sessions = sorted({path.parent for path in paths})
+    held_out = set(sessions[step - 1 :: step])
+    if held_out and len(held_out) < len(sessions):
+        return {i for i, path in enumerate(paths) if path.parent in held_out}
+    return set(range(step - 1, len(paths), step))
+
+
+def _area(roi) -> int:
+    return roi[2] * roi[3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("frames_dir", type=Path)
+    parser.add_argument("--resource", type=Path, default=RESOURCE_DIR)
+    parser.add_argument("--pipeline", type=Path, default=PIPELINE_DIR)
+    parser.add_argument("--node", action="append", help="Only these nodes")
+    parser.add_argument("--margin", type=int, default=24)
+    parser.add_argument(
+        "--min-hits", type=int, default=10, help="Hits needed to fit a ROI"
+    )
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.3,
+        help="Fraction of the sessions (or frames) kept out of the fit",
+    )
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--write", action="store_true")
+    args = parser.parse_args()
+
+    Tasker.set_stdout_level(LoggingLevelEnum.Error)
+
+    paths = sorted(args.frames_dir.glob("**/*.png"))
+    if not paths:
+        print(f"No frames under {args.frames_dir}")
+        sys.exit(1)
+    frames = load_frames(args.frames_dir, paths)
+    held_out = holdout_split(paths, args.holdout)
+    if not held_out or len(held_out) == len(frames):
+        print(f"Cannot hold out {args.holdout:.0%} of {len(frames)} frames")
+        sys.exit(1)
+
+    recognitions = ocr_nodes(load_pipeline(args.pipeline))
+    if args.node:
+        unknown = [name for name in args.node if name not in recognitions]
+        if unknown:
+            print(f"Not OCR nodes with a fixed ROI: {', '.join(unknown)}")
+            sys.exit(1)
+        recognitions = {name: recognitions[name] for name in args.node}
+
+    resource_dirs = [args.resource]
+    if args.pipeline.parent != args.resource:
+        resource_dirs.append(args.pipeline.parent)
+    replayer = Replayer(resource_dirs)
+
+    print(
+        f"Replaying {len(frames)} frames ({len(held_out)} held out) through "
+        f"{len(recognitions)} OCR nodes"
+    )
+    baseline = replayer.run(frames, recognitions)
+
+    proposals = {}
+    for name, recognition in recognitions.items():
+        hits = [
+            result[name][0]
+            for i, result in enumerate(baseline)
+            if result[name][0] and i not in held_out
+        ]
+        if len(hits) < args.min_hits:
+            continue
+        roi = recognition["param"]["roi"]
+        proposed = propose_roi(
+            [box for boxes in hits for box in boxes], roi, args.margin
+        )
+        if _area(proposed) < _area(roi):
+            proposals[name] = with_roi(recognition, proposed)
+
+    shrunk = replayer.run(frames, proposals) if proposals else []
+
+    overrides = {}
+    print(
+        f"{'node':<40} {'hits':>5} {'held':>5} {'area':>8} {'new area':>8} "
+        f"{'saved':>6} {'p50 ms':>7} {'new p50':>7}  roi"
+    )
+    for name, recognition in proposals.items():
+        original = [result[name] for result in baseline]
+        replayed = [result[name] for result in shrunk]
+        lost = sum(
+            bool(before[0]) != bool(after[0])
+            for before, after in zip(original, replayed)
+        )
+        held_hits = sum(bool(original[i][0]) for i in held_out)
+        dropped = ""
+        if lost:
+            dropped = f"  (changed {lost} results, dropped)"
+        elif not held_hits:
+            dropped = "  (no held-out hit to validate on, dropped)"
+
+        roi, proposed = recognitions[name]["param"]["roi"], recognition["param"]["roi"]
+        print(
+            f"{name:<40} {sum(bool(r[0]) for r in original) - held_hits:>5} "
+            f"{held_hits:>5} {_area(roi):>8} {_area(proposed):>8} "
+            f"{1 - _area(proposed) / _area(roi):>6.0%} "
+            f"{percentile([r[1] for r in original], 50):>7.1f} "
+            f"{percentile([r[1] for r in replayed], 50):>7.1f}  {proposed}{dropped}"
+        )
+        if not dropped:
+            overrides[name] = roi_override(proposed)
+
+    if not proposals:
+        print(f"No OCR node hit on at least {args.min_hits} fitting frames")
+
+    if args.write and overrides:
+        out_path = args.out / "pipeline" / OVERRIDES_FILE
+        write_overrides(out_path, overrides, ("recognition",), scope=recognitions)
+        print(f"Wrote {len(overrides)} nodes to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
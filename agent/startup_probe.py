@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Run agent/main.py's startup (venv activation, dependency check, imports and
+custom registration) and stop right before AgentServer.start_up, logging the
+startup report. Used by `benchmark.py startup`.
+
+Usage: python agent/startup_probe.py
+"""
+
+import os
+import sys
+
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+if current_script_dir not in sys.path:
+    sys.path.insert(0, current_script_dir)
+
+import main
+
+
+def probe():
+    # same steps as main.main(), without serving
+    if sys.platform.startswith("linux"):
+        main.ensure_venv_and_relaunch_if_needed()
+
+    main.check_and_install_dependencies()
+
+    profiler = main.prepare_agent()
+    profiler.mark("startup probe")
+    profiler.report()
+
+
+if __name__ == "__main__":
+    probe()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Summarize a telemetry session written by utils/telemetry.py.
+
+Usage: python agent/telemetry_report.py [session.jsonl ...] [--top 10]
+Without files, the latest session under debug/telemetry is used.
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from collections import defaultdict
+
+
+def load_records(paths: list) -> list:
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def print_slowest_nodes(records: list, top: int):
+    by_node = defaultdict(list)
+    for record in records:
+        if record["kind"] in ("analyze", "run"):
+            by_node[(record.get("node"), record["name"])].append(record["ms"])
+
+    rows = sorted(by_node.items(), key=lambda item: sum(item[1]), reverse=True)
+
+    print(f"Top {top} slowest nodes (custom recognitions/actions):")
+    print(
+        f"{'node':<40} {'custom':<24} {'calls':>6} {'total ms':>10} {'p50':>8} {'p90':>8}"
+    )
+    for (node, name), values in rows[:top]:
+        print(
+            f"{str(node):<40} {name:<24} {len(values):>6} {sum(values):>10.1f} "
+            f"{percentile(values, 50):>8.1f} {percentile(values, 90):>8.1f}"
+        )
+
+
+def print_recognitions_per_entry(records: list):
+    counts = defaultdict(lambda: defaultdict(int))
+    times = defaultdict(float)
+    for record in records:
+        if record["kind"] != "run_recognition":
+            continue
+        entry = record.get("entry") or "(unknown)"
+        counts[entry][record.get("reco_type") or "?"] += 1
+        times[entry] += record["ms"]
+
+    print("Nested recognition calls per task entry:")
+    print(f"{'entry':<32} {'OCR':>6} {'other':>6} {'total ms':>10}")
+    for entry, by_type in sorted(counts.items(), key=lambda item: -times[item[0]]):
+        ocr = by_type.get("OCR", 0)
+        other = sum(by_type.values()) - ocr
+        print(f"{entry:<32} {ocr:>6} {other:>6} {times[entry]:>10.1f}")
+
+
+def print_prefilter_savings(records: list):
+    checks = [record for record in records if record["kind"] == "prefilter"]
+    if not checks:
+        return
+
+    skipped = [record for record in checks if record.get("skipped")]
+    check_ms = sum(record["ms"] for record in checks)
+    print(
+        f"Text prefilter: skipped {len(skipped)} of {len(checks)} OCR calls "
+        f"({check_ms:.1f} ms spent checking)"
+    )
+    by_entry = defaultdict(int)
+    for record in skipped:
+        by_entry[record["name"]] += 1
+    for entry, count in sorted(by_entry.items(), key=lambda item: -item[1]):
+        print(f"  {entry:<40} {count:>6}")
+
+
+def print_wait_savings(records: list):
+    waits = [record for record in records if record["kind"] == "wait"]
+    if not waits:
+        return
+
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0])
+    for record in waits:
+        total = totals[record.get("entry") or "(unknown)"]
+        total[0] += 1
+        total[1] += record["ms"]
+        total[2] += record.get("fixed_ms") or 0
+        total[3] += not record.get("settled", True)
+
+    print("Adaptive waits vs the fixed delays they replace, per task entry:")
+    print(
+        f"{'entry':<32} {'waits':>6} {'waited ms':>10} {'fixed ms':>10} "
+        f"{'saved ms':>10} {'timeouts':>8}"
+    )
+    for entry, (count, waited, fixed, timeouts) in sorted(
+        totals.items(), key=lambda item: item[1][1] - item[1][2]
+    ):
+        print(
+            f"{entry:<32} {count:>6} {waited:>10.1f} {fixed:>10.1f} "
+            f"{fixed - waited:>10.1f} {timeouts:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        sessions = sorted(Path("debug/telemetry").glob("*.jsonl"))
+        if not sessions:
+            print("No telemetry session found under debug/telemetry")
+            sys.exit(1)
+        files = [sessions[-1]]
+
+    records = load_records(files)
+    print(f"{len(records)} records from {', '.join(str(f) for f in files)}\n")
+    print_slowest_nodes(records, args.top)
+    print()
+    print_recognitions_per_entry(records)
+    print()
+    print_prefilter_savings(records)
+    print()
+    print_wait_savings(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import json
+import math
+import atexit
+import threading
+from pathlib import Path
+
+from .logger import logger
+from .screen import crop_view, frame_diff, is_empty_frame
+
+CALIBRATION_PATH = Path("./config") / "swipe_calibration.json"
+# Swipes in a row that must not move the view before it counts as the end of
+# a list; a single one may just be input lag
+SWIPE_END_CONFIRMATIONS = 2
+# Longest wait for the view to stop moving after one swipe, in seconds
+SWIPE_SETTLE_TIMEOUT = 2.0
+
+
+def _gray_sample(image, roi, step: int):
+    import numpy
+
+    view, _ = crop_view(image, roi)
+    sample = view[::step, ::step]
+    if sample.ndim == 3:
+        sample = sample.mean(axis=2, dtype=numpy.float32)
+    sample = sample.astype(numpy.float32)
+    return sample - sample.mean()
+
+
+def phase_correlation(before, after, roi=None, step: int = 2, ignore_static=True):
+    """
+    Estimate how far the content of `roi` moved between two frames by phase
+    correlation, on frames downscaled by `step`.
+
+    Returns (dx, dy, peak) in full-resolution pixels, positive when the
+    content moved right/down. `peak` (0-1) is the height of the correlation
+    peak, low when the frames do not overlap. Shifts are only known modulo
+    the roi size, see `unwrap_shift`. With `ignore_static`, the peak of the
+    parts that did not move (headers, buttons) is suppressed around (0, 0).
+    """
+    import numpy
+
+    roi = roi or [0, 0, 0, 0]
+    a = _gray_sample(before, roi, step)
+    b = _gray_sample(after, roi, step)
+    if a.shape != b.shape or a.size == 0:
+        return 0.0, 0.0, 0.0
+
+    cross = numpy.fft.rfft2(b) * numpy.conj(numpy.fft.rfft2(a))
+    cross /= numpy.abs(cross) + 1e-9
+    correlation = numpy.fft.irfft2(cross, s=a.shape)
+
+    height, width = a.shape
+    if ignore_static:
+        radius = 2
+        for y in range(-radius, radius + 1):
+            for x in range(-radius, radius + 1):
+                correlation[y % height, x % width] = 0.0
+
+    y, x = numpy.unravel_index(int(numpy.argmax(correlation)), correlation.shape)
+    peak = float(correlation[y, x])
+    dy = y - height if y > height // 2 else y
+    dx = x - width if x > width // 2 else x
+    return float(dx * step), float(dy * step), peak
+
+
+def unwrap_shift(shift: float, expected: float, size: int) -> float:
+    """
+    Pick the shift equivalent to `shift` modulo `size` (the roi width or
+    height) that is closest to the `expected` one, e.g. a swipe of 750 px on
+    a 1280 px wide roi is measured as +530 px.
+    """
+    candidates = [shift - size, shift, shift + size]
+    return min(candidates, key=lambda candidate: abs(candidate - expected))
+
+
+class SwipeCalibration:
+    """
+    Per-device scale factors between the commanded swipe length and the
+    measured on-screen displacement, one per axis, kept in
+    config/swipe_calibration.json. Emulator input lag shortens or lengthens
+    swipes consistently on one device; the factor is the median of the last
+    `window` swipes, so the partial swipes that hit the end of a list do not
+    drag it down.
+
+    Swipes only update the scales in memory; `flush` writes them once a
+    navigation is done, and at exit.
+    """
+
+    def __init__(self, path: Path = CALIBRATION_PATH, window: int = 15):
+        self.path = path
+        self.window = window
+        self._devices = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if self._devices is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._devices = json.load(f)
+            except FileNotFoundError:
+                self._devices = {}
+            except Exception:
+                logger.exception("[SwipeCalibration] Failed to read, starting over")
+                self._devices = {}
+        return self._devices
+
+    def _save(self):
+        self.path.parent.mkdir(exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._devices, f, indent=4, ensure_ascii=False)
+
+    def flush(self):
+        """Write the scales if a swipe changed them since the last flush"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            try:
+                self._save()
+            except Exception:
+                logger.exception("[SwipeCalibration] Failed to save")
+
+    def scale(self, device: str, axis: str) -> float:
+        """Measured displacement per commanded pixel, 1.0 until calibrated"""
+        with self._lock:
+            entry = self._load().get(device, {}).get(axis)
+        return entry["scale"] if entry else 1.0
+
+    def observe(self, device: str, axis: str, commanded: float, measured: float):
+        """Add one swipe to the scale of `axis`, unless it did not move"""
+        if abs(commanded) < 1 or measured * commanded <= 0:
+            return
+        ratio = measured / commanded
+
+        with self._lock:
+            entry = (
+                self._load()
+                .setdefault(device, {})
+                .setdefault(axis, {"scale": 1.0, "samples": 0, "ratios": []})
+            )
+            entry["ratios"] = (entry["ratios"] + [round(ratio, 4)])[-self.window :]
+            entry["scale"] = sorted(entry["ratios"])[len(entry["ratios"]) // 2]
+            entry["samples"] += 1
+            self._dirty = True
+
+        logger.debug(
+            "[SwipeCalibration] {} {}: commanded {:.0f} px, measured {:.0f} px, "
+            "scale {:.3f} ({} samples)",
+            device,
+            axis,
+            commanded,
+            measured,
+            entry["scale"],
+            entry["samples"],
+        )
+
+    def command_for(self, device: str, axis: str, displacement: float) -> float:
+        """Swipe length to command for the content to move `displacement` px"""
+        return displacement / self.scale(device, axis)
+
+
+swipe_calibration = SwipeCalibration()
+atexit.register(swipe_calibration.flush)
+
+
+def calibrated_swipe(
+    controller,
+    begin,
+    end,
+    duration: int,
+    roi=None,
+    before=None,
+    settle_timeout: float = SWIPE_SETTLE_TIMEOUT,
+):
+    """
+    Swipe from `begin` to `end` (points), wait for the view to settle and
+    measure the displacement of `roi` by phase correlation, updating the
+    device's swipe calibration.
+
+    Returns (measured, settled frame). `measured` is the content displacement
+    along the swipe axis, in the direction of the finger, 0.0 when the
+    view did not move (an end of the list was reached).
+    """
+    from .screen import screencap, wait_for_stable
+
+    if is_empty_frame(before):
+        before = screencap(controller)
+
+    dx, dy = end[0] - begin[0], end[1] - begin[1]
+    axis = "x" if abs(dx) >= abs(dy) else "y"
+    commanded = dx if axis == "x" else dy
+    device = str(getattr(controller, "uuid", "") or "default")
+
+    controller.post_swipe(begin[0], begin[1], end[0], end[1], duration).wait()
+    after = wait_for_stable(controller, timeout=settle_timeout)
+
+    if before is None or after is None or frame_diff(before, after) < 1.0:
+        return 0.0, after
+
+    shift_x, shift_y, peak = phase_correlation(before, after, roi)
+    _, clamped = crop_view(after, roi or [0, 0, 0, 0])
+    size = clamped[2] if axis == "x" else clamped[3]
+    expected = commanded * swipe_calibration.scale(device, axis)
+    measured = unwrap_shift(shift_x if axis == "x" else shift_y, expected, size)
+
+    logger.debug(
+        "[calibrated_swipe] Swiped {} px along {}, content moved {:.0f} px "
+        "(peak {:.2f})",
+        commanded,
+        axis,
+        measured,
+        peak,
+    )
+
+    swipe_calibration.observe(device, axis, commanded, measured)
+    return measured, after
+
+
+def swipe_points_for(begin, end, length: float, bounds=None):
+    """
+    Shorten or lengthen the swipe from `begin` to `end` to `length` pixels,
+    same direction and same midpoint. With `bounds` (width, height) the
+    swipe is moved, then shortened if needed, to stay on screen.
+    """
+    dx, dy = end[0] - begin[0], end[1] - begin[1]
+    norm = math.hypot(dx, dy) or 1.0
+    mid = [(begin[0] + end[0]) / 2, (begin[1] + end[1]) / 2]
+    half = [dx / norm * length / 2, dy / norm * length / 2]
+
+    if bounds is not None:
+        for i, size in enumerate(bounds):
+            limit = (size - 1) / 2
+            half[i] = max(-limit, min(limit, half[i]))
+            mid[i] = max(abs(half[i]), min(size - 1 - abs(half[i]), mid[i]))
+
+    return (
+        (int(round(mid[0] - half[0])), int(round(mid[1] - half[1]))),
+        (int(round(mid[0] + half[0])), int(round(mid[1] + half[1]))),
+    )
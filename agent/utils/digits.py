@@ -0,0 +1,303 @@
+import json
+import time
+import atexit
+import threading
+from pathlib import Path
+
+from .logger import logger
+from .screen import crop_view
+from .reco_cache import run_recognition_in_roi
+
+GLYPH_BANK_PATH = Path("./config") / "glyph_bank.json"
+GLYPH_SIZE = (16, 12)  # rows, columns of a normalized glyph
+
+
+def binarize(image):
+    """
+    Otsu-threshold a crop; the ink is whichever side of the threshold covers
+    fewer pixels, so light-on-dark and dark-on-light text both work.
+    """
+    import numpy
+
+    gray = image.mean(axis=2) if image.ndim == 3 else image.astype(numpy.float64)
+    histogram = numpy.bincount(gray.astype(numpy.uint8).ravel(), minlength=256)
+    total = histogram.sum()
+    levels = numpy.arange(256)
+
+    weight = numpy.cumsum(histogram)
+    mean = numpy.cumsum(histogram * levels)
+    background = weight[:-1]
+    foreground = total - background
+    valid = (background > 0) & (foreground > 0)
+    if not valid.any():
+        return numpy.zeros(gray.shape, dtype=bool)
+
+    between = numpy.zeros(255)
+    mean_b = mean[:-1][valid] / background[valid]
+    mean_f = (mean[-1] - mean[:-1][valid]) / foreground[valid]
+    between[valid] = background[valid] * foreground[valid] * (mean_b - mean_f) ** 2
+    threshold = int(numpy.argmax(between))
+
+    ink = gray > threshold
+    if ink.sum() * 2 > ink.size:
+        ink = ~ink
+    return ink
+
+
+def segment_glyphs(ink, min_height_ratio: float = 0.3):
+    """
+    Split a binarized line of text into glyphs by its column projection and
+    return their boxes [x, y, w, h], left to right. Specks shorter than
+    `min_height_ratio` of the tallest glyph are dropped, dots excepted when
+    they sit on the baseline.
+    """
+    import numpy
+
+    columns = ink.any(axis=0)
+    edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(([0], columns, [0]))))
+    boxes = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        rows = numpy.flatnonzero(ink[:, start:end].any(axis=1))
+        boxes.append(
+            [int(start), int(rows[0]), int(end - start), int(rows[-1] - rows[0] + 1)]
+        )
+
+    if not boxes:
+        return []
+    tallest = max(box[3] for box in boxes)
+    baseline = max(box[1] + box[3] for box in boxes)
+    return [
+        box
+        for box in boxes
+        if box[3] >= tallest * min_height_ratio
+        or abs(box[1] + box[3] - baseline) <= max(1, tallest // 8)
+    ]
+
+
+def normalize_glyph(ink, box):
+    """Nearest-neighbour resize of one glyph to GLYPH_SIZE, as a 0/1 array"""
+    import numpy
+
+    x, y, w, h = box
+    rows = y + (numpy.arange(GLYPH_SIZE[0]) * h // GLYPH_SIZE[0])
+    cols = x + (numpy.arange(GLYPH_SIZE[1]) * w // GLYPH_SIZE[1])
+    return ink[numpy.ix_(rows, cols)].astype(numpy.uint8)
+
+
+def _unit(glyphs):
+    import numpy
+
+    flat = glyphs.reshape(len(glyphs), -1).astype(numpy.float32)
+    flat -= flat.mean(axis=1, keepdims=True)
+    norms = numpy.linalg.norm(flat, axis=1, keepdims=True)
+    return flat / numpy.where(norms == 0, 1.0, norms)
+
+
+class GlyphReader:
+    """
+    Reads short fields like "3/3", "Lv.55" or "28F" without OCR: the crop is
+    binarized, split into glyphs and every glyph is matched by correlation
+    against a bank of glyphs seen before.
+
+    The bank bootstraps itself: `read_field` falls back to OCR when a glyph
+    is unknown or ambiguous, and learns the glyphs of what OCR read when the
+    segmentation agrees with it. The bank and the text box of every field
+    are kept in config/glyph_bank.json, written at most every
+    `save_interval` seconds when they changed, and at exit.
+    """
+
+    def __init__(
+        self,
+        path: Path = GLYPH_BANK_PATH,
+        min_score: float = 0.85,
+        min_margin: float = 0.05,
+        max_samples: int = 8,
+        save_interval: float = 30.0,
+    ):
+        self.path = path
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.max_samples = max_samples
+        self.save_interval = save_interval
+        self._bank = None
+        self._matrix = None
+        self._dirty = False
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if self._bank is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._bank = json.load(f)
+            except FileNotFoundError:
+                self._bank = {"glyphs": {}, "fields": {}}
+            except Exception:
+                logger.exception(
+                    "[GlyphReader] Failed to read glyph bank, starting over"
+                )
+                self._bank = {"glyphs": {}, "fields": {}}
+        return self._bank
+
+    def _save(self):
+        self.path.parent.mkdir(exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._bank, f, indent=1, ensure_ascii=False)
+
+    def flush(self, min_interval: float = 0.0):
+        """Write the bank if it changed, and if the last write is old enough"""
+        with self._lock:
+            if not self._dirty or time.time() - self._saved_at < min_interval:
+                return
+            self._dirty = False
+            self._saved_at = time.time()
+            try:
+                self._save()
+            except Exception:
+                logger.exception("[GlyphReader] Failed to save glyph bank")
+
+    def _templates(self):
+        """(labels, unit vectors) of every glyph sample in the bank, cached"""
+        import numpy
+
+        if self._matrix is None:
+            labels, samples = [], []
+            for char, bitmaps in self._load()["glyphs"].items():
+                for bitmap in bitmaps:
+                    labels.append(char)
+                    samples.append(
+                        numpy.frombuffer(bitmap.encode(), dtype=numpy.uint8) - ord("0")
+                    )
+            if samples:
+                self._matrix = labels, _unit(numpy.stack(samples))
+            else:
+                self._matrix = labels, None
+        return self._matrix
+
+    def field_roi(self, field: str, roi):
+        """The learned text box of `field` inside `roi`, or `roi` itself"""
+        box = self._load()["fields"].get(field)
+        if box is None:
+            return roi
+        return [roi[0] + box[0], roi[1] + box[1], box[2], box[3]]
+
+    def read(self, image, roi):
+        """
+        Return (text, confidence) read from `roi`, confidence being the worst
+        glyph score; (None, 0.0) when a glyph is unknown or ambiguous.
+        """
+        import numpy
+
+        labels, templates = self._templates()
+        if templates is None:
+            return None, 0.0
+
+        view, _ = crop_view(image, roi)
+        if view.size == 0:
+            return None, 0.0
+        ink = binarize(view)
+        boxes = segment_glyphs(ink)
+        if not boxes:
+            return None, 0.0
+
+        glyphs = _unit(numpy.stack([normalize_glyph(ink, box) for box in boxes]))
+        scores = glyphs @ templates.T
+
+        text, confidence = [], 1.0
+        for glyph_scores in scores:
+            order = numpy.argsort(glyph_scores)[::-1]
+            best = labels[order[0]]
+            runner_up = next(
+                (glyph_scores[i] for i in order[1:] if labels[i] != best), -1.0
+            )
+            score = float(glyph_scores[order[0]])
+            if score < self.min_score or score - runner_up < self.min_margin:
+                return None, score
+            text.append(best)
+            confidence = min(confidence, score)
+        return "".join(text), confidence
+
+    def learn(self, image, roi, text: str, field: str = None, text_box=None) -> bool:
+        """
+        Add the glyphs of `roi` to the bank as the characters of `text` (as
+        read by OCR). Skipped when the segmentation does not find exactly one
+        glyph per character. `text_box`, relative to the frame, is remembered
+        as the box of `field`.
+        """
+        chars = [c for c in text if not c.isspace()]
+        crop_roi = text_box or roi
+        view, clamped = crop_view(image, crop_roi)
+        if view.size == 0 or not chars:
+            return False
+
+        ink = binarize(view)
+        boxes = segment_glyphs(ink)
+        if len(boxes) != len(chars):
+            logger.debug(
+                "[GlyphReader] {} glyphs for {!r}, not learning", len(boxes), text
+            )
+            return False
+
+        with self._lock:
+            bank = self._load()
+            changed = False
+            for char, box in zip(chars, boxes):
+                bitmap = "".join(map(str, normalize_glyph(ink, box).ravel()))
+                samples = bank["glyphs"].setdefault(char, [])
+                if bitmap not in samples:
+                    samples.append(bitmap)
+                    del samples[: -self.max_samples]
+                    changed = True
+            if field is not None and text_box is not None:
+                field_box = [
+                    clamped[0] - roi[0],
+                    clamped[1] - roi[1],
+                    clamped[2],
+                    clamped[3],
+                ]
+                changed = changed or bank["fields"].get(field) != field_box
+                bank["fields"][field] = field_box
+            if changed:
+                self._matrix = None
+                self._dirty = True
+
+        self.flush(min_interval=self.save_interval)
+        return True
+
+
+glyph_reader = GlyphReader()
+atexit.register(glyph_reader.flush)
+
+
+def _pad(box, padding: int):
+    return [
+        box[0] - padding,
+        box[1] - padding,
+        box[2] + 2 * padding,
+        box[3] + 2 * padding,
+    ]
+
+
+def read_field(context, entry: str, image, roi, reader: GlyphReader = None):
+    """
+    Read a short text field, with the glyph reader when it is confident and
+    with OCR otherwise (learning the glyphs OCR read). Returns the text, ""
+    when OCR finds nothing.
+    """
+    reader = reader or glyph_reader
+
+    text, confidence = reader.read(image, _pad(reader.field_roi(entry, roi), 2))
+    if text is not None:
+        logger.debug("[GlyphReader] {}: {!r} ({:.2f})", entry, text, confidence)
+        return text
+
+    detail = run_recognition_in_roi(
+        context, entry, image, roi, {"type": "OCR", "param": {}}
+    )
+    if detail is None or not detail.all_results:
+        return ""
+
+    best = max(detail.all_results, key=lambda result: result.score)
+    reader.learn(image, roi, best.text, field=entry, text_box=list(best.box))
+    logger.debug("[GlyphReader] {}: OCR read {!r}", entry, best.text)
+    return best.text
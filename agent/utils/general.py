@@ -23,3 +23,30 @@ def parse_rift_floor_number(text: str) -> int:
         return int(match.group(1))
 
     return None
+
+
+def box_center_in(box, roi) -> bool:
+    """
+    Check whether the center of box [x, y, w, h] lies inside roi [x, y, w, h]
+    """
+    if box is None or roi is None:
+        return False
+
+    center_x = box[0] + box[2] / 2
+    center_y = box[1] + box[3] / 2
+
+    return (
+        roi[0] <= center_x <= roi[0] + roi[2] and roi[1] <= center_y <= roi[1] + roi[3]
+    )
+
+
+def roi_contains(outer, inner) -> bool:
+    """
+    Check whether roi `inner` [x, y, w, h] lies completely inside roi `outer`
+    """
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and inner[0] + inner[2] <= outer[0] + outer[2]
+        and inner[1] + inner[3] <= outer[1] + outer[3]
+    )
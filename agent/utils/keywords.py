@@ -0,0 +1,145 @@
+from collections import deque
+from typing import Dict, List
+
+# characters OCR commonly confuses, folded to one form before matching
+_CONFUSABLES = str.maketrans({"0": "o", "1": "l", "i": "l", "|": "l", "5": "s"})
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, fold confusable characters and drop everything but a-z/0-9"""
+    text = text.lower().translate(_CONFUSABLES)
+    return "".join(c for c in text if c.isalnum())
+
+
+def substring_distance(keyword: str, text: str) -> int:
+    """
+    Smallest edit distance between `keyword` and any substring of `text`
+    (approximate substring matching, a Levenshtein DP with a free start).
+    """
+    previous = [0] * (len(text) + 1)
+    for i, k in enumerate(keyword, 1):
+        current = [i] + [0] * len(text)
+        for j, t in enumerate(text, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (k != t),
+            )
+        previous = current
+    return min(previous)
+
+
+class KeywordIndex:
+    """
+    Precompiled index of the keywords of many labels (e.g. every bounty boss).
+    All keywords are found in one pass over a text with an Aho-Corasick
+    automaton; keywords missing from the text are then retried with a small
+    edit distance to tolerate OCR noise.
+
+    A text is scored against each label by the normalized length of the
+    keywords it contains, so "Deity of Weaving" goes to the boss keyed on
+    "Weaving" and not to the one keyed on "Deity".
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]], max_errors_per: int = 6):
+        self.keywords = {
+            label: [normalize_text(keyword) for keyword in words]
+            for label, words in keywords.items()
+        }
+        # one edit allowed per `max_errors_per` characters of the keyword
+        self.max_errors_per = max_errors_per
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for label, words in self.keywords.items():
+            for word in words:
+                self._add(word, label)
+        self._build_failure_links()
+
+    def _add(self, word: str, label: str):
+        state = 0
+        for c in word:
+            if c not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][c] = len(self._goto) - 1
+            state = self._goto[state][c]
+        self._output[state].append((label, word))
+
+    def _build_failure_links(self):
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for c, child in self._goto[state].items():
+                pending.append(child)
+                fallback = self._fail[state]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(c, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                self._output[child] += self._output[self._fail[child]]
+
+    def _exact_matches(self, text: str) -> set:
+        found = set()
+        state = 0
+        for c in text:
+            while state and c not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(c, 0)
+            found.update(self._output[state])
+        return found
+
+    def scan(self, text: str) -> Dict[str, float]:
+        """
+        Score every label found in `text`: the matched keyword lengths over
+        the label's total keyword length, fuzzy matches weighted down by
+        their edit distance. Labels without any match are left out.
+        """
+        text = normalize_text(text)
+        if not text:
+            return {}
+
+        exact = self._exact_matches(text)
+        scores = {}
+        for label, words in self.keywords.items():
+            matched = 0.0
+            for word in words:
+                if (label, word) in exact:
+                    matched += len(word)
+                    continue
+                max_errors = len(word) // self.max_errors_per
+                if max_errors == 0:
+                    continue
+                distance = substring_distance(word, text)
+                if distance <= max_errors:
+                    matched += len(word) - distance
+            if matched:
+                scores[label] = matched / sum(len(word) for word in words)
+        return scores
+
+    def best(self, text: str):
+        """Return (label, score) of the best matching label, or None"""
+        scores = self.scan(text)
+        if not scores:
+            return None
+        return max(scores.items(), key=lambda item: item[1])
+
+    def locate(self, results) -> Dict[str, object]:
+        """
+        Assign each OCR result to its best matching label and return the
+        best scoring result of every label seen, e.g. every visible boss.
+        """
+        located = {}
+        best_scores = {}
+        for result in results:
+            best = self.best(result.text)
+            if best is None:
+                continue
+            label, score = best
+            if score > best_scores.get(label, 0.0):
+                best_scores[label] = score
+                located[label] = result
+        return located
@@ -1,5 +1,87 @@
 import os
 import sys
+import reprlib
+import itertools
+
+# File sink level, DEBUG so bug reports carry the full trail. Messages take
+# lazy `{}` arguments and the per-frame ones are sampled or guarded by
+# `is_enabled`, so LARINA_LOG_LEVEL=INFO makes them free.
+LOG_LEVEL = os.environ.get("LARINA_LOG_LEVEL", "DEBUG").upper()
+# "1" restores loguru's own diagnose output (repr of every frame local)
+LOG_DIAGNOSE = os.environ.get("LARINA_LOG_DIAGNOSE", "") == "1"
+
+_LEVEL_NOS = {
+    "TRACE": 5,
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+_min_level_no = 0
+_sample_counters = {}
+
+_local_repr = reprlib.Repr()
+_local_repr.maxstring = 120
+_local_repr.maxother = 120
+
+
+def is_enabled(level: str = "DEBUG") -> bool:
+    """
+    Whether any sink accepts `level`. Guard expensive log arguments with it
+    (or pass them lazily) so they cost nothing when the level is off.
+    """
+    return _LEVEL_NOS.get(level, 0) >= _min_level_no
+
+
+def sampled(key: str, every: int) -> bool:
+    """
+    True for the first call and then once every `every` calls of `key`,
+    for messages logged on every frame or every recognition.
+    """
+    counter = _sample_counters.get(key)
+    if counter is None:
+        counter = _sample_counters[key] = itertools.count()
+    return next(counter) % max(every, 1) == 0
+
+
+def summarize_local(value) -> str:
+    """Short repr of a frame local: screenshots and buffers are never dumped"""
+    shape = getattr(value, "shape", None)
+    if shape is not None and hasattr(value, "dtype"):
+        return f"<{type(value).__name__} shape={tuple(shape)} dtype={value.dtype}>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    try:
+        return _local_repr.repr(value)
+    except Exception:
+        return f"<{type(value).__name__} (repr failed)>"
+
+
+def _summarize_exception_locals(record, max_frames: int = 3):
+    """
+    Patcher replacing loguru's diagnose: the locals of the innermost frames
+    of a logged exception, each summarized by `summarize_local`.
+    """
+    exception = record["exception"]
+    if exception is None or exception.traceback is None:
+        return
+
+    frames = []
+    tb = exception.traceback
+    while tb is not None:
+        frames.append(tb.tb_frame)
+        tb = tb.tb_next
+
+    lines = []
+    for frame in frames[-max_frames:]:
+        code = frame.f_code
+        lines.append(f"  {code.co_filename}:{frame.f_lineno} in {code.co_name}")
+        for name, value in frame.f_locals.items():
+            lines.append(f"    {name} = {summarize_local(value)}")
+    record["extra"]["locals"] = "\nLocals:\n" + "\n".join(lines)
+
 
 try:
     from loguru import logger as _logger
@@ -11,8 +93,14 @@ try:
             log_dir: Log file directory
             console_level: Console output level (DEBUG, INFO, WARNING, ERROR)
         """
+        global _min_level_no
+
         os.makedirs(log_dir, exist_ok=True)
         _logger.remove()
+        _logger.configure(
+            extra={"locals": ""},
+            patcher=None if LOG_DIAGNOSE else _summarize_exception_locals,
+        )
 
         _logger.add(
             sys.stderr,
@@ -26,12 +114,16 @@ try:
             rotation="00:00",  # midnight
             retention="2 weeks",
             compression="zip",
-            level="DEBUG",
-            format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} | {message}",
+            level=LOG_LEVEL,
+            format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} | {message}{extra[locals]}",
             encoding="utf-8",
             enqueue=True,
             backtrace=True,  # Include complete exception traceback
-            diagnose=True,  # Include variable value information
+            diagnose=LOG_DIAGNOSE,  # Locals are summarized by the patcher instead
+        )
+
+        _min_level_no = min(
+            _LEVEL_NOS.get(console_level, 0), _LEVEL_NOS.get(LOG_LEVEL, 0)
         )
         return _logger
 
@@ -39,7 +131,28 @@ try:
 except ImportError:
     import logging
 
+    class _BraceMessage:
+        """A loguru-style message, formatted only when a handler emits it"""
+
+        def __init__(self, message, args):
+            self.message = message
+            self.args = args
+
+        def __str__(self):
+            if not self.args:
+                return str(self.message)
+            return str(self.message).format(*self.args)
+
+    class _BraceStyleAdapter(logging.LoggerAdapter):
+        """stdlib stand-in for loguru: takes `{}` placeholders like loguru"""
+
+        def log(self, level, msg, *args, **kwargs):
+            if self.isEnabledFor(level):
+                self.logger.log(level, _BraceMessage(msg, args), **kwargs)
+
     logging.basicConfig(
-        format="%(asctime)s | %(levelname)s | %(message)s", level=logging.INFO
+        format="%(asctime)s | %(levelname)s | %(message)s",
+        level=_LEVEL_NOS.get(LOG_LEVEL, logging.INFO),
     )
-    logger = logging
+    logger = _BraceStyleAdapter(logging.getLogger("larina"), {})
+    _min_level_no = logging.getLogger("larina").getEffectiveLevel()
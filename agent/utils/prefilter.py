@@ -0,0 +1,117 @@
+import os
+import json
+import time
+from pathlib import Path
+
+from .logger import logger
+from .telemetry import telemetry
+
+# Threshold calibrated on recorded frames by `benchmark.py prefilter --write`.
+# None ships: the prefilter is off until a threshold is calibrated on a
+# device's own frames. LARINA_TEXT_PREFILTER_THRESHOLD overrides the file,
+# "0" disables.
+TEXT_PREFILTER_CONFIG = Path("./config") / "text_prefilter.json"
+
+
+def load_threshold(path: Path = TEXT_PREFILTER_CONFIG) -> float:
+    """Edge density below which a region is taken to hold no text, 0 for off"""
+    override = os.environ.get("LARINA_TEXT_PREFILTER_THRESHOLD")
+    if override:
+        return float(override)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return float(json.load(f).get("threshold", 0.0))
+    except FileNotFoundError:
+        return 0.0
+    except Exception:
+        logger.exception("[TextPrefilter] Failed to read {}, disabled", path)
+        return 0.0
+
+
+def _tile_starts(size: int, tile: int):
+    """Offsets of whole tiles covering `size`, the last one flush with the end"""
+    import numpy
+
+    starts = numpy.arange(0, size - tile + 1, tile)
+    if starts[-1] + tile < size:
+        starts = numpy.append(starts, size - tile)
+    return starts
+
+
+def text_score(view, step: int = 2, contrast: int = 32, tile: int = 16) -> float:
+    """
+    Edge density of the densest tile of `view`: the fraction of pixels
+    (sampled every `step` pixels, green channel) on a strong horizontal
+    intensity edge, per `tile` x `tile` sampled pixels. Text is dense in such
+    edges, flat panels and gradients have almost none, and taking the densest
+    tile keeps one short label in a large region from being averaged away.
+    The last row and column of tiles overlap the ones before them, so every
+    pixel is in a whole tile.
+    """
+    import numpy
+
+    sample = view[::step, ::step]
+    if sample.ndim == 3:
+        sample = sample[..., 1]
+    if sample.shape[1] < 2:
+        return 0.0
+
+    edges = numpy.abs(numpy.diff(sample.astype(numpy.int16), axis=1)) > contrast
+    height, width = edges.shape
+    tile_h, tile_w = min(tile, height), min(tile, width)
+
+    # edge counts per band of tile rows, then per tile along each band
+    bands = numpy.stack(
+        [
+            edges[top : top + tile_h].sum(axis=0, dtype=numpy.int32)
+            for top in _tile_starts(height, tile_h)
+        ]
+    )
+    cumulative = numpy.zeros((len(bands), width + 1), dtype=numpy.int32)
+    cumulative[:, 1:] = bands.cumsum(axis=1)
+    left = _tile_starts(width, tile_w)
+    counts = cumulative[:, left + tile_w] - cumulative[:, left]
+    return float(counts.max()) / (tile_h * tile_w)
+
+
+class TextPrefilter:
+    """
+    Skips OCR on regions that obviously hold no text, judged by `text_score`
+    in well under a millisecond, and counts the OCR calls it saved. Without a
+    calibrated threshold every region is passed through to OCR.
+    """
+
+    def __init__(self, threshold: float = None):
+        self.threshold = load_threshold() if threshold is None else threshold
+        self.checked = 0
+        self.skipped = 0
+
+    def has_text(self, view, entry: str = "") -> bool:
+        if self.threshold <= 0:
+            return True
+
+        start_time = time.perf_counter()
+        score = text_score(view)
+        skipped = score < self.threshold
+
+        self.checked += 1
+        if skipped:
+            self.skipped += 1
+            logger.debug(
+                "[TextPrefilter] Skipped OCR {} (score {:.4f}, saved {}/{})",
+                entry,
+                score,
+                self.skipped,
+                self.checked,
+            )
+        telemetry.record(
+            "prefilter",
+            entry,
+            time.perf_counter() - start_time,
+            skipped=skipped,
+            score=round(score, 4),
+        )
+        return not skipped
+
+
+text_prefilter = TextPrefilter()
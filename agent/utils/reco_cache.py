@@ -0,0 +1,189 @@
+import json
+import time
+import hashlib
+import threading
+import dataclasses
+from collections import OrderedDict
+
+from .logger import logger, is_enabled, sampled
+from .screen import crop_view, to_frame_box
+from .prefilter import text_prefilter
+
+
+class RecognitionCache:
+    """
+    Process-wide LRU cache of `context.run_recognition` results, keyed by a
+    hash of the frame crop the recognition looks at plus its parameters.
+    Entries are evicted when the cache is full or older than `max_age` seconds.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_size: int = 128, max_age: float = 30.0):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def frame_hash(image, roi=None) -> str:
+        """
+        Fast perceptual hash of the frame crop: a 2x downscaled crop quantized
+        to 32 levels per channel, so sensor noise does not defeat the cache.
+        """
+        if roi is not None:
+            x, y, w, h = [int(v) for v in roi]
+            if w > 0 and h > 0:
+                image = image[max(y, 0) : y + h, max(x, 0) : x + w]
+
+        sample = image[::2, ::2] >> 3
+        digest = hashlib.blake2b(sample.tobytes(), digest_size=16)
+        digest.update(str(sample.shape).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(image, recognition: dict) -> tuple:
+        param = recognition.get("param", {})
+        params = json.dumps(recognition, sort_keys=True, default=list)
+        return RecognitionCache.frame_hash(image, param.get("roi")), params
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return RecognitionCache._MISSING
+
+            stored_at, value = entry
+            if time.time() - stored_at > self.max_age:
+                del self._entries[key]
+                return RecognitionCache._MISSING
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, key, build):
+        """
+        Value derived from cached recognitions, e.g. an index of their
+        results, built once and kept with the same size and age limits
+        """
+        value = self.get(key)
+        if value is RecognitionCache._MISSING:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def run_recognition(self, context, entry: str, image, pipeline_override: dict):
+        """
+        Drop-in replacement for `context.run_recognition` that answers
+        repeated recognitions on an unchanged frame from the cache.
+        """
+        recognition = pipeline_override.get(entry, {}).get("recognition")
+        if not recognition:
+            return context.run_recognition(entry, image, pipeline_override)
+
+        key = self.make_key(image, recognition)
+        value = self.get(key)
+        if value is not RecognitionCache._MISSING:
+            self.hits += 1
+            if is_enabled("DEBUG") and sampled("RecognitionCache.hit", 10):
+                logger.debug(
+                    "[RecognitionCache] Hit {} (hits={}, misses={})",
+                    entry,
+                    self.hits,
+                    self.misses,
+                )
+            return value
+
+        self.misses += 1
+        logger.debug(
+            "[RecognitionCache] Miss {} (hits={}, misses={})",
+            entry,
+            self.hits,
+            self.misses,
+        )
+        value = context.run_recognition(entry, image, pipeline_override)
+        self.put(key, value)
+        return value
+
+
+recognition_cache = RecognitionCache()
+
+
+def cached_run_recognition(context, entry: str, image, pipeline_override: dict = None):
+    return recognition_cache.run_recognition(
+        context, entry, image, pipeline_override or {}
+    )
+
+
+def _translate_box(box, roi):
+    if dataclasses.is_dataclass(box):
+        return dataclasses.replace(box, x=box.x + roi[0], y=box.y + roi[1])
+    return to_frame_box(box, roi)
+
+
+def _translate_result(result, roi):
+    if result is None or result.box is None:
+        return result
+    return dataclasses.replace(result, box=_translate_box(result.box, roi))
+
+
+def run_recognition_in_roi(
+    context, entry: str, image, roi, recognition: dict, prefilter: bool = True
+):
+    """
+    Run a nested recognition on a contiguous copy of just `roi` instead of the
+    full frame (the framework copies whatever image it is given), through the
+    recognition cache, and translate the result boxes back to full-frame
+    coordinates. `recognition` is the node's "recognition" override; its roi
+    param is replaced by the crop. OCR of a region without any text (see
+    TextPrefilter) is skipped and returns None; sweeps of large regions that
+    always hold text pass `prefilter=False`, where the check only costs time.
+    """
+    import numpy
+
+    view, roi = crop_view(image, roi)
+    if view.size == 0:
+        return None
+
+    if (
+        prefilter
+        and recognition.get("type") == "OCR"
+        and not text_prefilter.has_text(view, entry)
+    ):
+        return None
+
+    recognition = dict(recognition)
+    recognition["param"] = dict(
+        recognition.get("param", {}), roi=[0, 0, roi[2], roi[3]]
+    )
+
+    detail = cached_run_recognition(
+        context,
+        entry,
+        numpy.ascontiguousarray(view),
+        pipeline_override={entry: {"recognition": recognition}},
+    )
+
+    if detail is None:
+        return None
+
+    return dataclasses.replace(
+        detail,
+        box=detail.box and _translate_box(detail.box, roi),
+        all_results=[_translate_result(r, roi) for r in detail.all_results],
+        filterd_results=[_translate_result(r, roi) for r in detail.filterd_results],
+        best_result=_translate_result(detail.best_result, roi),
+    )
@@ -0,0 +1,281 @@
+import os
+import json
+import mmap
+import time
+import queue
+import struct
+import hashlib
+import threading
+
+from .logger import logger
+
+# "1" records every frame seen by the custom recognitions into the ring file
+RECORD_FRAMES = os.environ.get("LARINA_RECORD_FRAMES", "") == "1"
+# Size of the ring file in MB, the oldest frames are overwritten first
+RECORD_SIZE_MB = int(os.environ.get("LARINA_RECORD_MB", "512"))
+
+# magic, sequence number, content hash, height, width, channels, payload length
+_HEADER = struct.Struct("<4sQ16sIIIQ")
+_MAGIC = b"LRF1"
+
+
+def content_hash(image) -> bytes:
+    """
+    Hash of every pixel of the frame, so frames that differ in a single digit
+    are never taken for one another. It only runs on the writer thread.
+    """
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+    digest.update(str(image.shape).encode())
+    return digest.digest()
+
+
+class FrameRecorder:
+    """
+    Opt-in recorder appending frames to a fixed-size memory-mapped ring file,
+    with an index of timestamp/node/source -> offset in `index.jsonl`.
+
+    The caller only queues the frame (screenshots are fresh arrays, never
+    mutated afterwards); hashing and the copy into the mapping happen on a
+    background thread, and identical frames still in the ring are indexed
+    again without being rewritten.
+    """
+
+    def __init__(
+        self,
+        record_dir: str = "debug/frames",
+        capacity: int = RECORD_SIZE_MB * 1024 * 1024,
+        enabled: bool = RECORD_FRAMES,
+        max_pending: int = 8,
+    ):
+        self.record_dir = record_dir
+        self.capacity = capacity
+        self.enabled = enabled
+        self.dropped = 0
+        self.deduplicated = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._live = {}  # content hash -> (offset, sequence)
+        self._regions = []  # (start, end, content hash) of frames in the ring
+        self._lock = threading.Lock()
+        self._map = None
+        self._index = None
+        self._thread = None
+        self._offset = 0
+        self._sequence = 0
+
+    @property
+    def ring_path(self) -> str:
+        return os.path.join(self.record_dir, "ring.bin")
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.record_dir, "index.jsonl")
+
+    def _open(self):
+        os.makedirs(self.record_dir, exist_ok=True)
+
+        # a new session starts a new ring, the previous one is kept for export
+        for path in (self.ring_path, self.index_path):
+            if os.path.exists(path):
+                os.replace(path, path + ".prev")
+
+        with open(self.ring_path, "wb") as f:
+            f.truncate(self.capacity)
+        ring_file = open(self.ring_path, "r+b")
+        self._map = mmap.mmap(ring_file.fileno(), self.capacity)
+        ring_file.close()
+        self._index = open(self.index_path, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(
+            target=self._writer, name="frame-recorder", daemon=True
+        )
+        self._thread.start()
+        logger.debug(
+            "[FrameRecorder] Recording frames to {} ({} MB)",
+            self.ring_path,
+            self.capacity // (1024 * 1024),
+        )
+
+    def record(self, image, node: str = None, source: str = "argv"):
+        """
+        Record one frame. Returns immediately; frames are dropped (and counted)
+        when the writer falls behind instead of blocking the recognition.
+        """
+        if not self.enabled or image is None or getattr(image, "size", 0) == 0:
+            return
+
+        with self._lock:
+            if self._map is None:
+                self._open()
+
+        entry = {"time": time.time(), "node": node, "source": source}
+        try:
+            self._queue.put_nowait((entry, image))
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        while True:
+            entry, image = self._queue.get()
+            try:
+                self._write(entry, image)
+            except Exception:
+                logger.exception("[FrameRecorder] Failed to record frame")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, entry: dict, image):
+        digest = content_hash(image)
+        live = self._live.get(digest)
+        if live is not None:
+            self.deduplicated += 1
+            offset, sequence = live
+        else:
+            offset, sequence = self._append(image, digest)
+
+        entry.update(hash=digest.hex(), offset=offset, sequence=sequence)
+        self._index.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._index.flush()
+
+    def _append(self, image, digest: bytes):
+        height, width = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        payload = image.tobytes()
+        size = _HEADER.size + len(payload)
+        if size > self.capacity:
+            raise ValueError(f"Frame of {size} bytes does not fit in the ring")
+
+        if self._offset + size > self.capacity:
+            self._offset = 0
+        start, end = self._offset, self._offset + size
+
+        # frames overwritten by this one can no longer be deduplicated against
+        kept = []
+        for region in self._regions:
+            if region[0] < end and start < region[1]:
+                self._live.pop(region[2], None)
+            else:
+                kept.append(region)
+        self._regions = kept
+
+        self._sequence += 1
+        self._map[start : start + _HEADER.size] = _HEADER.pack(
+            _MAGIC, self._sequence, digest, height, width, channels, len(payload)
+        )
+        self._map[start + _HEADER.size : end] = payload
+
+        self._regions.append((start, end, digest))
+        self._live[digest] = (start, self._sequence)
+        self._offset = end
+        return start, self._sequence
+
+    def flush(self, timeout: float = 2.0):
+        """Wait (up to `timeout`) for queued frames to be written"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+        if self._map is not None:
+            self._map.flush()
+
+
+frame_recorder = FrameRecorder()
+
+
+class FrameRingReader:
+    """
+    Reads a ring written by FrameRecorder. Index entries whose frame has been
+    overwritten since are skipped.
+    """
+
+    def __init__(self, record_dir: str = "debug/frames", previous: bool = False):
+        suffix = ".prev" if previous else ""
+        self.ring_path = os.path.join(record_dir, "ring.bin" + suffix)
+        self.index_path = os.path.join(record_dir, "index.jsonl" + suffix)
+
+    def entries(self, node: str = None, since: float = None, until: float = None):
+        """Index entries still readable from the ring, optionally filtered"""
+        with open(self.ring_path, "rb") as f, open(
+            self.index_path, encoding="utf-8"
+        ) as index:
+            ring = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for line in index:
+                    entry = json.loads(line)
+                    if node is not None and entry["node"] != node:
+                        continue
+                    if since is not None and entry["time"] < since:
+                        continue
+                    if until is not None and entry["time"] > until:
+                        continue
+                    if self._header(ring, entry) is not None:
+                        yield entry
+            finally:
+                ring.close()
+
+    @staticmethod
+    def _header(ring, entry: dict):
+        offset = entry["offset"]
+        if offset + _HEADER.size > len(ring):
+            return None
+        header = _HEADER.unpack_from(ring, offset)
+        magic, sequence, digest = header[:3]
+        if magic != _MAGIC or sequence != entry["sequence"]:
+            return None
+        if digest.hex() != entry["hash"]:
+            return None
+        return header
+
+    def read(self, entry: dict):
+        """Return the frame of an index entry as a BGR ndarray, or None"""
+        import numpy
+
+        with open(self.ring_path, "rb") as f:
+            ring = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                header = self._header(ring, entry)
+                if header is None:
+                    return None
+                _, _, _, height, width, channels, length = header
+                start = entry["offset"] + _HEADER.size
+                data = numpy.frombuffer(ring[start : start + length], dtype=numpy.uint8)
+            finally:
+                ring.close()
+
+        if channels == 1:
+            return data.reshape(height, width)
+        return data.reshape(height, width, channels)
+
+    def export(self, entries, out_dir: str) -> list:
+        """
+        Write the frames of `entries` as PNGs into `out_dir`, together with a
+        replay case skeleton (see benchmark.py) using the first frame as
+        argv.image and the following ones as screens. Returns the file names.
+        """
+        from PIL import Image
+
+        entries = list(entries)
+        os.makedirs(out_dir, exist_ok=True)
+        names = []
+        for entry in entries:
+            frame = self.read(entry)
+            if frame is None:
+                continue
+            name = f"{entry['sequence']:06d}-{entry['source']}.png"
+            if name not in names:
+                if frame.ndim == 3:
+                    frame = frame[..., 2::-1]  # BGR to RGB
+                Image.fromarray(frame).save(os.path.join(out_dir, name))
+            names.append(name)
+
+        if names:
+            case = {
+                "recognition": "",
+                "param": "",
+                "node": entries[0]["node"] or "",
+                "roi": [0, 0, 0, 0],
+                "image": names[0],
+                "screens": names[1:],
+                "frames": {name: {"ocr": [], "template": {}} for name in names},
+            }
+            with open(os.path.join(out_dir, "case.json"), "w", encoding="utf-8") as f:
+                json.dump(case, f, indent=4, ensure_ascii=False)
+        return names
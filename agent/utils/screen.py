@@ -0,0 +1,141 @@
+import time
+
+from .logger import logger
+
+
+def is_empty_frame(image) -> bool:
+    """
+    Check if a screencap is missing or empty without copying it
+    """
+    return image is None or getattr(image, "size", 0) == 0
+
+
+def crop_view(image, roi):
+    """
+    Return a view (no copy) of roi [x, y, w, h] clamped to the frame, together
+    with the clamped roi. A zero-sized roi means the whole frame.
+    """
+    height, width = image.shape[:2]
+    x, y, w, h = [int(v) for v in roi]
+    if w <= 0 or h <= 0:
+        return image, [0, 0, width, height]
+
+    left, top = min(max(x, 0), width), min(max(y, 0), height)
+    right, bottom = min(max(x + w, 0), width), min(max(y + h, 0), height)
+    return image[top:bottom, left:right], [left, top, right - left, bottom - top]
+
+
+def to_frame_box(box, roi) -> list:
+    """
+    Translate a box found inside the crop of `roi` back to full-frame coordinates
+    """
+    return [box[0] + roi[0], box[1] + roi[1], box[2], box[3]]
+
+
+def _thumbnail(image, step: int):
+    import numpy
+
+    sample = image[::step, ::step]
+    if sample.ndim == 3:
+        return sample.mean(axis=2, dtype=numpy.float32)
+    return sample.astype(numpy.float32)
+
+
+def frame_diff(a, b, step: int = 8) -> float:
+    """
+    Mean absolute difference (0-255) between two frames downscaled by `step`.
+    Frames of different shapes are treated as completely different.
+    """
+    import numpy
+
+    if is_empty_frame(a) or is_empty_frame(b) or a.shape != b.shape:
+        return 255.0
+
+    return float(numpy.abs(_thumbnail(a, step) - _thumbnail(b, step)).mean())
+
+
+def screencap(controller):
+    """
+    Take a screencap and wait for it, returns None if it failed
+    """
+    job = controller.post_screencap()
+    job.wait()
+    image = job.get()
+
+    if is_empty_frame(image):
+        return None
+    return image
+
+
+def wait_for_stable(
+    controller,
+    timeout: float = 3.0,
+    interval: float = 0.05,
+    threshold: float = 1.0,
+    stable_frames: int = 2,
+    step: int = 8,
+):
+    """
+    Poll screencaps until `stable_frames` consecutive frames differ by less
+    than `threshold` from the previous one, e.g. after a swipe animation ends.
+
+    Returns the settled frame, or the last frame seen if `timeout` expires
+    (None if every screencap failed).
+    """
+    start_time = time.time()
+    last_frame = None
+    stable_count = 0
+
+    while True:
+        frame = screencap(controller)
+
+        if frame is not None:
+            if (
+                last_frame is not None
+                and frame_diff(last_frame, frame, step) < threshold
+            ):
+                stable_count += 1
+                if stable_count >= stable_frames:
+                    logger.debug(
+                        "[wait_for_stable] Settled in {:.3f}s", time.time() - start_time
+                    )
+                    return frame
+            else:
+                stable_count = 0
+            last_frame = frame
+
+        if time.time() - start_time >= timeout:
+            logger.debug("[wait_for_stable] Not settled after {}s", timeout)
+            return last_frame
+
+        time.sleep(interval)
+
+
+def wait_for_change(
+    controller,
+    reference,
+    timeout: float = 3.0,
+    interval: float = 0.05,
+    threshold: float = 3.0,
+    step: int = 8,
+):
+    """
+    Poll screencaps until a frame differs from `reference` by at least
+    `threshold`. Returns the changed frame, or None if `timeout` expires.
+    """
+    start_time = time.time()
+
+    while True:
+        frame = screencap(controller)
+
+        if frame is not None and frame_diff(reference, frame, step) >= threshold:
+            logger.debug(
+                "[wait_for_change] Changed in {:.3f}s", time.time() - start_time
+            )
+            return frame
+
+        if time.time() - start_time >= timeout:
+            logger.debug("[wait_for_change] No change after {}s", timeout)
+            return None
+
+        time.sleep(interval)
@@ -0,0 +1,114 @@
+import threading
+from pathlib import Path
+
+from .logger import logger
+
+SCREEN_REFERENCE_DIR = Path("./config") / "screens"
+FINGERPRINT_SIZE = (18, 32)  # rows, columns
+
+
+def fingerprint(image):
+    """
+    Coarse color layout of a frame: block means over a FINGERPRINT_SIZE grid
+    of an 8x subsampled frame, scaled to 0-1.
+    """
+    import numpy
+
+    sample = image[::8, ::8]
+    if sample.ndim == 2:
+        sample = sample[..., None]
+    rows, cols = FINGERPRINT_SIZE
+    block_h, block_w = sample.shape[0] // rows, sample.shape[1] // cols
+    blocks = sample[: block_h * rows, : block_w * cols].reshape(
+        rows, block_h, cols, block_w, sample.shape[2]
+    )
+    sums = blocks.sum(axis=(1, 3), dtype=numpy.uint32)
+    return sums.astype(numpy.float32) / (255.0 * block_h * block_w)
+
+
+class ScreenClassifier:
+    """
+    Nearest-neighbour screen classifier over fingerprints of a small set of
+    labeled reference frames, `<reference_dir>/<label>/*.png` (e.g. lobby,
+    mall, wish, battle, loading, popup), exported from recorded frames.
+
+    A frame is only labeled when it is close to some reference and clearly
+    closer to that label than to any other one; otherwise the label is None.
+    """
+
+    def __init__(
+        self,
+        reference_dir: Path = SCREEN_REFERENCE_DIR,
+        max_distance: float = 0.08,
+        min_margin: float = 0.02,
+    ):
+        self.reference_dir = Path(reference_dir)
+        self.max_distance = max_distance
+        self.min_margin = min_margin
+        self._labels = None
+        self._fingerprints = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import numpy
+        from PIL import Image
+
+        with self._lock:
+            if self._labels is not None:
+                return self._labels, self._fingerprints
+
+            labels, fingerprints = [], []
+            if self.reference_dir.is_dir():
+                for path in sorted(self.reference_dir.glob("*/*.png")):
+                    with Image.open(path) as image:
+                        frame = numpy.asarray(image.convert("RGB"))[:, :, ::-1]
+                    labels.append(path.parent.name)
+                    fingerprints.append(fingerprint(frame))
+
+            self._labels = labels
+            self._fingerprints = numpy.stack(fingerprints) if fingerprints else None
+            logger.debug(
+                "[ScreenClassifier] Loaded {} references of {} screens",
+                len(labels),
+                len(set(labels)),
+            )
+            return self._labels, self._fingerprints
+
+    def classify(self, image):
+        """
+        Return (label, distance, margin). `distance` is the mean absolute
+        fingerprint difference to the nearest reference, `margin` how much
+        farther the nearest reference of another label is.
+        """
+        if image is None or image.size == 0:
+            return None, 1.0, 0.0
+        return self.match(fingerprint(image))
+
+    def match(self, target, exclude: int = None):
+        """`classify` for a fingerprint, optionally leaving reference `exclude` out"""
+        import numpy
+
+        labels, fingerprints = self._load()
+        if fingerprints is None:
+            return None, 1.0, 0.0
+
+        distances = numpy.abs(fingerprints - target).mean(axis=(1, 2, 3))
+        if exclude is not None:
+            distances[exclude] = numpy.inf
+        order = numpy.argsort(distances)
+        best = labels[order[0]]
+        distance = float(distances[order[0]])
+        other = next((float(distances[i]) for i in order[1:] if labels[i] != best), 1.0)
+        other = min(other, 1.0)
+        margin = other - distance
+
+        if distance > self.max_distance or margin < self.min_margin:
+            return None, distance, margin
+        return best, distance, margin
+
+    def references(self) -> list:
+        """Labels of the loaded references, in fingerprint order"""
+        return list(self._load()[0])
+
+
+screen_classifier = ScreenClassifier()
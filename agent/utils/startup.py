@@ -0,0 +1,28 @@
+import time
+
+from .logger import logger
+
+
+class StartupProfiler:
+    """
+    Collects named startup phases and logs them like `python -X importtime`:
+    self time of each phase and cumulative time since `origin`.
+    """
+
+    def __init__(self, origin: float = None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self._last = self.origin
+        self.phases = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last, now - self.origin))
+        self._last = now
+
+    def report(self):
+        lines = [f"{'self [ms]':>10} | {'cumulative':>10} | phase"]
+        for phase, self_time, cumulative in self.phases:
+            lines.append(
+                f"{self_time * 1000:>10.1f} | {cumulative * 1000:>10.1f} | {phase}"
+            )
+        logger.debug("Startup report:\n" + "\n".join(lines))
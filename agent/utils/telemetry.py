@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque
+
+from .logger import logger
+from .recorder import frame_recorder
+
+
+class Telemetry:
+    """
+    In-memory ring buffer of timing records for custom recognitions/actions and
+    the framework calls they make, flushed as compact JSONL, one file per session.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "debug/telemetry",
+        capacity: int = 4096,
+        flush_every: int = 256,
+        retention_days: int = 14,
+    ):
+        self.log_dir = log_dir
+        self.flush_every = flush_every
+        self.retention_days = retention_days
+        self.session = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        self._buffer = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._cleaned_up = False
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.log_dir, f"{self.session}.jsonl")
+
+    def record(self, kind: str, name: str, elapsed: float, **fields):
+        """
+        Record one timed call. `elapsed` is in seconds, fields are e.g.
+        node, entry, reco_type, roi_area, hit.
+        """
+        item = {"t": round(time.time(), 3), "kind": kind, "name": name}
+        item["ms"] = round(elapsed * 1000, 3)
+        item.update({key: value for key, value in fields.items() if value is not None})
+
+        with self._lock:
+            self._buffer.append(item)
+            should_flush = len(self._buffer) >= self.flush_every
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            items = list(self._buffer)
+            self._buffer.clear()
+
+        if not items:
+            return
+
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            self._cleanup_old_sessions()
+            with open(self.path, "a", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps(item, separators=(",", ":")) + "\n")
+        except Exception:
+            logger.exception("[Telemetry] Failed to flush records")
+
+    def _cleanup_old_sessions(self):
+        if self._cleaned_up:
+            return
+        self._cleaned_up = True
+
+        expire_before = time.time() - self.retention_days * 86400
+        for file_name in os.listdir(self.log_dir):
+            file_path = os.path.join(self.log_dir, file_name)
+            if (
+                file_name.endswith(".jsonl")
+                and os.path.getmtime(file_path) < expire_before
+            ):
+                os.remove(file_path)
+
+
+telemetry = Telemetry()
+atexit.register(telemetry.flush)
+
+
+def _roi_area(image, roi) -> int:
+    if roi and roi[2] > 0 and roi[3] > 0:
+        return int(roi[2] * roi[3])
+    return int(image.shape[0] * image.shape[1])
+
+
+class _InstrumentedJob:
+    def __init__(self, job, kind: str, name: str, start_time: float, fields: dict):
+        self._job = job
+        self._kind = kind
+        self._name = name
+        self._start_time = start_time
+        self._fields = fields
+        self._recorded = False
+
+    def wait(self):
+        self._job.wait()
+        if not self._recorded:
+            self._recorded = True
+            telemetry.record(
+                self._kind,
+                self._name,
+                time.perf_counter() - self._start_time,
+                **self._fields,
+            )
+        return self
+
+    def get(self):
+        result = self._job.get()
+        if self._name == "post_screencap":
+            frame_recorder.record(result, self._fields.get("node"), "screencap")
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._job, name)
+
+
+class _InstrumentedController:
+    def __init__(self, controller, fields: dict):
+        self._controller = controller
+        self._fields = fields
+
+    def _timed(self, name: str, *args):
+        start_time = time.perf_counter()
+        job = getattr(self._controller, name)(*args)
+        return _InstrumentedJob(job, "controller", name, start_time, self._fields)
+
+    def post_click(self, *args):
+        return self._timed("post_click", *args)
+
+    def post_swipe(self, *args):
+        return self._timed("post_swipe", *args)
+
+    def post_screencap(self, *args):
+        return self._timed("post_screencap", *args)
+
+    def __getattr__(self, name):
+        return getattr(self._controller, name)
+
+
+class _InstrumentedTasker:
+    def __init__(self, tasker, fields: dict):
+        self._tasker = tasker
+        self.controller = _InstrumentedController(tasker.controller, fields)
+
+    def __getattr__(self, name):
+        return getattr(self._tasker, name)
+
+
+class InstrumentedContext:
+    """
+    Context proxy that records every run_recognition and controller call.
+    """
+
+    def __init__(self, context, fields: dict):
+        self._context = context
+        self._fields = fields
+        self.tasker = _InstrumentedTasker(context.tasker, fields)
+
+    def run_recognition(self, entry: str, image, pipeline_override: dict = None):
+        pipeline_override = pipeline_override or {}
+        recognition = pipeline_override.get(entry, {}).get("recognition", {})
+        roi = recognition.get("param", {}).get("roi")
+
+        start_time = time.perf_counter()
+        detail = self._context.run_recognition(entry, image, pipeline_override)
+        telemetry.record(
+            "run_recognition",
+            entry,
+            time.perf_counter() - start_time,
+            reco_type=recognition.get("type"),
+            roi_area=_roi_area(image, roi),
+            hit=detail is not None and detail.box is not None,
+            **self._fields,
+        )
+        return detail
+
+    def clone(self):
+        return InstrumentedContext(self._context.clone(), self._fields)
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+def task_entry(argv):
+    task_detail = getattr(argv, "task_detail", None)
+    return getattr(task_detail, "entry", None)
+
+
+class NodeTrail:
+    """
+    Records the pipeline nodes a task ran, as "node" records with the node
+    that ran before (`prev`), from the task detail every custom call gets.
+    This is how pipeline_optimizer.py learns which `next`/`interrupt`
+    candidate fires after a node. `gap_ms`, the time since the previous node
+    was seen, is only given when exactly one new node showed up, so it is an
+    upper bound of the time the previous node waited for its candidates.
+    """
+
+    def __init__(self, max_tasks: int = 64):
+        self.max_tasks = max_tasks
+        self._seen = {}  # task_id -> (node count, perf_counter)
+        self._lock = threading.Lock()
+
+    def observe(self, task_detail):
+        nodes = getattr(task_detail, "nodes", None)
+        if not nodes:
+            return
+
+        now = time.perf_counter()
+        with self._lock:
+            count, last_seen = self._seen.pop(task_detail.task_id, (0, None))
+            self._seen[task_detail.task_id] = (len(nodes), now)
+            if len(self._seen) > self.max_tasks:
+                del self._seen[next(iter(self._seen))]
+
+        new_nodes = nodes[count:]
+        gap = now - last_seen if last_seen is not None else None
+        for index, node in enumerate(new_nodes, start=count):
+            telemetry.record(
+                "node",
+                node.name,
+                0.0,
+                prev=nodes[index - 1].name if index > 0 else None,
+                gap_ms=round(gap * 1000, 1) if len(new_nodes) == 1 and gap else None,
+                entry=task_detail.entry,
+                task=task_detail.task_id,
+            )
+
+
+node_trail = NodeTrail()
+
+
+def instrumented_call(kind: str, name: str, func, context, argv):
+    """
+    Run a custom recognition `analyze` or action `run` with an instrumented
+    context and record its own wall time.
+    """
+    fields = {"node": argv.node_name, "entry": task_entry(argv)}
+    node_trail.observe(getattr(argv, "task_detail", None))
+    if kind == "analyze":
+        frame_recorder.record(argv.image, argv.node_name, "argv")
+
+    start_time = time.perf_counter()
+    result = None
+    try:
+        result = func(InstrumentedContext(context, fields), argv)
+        return result
+    finally:
+        if kind == "analyze":
+            hit = getattr(result, "box", result) is not None
+        else:
+            hit = bool(getattr(result, "success", result))
+        telemetry.record(
+            kind, name, time.perf_counter() - start_time, hit=hit, **fields
+        )
+
+
+def record_wait(argv, mode: str, waited: float, fixed_ms=None, settled=None):
+    """
+    Record an adaptive wait of a custom recognition/action together with the
+    fixed delay it replaces, for telemetry_report.py's savings report.
+    """
+    telemetry.record(
+        "wait",
+        argv.node_name,
+        waited,
+        mode=mode,
+        fixed_ms=fixed_ms,
+        settled=settled,
+        node=argv.node_name,
+        entry=task_entry(argv),
+    )
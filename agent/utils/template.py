@@ -0,0 +1,136 @@
+from pathlib import Path
+from typing import Dict, List
+
+from .logger import logger
+from .screen import crop_view, to_frame_box
+
+# cwd is the project root: "resource" when installed, "assets/resource" in the repo
+RESOURCE_IMAGE_DIRS = [
+    Path("resource") / "base" / "image",
+    Path("assets") / "resource" / "base" / "image",
+]
+
+
+def resource_image_path(name: str) -> Path:
+    for image_dir in RESOURCE_IMAGE_DIRS:
+        path = image_dir / name
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"Template image not found: {name}")
+
+
+def to_gray(image):
+    """BGR (or already gray) uint8 image to a float32 gray image"""
+    import numpy
+
+    if image.ndim == 2:
+        return image.astype(numpy.float32)
+    b, g, r = image[..., 0], image[..., 1], image[..., 2]
+    return (0.114 * b + 0.587 * g + 0.299 * r).astype(numpy.float32)
+
+
+def load_template(name: str):
+    """Load a template from the resource image directory as a float32 gray image"""
+    import numpy
+    from PIL import Image
+
+    with Image.open(resource_image_path(name)) as image:
+        return numpy.asarray(image.convert("L"), dtype=numpy.float32)
+
+
+class MatchResult:
+    def __init__(self, box: List[int], score: float):
+        self.box = box
+        self.score = score
+
+    def __repr__(self):
+        return f"MatchResult(box={self.box}, score={self.score:.3f})"
+
+
+class MultiTemplateMatcher:
+    """
+    Scores several templates against one ROI in a single vectorized pass:
+    normalized cross-correlation (like TM_CCOEFF_NORMED) computed with one FFT
+    of the ROI and a batched inverse FFT over all cached template spectra.
+    """
+
+    def __init__(self, templates: List[str]):
+        self.templates = templates
+        self._images = None
+        self._spectra = {}
+
+    def _load(self):
+        if self._images is None:
+            self._images = {name: load_template(name) for name in self.templates}
+        return self._images
+
+    def _template_spectra(self, shape):
+        """Zero-mean template spectra padded to the ROI shape, cached per shape"""
+        import numpy
+
+        if shape not in self._spectra:
+            padded = []
+            for template in self._load().values():
+                zero_mean = numpy.zeros(shape, dtype=numpy.float32)
+                # templates larger than the ROI are skipped by match(), cropping
+                # them here only keeps the spectra aligned with the templates
+                fitting = (template - template.mean())[: shape[0], : shape[1]]
+                zero_mean[: fitting.shape[0], : fitting.shape[1]] = fitting
+                padded.append(zero_mean)
+            self._spectra[shape] = numpy.conj(numpy.fft.rfft2(numpy.stack(padded)))
+        return self._spectra[shape]
+
+    def match(self, image, roi) -> Dict[str, MatchResult]:
+        """
+        Return the best box (full-frame coordinates) and score of every template
+        that fits inside the ROI.
+        """
+        import numpy
+
+        view, roi = crop_view(image, roi)
+        gray = to_gray(view)
+        height, width = gray.shape
+
+        correlations = numpy.fft.irfft2(
+            numpy.fft.rfft2(gray)[None] * self._template_spectra(gray.shape),
+            s=gray.shape,
+        )
+
+        # window sums of I and I^2 from integral images
+        padded = numpy.pad(gray.astype(numpy.float64), ((1, 0), (1, 0)))
+        integral = padded.cumsum(0).cumsum(1)
+        integral_sq = (padded**2).cumsum(0).cumsum(1)
+
+        results = {}
+        for index, (name, template) in enumerate(self._load().items()):
+            t_height, t_width = template.shape
+            if t_height > height or t_width > width:
+                continue
+
+            def window_sum(table):
+                return (
+                    table[t_height:, t_width:]
+                    - table[:-t_height, t_width:]
+                    - table[t_height:, :-t_width]
+                    + table[:-t_height, :-t_width]
+                )
+
+            count = t_height * t_width
+            image_sum = window_sum(integral)
+            image_var = window_sum(integral_sq) - image_sum**2 / count
+            template_var = float(((template - template.mean()) ** 2).sum())
+
+            valid = correlations[index, : height - t_height + 1, : width - t_width + 1]
+            # flat windows (no variance) cannot match anything
+            flat = image_var < 1e-3
+            denominator = numpy.sqrt(numpy.where(flat, 1.0, image_var) * template_var)
+            scores = numpy.where(flat, 0.0, valid / denominator)
+
+            y, x = numpy.unravel_index(int(numpy.argmax(scores)), scores.shape)
+            results[name] = MatchResult(
+                box=to_frame_box([int(x), int(y), t_width, t_height], roi),
+                score=float(scores[y, x]),
+            )
+
+        logger.debug("[MultiTemplateMatcher] {}", results)
+        return results
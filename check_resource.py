@@ -1,13 +1,266 @@
+import re
+import ast
 import sys
+import json
+import time
+import argparse
 
-from typing import List
+from typing import Dict, List, Tuple
 from pathlib import Path
 
-from maa.resource import Resource
-from maa.tasker import Tasker, LoggingLevelEnum
+working_dir = Path(__file__).parent
+interface_path = working_dir / "assets" / "interface.json"
+custom_registry_path = working_dir / "agent" / "custom" / "__init__.py"
+
+_COMMENT = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.S)
+
+# Fields whose value names the nodes a node can continue to
+_LINK_FIELDS = ("next", "interrupt", "on_error")
+
+
+def load_json(path: Path):
+    """Load a MaaFramework JSON file, which may hold // and /* */ comments"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return json.loads(_COMMENT.sub(lambda m: m.group(1) or "", text))
+
+
+def find_bundles(dir: Path) -> List[Path]:
+    """`dir` itself when it is a bundle, else the bundles right below it"""
+    if (dir / "pipeline").is_dir():
+        return [dir]
+    return sorted(path.parent for path in dir.glob("*/pipeline") if path.is_dir())
+
+
+def _is_editor_key(key: str) -> bool:
+    return key.startswith("__mpe")
+
+
+def strip_node(node: dict) -> dict:
+    return {key: value for key, value in node.items() if not _is_editor_key(key)}
+
+
+def _names(value) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _recognition(node: dict) -> Tuple[str, dict]:
+    recognition = node.get("recognition", "DirectHit")
+    if isinstance(recognition, str):
+        return recognition, node
+    return recognition.get("type", "DirectHit"), recognition.get("param", {})
+
+
+def _action(node: dict) -> Tuple[str, dict]:
+    action = node.get("action", "DoNothing")
+    if isinstance(action, str):
+        return action, node
+    return action.get("type", "DoNothing"), action.get("param", {})
+
+
+def load_registry(path: Path = custom_registry_path) -> Tuple[set, set]:
+    """
+    Names of the custom recognitions and actions the agent registers, read
+    from the RECOGNITIONS/ACTIONS tables without importing the agent.
+    """
+    tables = {"RECOGNITIONS": set(), "ACTIONS": set()}
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    for statement in tree.body:
+        if not isinstance(statement, ast.Assign):
+            continue
+        for target in statement.targets:
+            if isinstance(target, ast.Name) and target.id in tables:
+                tables[target.id] = set(ast.literal_eval(statement.value))
+    return tables["RECOGNITIONS"], tables["ACTIONS"]
+
+
+def _string_constants(dir: Path) -> set:
+    """Every string literal of the agent sources, for node names used in code"""
+    strings = set()
+    for path in dir.glob("**/*.py"):
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"))
+        except SyntaxError:
+            continue
+        strings.update(
+            node.value
+            for node in ast.walk(tree)
+            if isinstance(node, ast.Constant) and isinstance(node.value, str)
+        )
+    return strings
+
+
+def _interface_roots(path: Path) -> set:
+    if not path.exists():
+        return set()
+    interface = load_json(path)
+    roots = {task["entry"] for task in interface.get("task", [])}
+    for option in interface.get("option", {}).values():
+        for case in option.get("cases", []):
+            roots.update(case.get("pipeline_override", {}))
+    return roots
+
+
+class PipelineCompiler:
+    """
+    Parses the pipeline JSON of one or more bundles once, in load order (a
+    later bundle overrides the fields of nodes it repeats), and checks the
+    node graph without MaaFramework.
+    """
+
+    def __init__(self, bundles: List[Path]):
+        self.bundles = bundles
+        self.nodes: Dict[str, dict] = {}
+        self.files: Dict[str, Path] = {}
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+
+        for bundle in bundles:
+            seen = {}
+            for path in sorted((bundle / "pipeline").glob("**/*.json")):
+                try:
+                    data = load_json(path)
+                except ValueError as e:
+                    self.errors.append(f"{path}: invalid JSON: {e}")
+                    continue
+
+                for name, node in data.items():
+                    if _is_editor_key(name):
+                        continue
+                    if not isinstance(node, dict):
+                        self.errors.append(f"{path}: {name} is not an object")
+                        continue
+                    if name in seen:
+                        self.errors.append(
+                            f"{path}: {name} is also defined in {seen[name]}"
+                        )
+                    seen[name] = path
+                    self.nodes.setdefault(name, {}).update(strip_node(node))
+                    self.files.setdefault(name, path)
+
+    def _where(self, name: str) -> str:
+        return f"{self.files[name]}: {name}"
+
+    def check_links(self):
+        for name, node in self.nodes.items():
+            for field in _LINK_FIELDS:
+                for target in _names(node.get(field)):
+                    if target not in self.nodes:
+                        self.errors.append(
+                            f"{self._where(name)}.{field} -> unknown node {target}"
+                        )
+
+    def check_templates(self):
+        image_dirs = [bundle / "image" for bundle in self.bundles]
+        for name, node in self.nodes.items():
+            reco_type, param = _recognition(node)
+            if reco_type not in ("TemplateMatch", "FeatureMatch"):
+                continue
+            for template in _names(param.get("template")):
+                if not any((dir / template).exists() for dir in image_dirs):
+                    self.errors.append(
+                        f"{self._where(name)} -> missing template {template}"
+                    )
+
+    def check_customs(self, recognitions: set, actions: set):
+        for name, node in self.nodes.items():
+            reco_type, param = _recognition(node)
+            custom = param.get("custom_recognition")
+            if reco_type == "Custom" and custom not in recognitions:
+                self.errors.append(
+                    f"{self._where(name)} -> unknown custom recognition {custom}"
+                )
+
+            action_type, param = _action(node)
+            custom = param.get("custom_action")
+            if action_type == "Custom" and custom not in actions:
+                self.errors.append(
+                    f"{self._where(name)} -> unknown custom action {custom}"
+                )
+
+    def check_reachable(self, roots: set):
+        """Nodes no task entry, interface option or agent code leads to"""
+        pending = [name for name in roots if name in self.nodes]
+        reached = set(pending)
+        while pending:
+            node = self.nodes[pending.pop()]
+            for field in _LINK_FIELDS:
+                for target in _names(node.get(field)):
+                    if target in self.nodes and target not in reached:
+                        reached.add(target)
+                        pending.append(target)
+
+        for name in sorted(set(self.nodes) - reached):
+            self.warnings.append(f"{self._where(name)} is unreachable")
+
+    def run(self, recognitions: set, actions: set, roots: set) -> bool:
+        self.check_links()
+        self.check_templates()
+        self.check_customs(recognitions, actions)
+        self.check_reachable(roots)
+        return not self.errors
+
+
+def minify_pipeline(pipeline_dir: Path, out_dir: Path = None) -> int:
+    """
+    Write the pipeline JSON of `pipeline_dir` to `out_dir` (in place by
+    default) without comments, editor metadata and whitespace. Returns the
+    bytes saved.
+    """
+    out_dir = out_dir or pipeline_dir
+    saved = 0
+    for path in sorted(pipeline_dir.glob("**/*.json")):
+        data = {
+            name: strip_node(node) if isinstance(node, dict) else node
+            for name, node in load_json(path).items()
+            if not _is_editor_key(name)
+        }
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+        out_path = out_dir / path.relative_to(pipeline_dir)
+        saved += path.stat().st_size - len(text.encode("utf-8"))
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return saved
+
+
+def check_static(dirs: List[Path]) -> bool:
+    start_time = time.perf_counter()
+    bundles = [bundle for dir in dirs for bundle in find_bundles(dir)]
+    if not bundles:
+        print("No pipeline bundle found.")
+        return True
+
+    compiler = PipelineCompiler(bundles)
+    recognitions, actions = load_registry()
+    roots = _interface_roots(interface_path) | (
+        _string_constants(working_dir / "agent") & set(compiler.nodes)
+    )
+    # e.g. DisableNode takes the node to disable as its param
+    for node in compiler.nodes.values():
+        param = _action(node)[1].get("custom_action_param")
+        if isinstance(param, str):
+            roots.add(param)
+    ok = compiler.run(recognitions, actions, roots)
+
+    for warning in compiler.warnings:
+        print(f"Warning: {warning}")
+    for error in compiler.errors:
+        print(f"Error: {error}")
+    print(
+        f"Compiled {len(compiler.nodes)} nodes from {len(bundles)} bundles in "
+        f"{(time.perf_counter() - start_time) * 1000:.0f} ms: "
+        f"{len(compiler.errors)} errors, {len(compiler.warnings)} warnings."
+    )
+    return ok
 
 
 def check(dirs: List[Path]) -> bool:
+    from maa.resource import Resource
+
     resource = Resource()
 
     print(f"Checking {len(dirs)} directories...")
@@ -24,14 +277,37 @@ def check(dirs: List[Path]) -> bool:
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python configure.py <directory>")
+    parser = argparse.ArgumentParser(
+        description="Check resource bundles, statically and with MaaFramework"
+    )
+    parser.add_argument("dirs", nargs="+", type=Path)
+    parser.add_argument(
+        "--static", action="store_true", help="Only run the static checks"
+    )
+    parser.add_argument(
+        "--emit", type=Path, help="Write the minified pipeline of every bundle here"
+    )
+    args = parser.parse_args()
+
+    if not check_static(args.dirs):
         sys.exit(1)
 
+    if args.emit:
+        for dir in args.dirs:
+            for bundle in find_bundles(dir):
+                saved = minify_pipeline(
+                    bundle / "pipeline", args.emit / bundle.name / "pipeline"
+                )
+                print(f"Minified {bundle}, {saved} bytes saved.")
+
+    if args.static:
+        return
+
+    from maa.tasker import Tasker, LoggingLevelEnum
+
     Tasker.set_stdout_level(LoggingLevelEnum.All)
 
-    dirs = [Path(arg) for arg in sys.argv[1:]]
-    if not check(dirs):
+    if not check(args.dirs):
         sys.exit(1)
 
 
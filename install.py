@@ -5,11 +5,13 @@ import sys
 import json
 
 from configure import configure_ocr_model
+from check_resource import check_static, find_bundles, minify_pipeline
 
 
 working_dir = Path(__file__).parent
 install_path = working_dir / Path("install")
 version = len(sys.argv) > 1 and sys.argv[1] or "v0.0.1"
+OPTIMIZED_RESOURCE_PATH = "{PROJECT_DIR}/resource/optimized"
 
 
 def install_deps():
@@ -50,11 +52,24 @@ def install_resource():
         install_path,
     )
 
+    # Ship the pipeline without comments and editor metadata, it loads faster
+    if not check_static([working_dir / "assets" / "resource"]):
+        sys.exit(1)
+    for bundle in find_bundles(install_path / "resource"):
+        minify_pipeline(bundle / "pipeline")
+
     with open(install_path / "interface.json", "r", encoding="utf-8") as f:
         interface = json.load(f)
 
     interface["version"] = version
 
+    # Overrides written by agent/pipeline_optimizer.py load after the base
+    optimized_dir = working_dir / "assets" / "resource" / "optimized"
+    if any(optimized_dir.glob("pipeline/*.json")):
+        for resource in interface["resource"]:
+            if OPTIMIZED_RESOURCE_PATH not in resource["path"]:
+                resource["path"].append(OPTIMIZED_RESOURCE_PATH)
+
     with open(install_path / "interface.json", "w", encoding="utf-8") as f:
         json.dump(interface, f, ensure_ascii=False, indent=4)
 
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+AGENT_DIR = PROJECT_DIR / "agent"
+
+# The agent imports its modules as top-level packages (utils, custom, ...)
+if str(AGENT_DIR) not in sys.path:
+    sys.path.insert(0, str(AGENT_DIR))
+
+# utils.logger and the persistent helpers write to debug/ and config/ under
+# the working directory, keep them out of the checkout
+os.chdir(tempfile.mkdtemp(prefix="larina-tests-"))
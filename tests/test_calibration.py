@@ -0,0 +1,83 @@
+import numpy
+import pytest
+
+from utils.calibration import (
+    SwipeCalibration,
+    phase_correlation,
+    swipe_points_for,
+    unwrap_shift,
+)
+
+
+def shifted(frame, shift: int, axis: int, rng):
+    """`frame` with its content moved by `shift` px, new content entering"""
+    after = numpy.roll(frame, shift, axis=axis)
+    fresh = rng.integers(0, 255, after.shape, dtype=numpy.uint8)
+    span = slice(shift, None) if shift < 0 else slice(0, shift)
+    if axis == 1:
+        after[:, span] = fresh[:, span]
+    else:
+        after[span] = fresh[span]
+    return after
+
+
+@pytest.mark.parametrize("shift", [-600, -240, 90, 300])
+def test_phase_correlation_measures_horizontal_shift(shift):
+    rng = numpy.random.default_rng(0)
+    before = rng.integers(0, 255, (720, 1280, 3), dtype=numpy.uint8)
+    after = shifted(before, shift, 1, rng)
+
+    dx, dy, peak = phase_correlation(before, after)
+    assert unwrap_shift(dx, shift, 1280) == pytest.approx(shift, abs=2)
+    assert dy == pytest.approx(0, abs=2)
+    assert peak > 0.1
+
+
+def test_phase_correlation_in_roi_ignores_static_parts():
+    rng = numpy.random.default_rng(1)
+    before = rng.integers(0, 255, (720, 1280, 3), dtype=numpy.uint8)
+    after = before.copy()
+    roi = [0, 200, 1280, 300]
+    # only the list inside the roi scrolls, header and footer stay. Shifts
+    # are even: white noise does not survive the 2x downscale at odd ones
+    after[200:500] = shifted(before[200:500], -76, 0, rng)
+
+    dx, dy, _ = phase_correlation(before, after, roi)
+    assert unwrap_shift(dy, -80, 300) == pytest.approx(-76, abs=2)
+    assert dx == pytest.approx(0, abs=2)
+
+
+def test_phase_correlation_of_different_shapes():
+    a = numpy.zeros((10, 10, 3), dtype=numpy.uint8)
+    b = numpy.zeros((12, 10, 3), dtype=numpy.uint8)
+    assert phase_correlation(a, b) == (0.0, 0.0, 0.0)
+
+
+def test_unwrap_shift_picks_the_closest_alias():
+    assert unwrap_shift(530, -750, 1280) == -750
+    assert unwrap_shift(530, 500, 1280) == 530
+
+
+def test_swipe_points_keep_direction_and_midpoint():
+    begin, end = swipe_points_for((1100, 400), (350, 400), 500)
+    assert begin == (975, 400) and end == (475, 400)
+
+    begin, end = swipe_points_for((1100, 400), (350, 400), 3000, bounds=(1280, 720))
+    assert 0 <= end[0] < begin[0] <= 1279
+
+
+def test_calibration_uses_median_and_ignores_stalls(tmp_path):
+    calibration = SwipeCalibration(path=tmp_path / "calibration.json", window=3)
+    for measured in (-500, -900, -520, -480):
+        calibration.observe("device", "x", -1000, measured)
+    calibration.observe("device", "x", -1000, 0.0)
+
+    # median of the last three ratios: 0.9, 0.52, 0.48
+    assert calibration.scale("device", "x") == pytest.approx(0.52)
+    assert calibration.command_for("device", "x", 260) == pytest.approx(500)
+    assert calibration.scale("other", "x") == 1.0
+
+    assert not calibration.path.exists()
+    calibration.flush()
+    reloaded = SwipeCalibration(path=calibration.path)
+    assert reloaded.scale("device", "x") == pytest.approx(0.52)
@@ -0,0 +1,60 @@
+import numpy
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.digits import binarize, segment_glyphs, normalize_glyph, GLYPH_SIZE
+
+
+def render(text: str, foreground, background, size=(120, 40)):
+    image = Image.new("RGB", size, background)
+    ImageDraw.Draw(image).text(
+        (8, 6), text, font=ImageFont.load_default(size=22), fill=foreground
+    )
+    return numpy.asarray(image)[:, :, ::-1].copy()
+
+
+def test_binarize_picks_the_text_as_ink():
+    light_on_dark = binarize(render("3/3", (240, 240, 240), (30, 40, 60)))
+    dark_on_light = binarize(render("3/3", (20, 20, 20), (230, 230, 220)))
+
+    for ink in (light_on_dark, dark_on_light):
+        assert 0 < ink.sum() < ink.size / 4
+    # the same glyph pixels, whichever way round the colors are
+    overlap = (light_on_dark & dark_on_light).sum()
+    assert overlap / max(light_on_dark.sum(), dark_on_light.sum()) > 0.8
+
+
+def test_binarize_flat_crop_has_no_ink():
+    assert not binarize(numpy.full((20, 30, 3), 128, dtype=numpy.uint8)).any()
+
+
+def test_segment_glyphs_splits_left_to_right():
+    ink = binarize(render("28F", (240, 240, 240), (30, 40, 60)))
+    boxes = segment_glyphs(ink)
+
+    assert len(boxes) == 3
+    assert [box[0] for box in boxes] == sorted(box[0] for box in boxes)
+    for left, right in zip(boxes, boxes[1:]):
+        assert left[0] + left[2] <= right[0]
+
+
+def test_segment_glyphs_keeps_dots_on_the_baseline_only():
+    ink = numpy.zeros((20, 40), dtype=bool)
+    ink[2:18, 2:8] = True  # a tall glyph
+    ink[16:18, 12:14] = True  # a dot on the baseline, like "Lv.5"
+    ink[2:4, 20:22] = True  # a speck high up, noise
+    ink[2:18, 26:32] = True
+
+    boxes = segment_glyphs(ink)
+    assert [box[0] for box in boxes] == [2, 12, 26]
+
+
+def test_segment_glyphs_of_empty_ink():
+    assert segment_glyphs(numpy.zeros((10, 10), dtype=bool)) == []
+
+
+def test_normalize_glyph_size():
+    ink = numpy.zeros((30, 20), dtype=bool)
+    ink[5:25, 4:12] = True
+    glyph = normalize_glyph(ink, [4, 5, 8, 20])
+    assert glyph.shape == GLYPH_SIZE
+    assert glyph.all()
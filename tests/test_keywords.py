@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from utils.keywords import KeywordIndex, normalize_text, substring_distance
+
+
+def make_index():
+    return KeywordIndex(
+        {
+            "Deity of Thunder": ["Deity", "Thunder"],
+            "Deity of Weaving": ["Weaving"],
+            "Frost Orb": ["Frost", "Orb"],
+            "Flame Lord": ["Flame", "Lord"],
+        }
+    )
+
+
+def test_normalize_text_folds_confusables():
+    assert normalize_text("Fr0st 0rb!") == "frostorb"
+    assert normalize_text("Lv.15") == "lvls"
+
+
+def test_substring_distance():
+    assert substring_distance("orb", "frostorb") == 0
+    assert substring_distance("frost", "xxfrastxx") == 1
+    assert substring_distance("abc", "") == 3
+
+
+def test_highest_keyword_coverage_wins():
+    index = make_index()
+    assert index.best("Deity of Weaving")[0] == "Deity of Weaving"
+    assert index.scan("Deity of Weaving")["Deity of Thunder"] == 5 / 12
+    assert index.best("Deity of Thunder") == ("Deity of Thunder", 1.0)
+
+
+def test_partial_and_missing_matches():
+    index = make_index()
+    assert index.scan("Frost") == {"Frost Orb": 5 / 8}
+    assert index.scan("Lord of Flames")["Flame Lord"] == 1.0
+    assert index.best("Confirm") is None
+    assert index.scan("") == {}
+
+
+def test_fuzzy_match_tolerates_ocr_noise():
+    index = KeywordIndex({"Abyssal Knight": ["Abyssal", "Knight"]})
+    # one edit per six characters of each keyword
+    score = index.scan("Abyssai Kniqht")["Abyssal Knight"]
+    assert 0.8 < score < 1.0
+    assert index.scan("Xyzzy Qwerty") == {}
+
+
+def test_locate_keeps_best_result_per_label():
+    index = make_index()
+    results = [
+        SimpleNamespace(text="Frost", box=[0, 0, 10, 10]),
+        SimpleNamespace(text="Frost Orb", box=[100, 0, 10, 10]),
+        SimpleNamespace(text="Flame Lord", box=[200, 0, 10, 10]),
+        SimpleNamespace(text="Start", box=[300, 0, 10, 10]),
+    ]
+    located = index.locate(results)
+    assert set(located) == {"Frost Orb", "Flame Lord"}
+    assert located["Frost Orb"].box == [100, 0, 10, 10]
@@ -0,0 +1,122 @@
+import json
+from types import SimpleNamespace
+
+from pipeline_optimizer import (
+    OPTIMIZED_FIELDS,
+    exclusivity_problem,
+    optimize,
+    swapped_pairs,
+    write_overrides,
+)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_write_overrides_creates_the_file(tmp_path):
+    path = tmp_path / "pipeline" / "optimized.json"
+    write_overrides(path, {"A": {"next": ["B", "C"]}}, OPTIMIZED_FIELDS)
+    assert read(path) == {"A": {"next": ["B", "C"]}}
+
+
+def test_write_overrides_keeps_fields_owned_by_other_tools(tmp_path):
+    path = tmp_path / "optimized.json"
+    roi = {"recognition": {"param": {"roi": [0, 0, 10, 10]}}}
+    path.write_text(
+        json.dumps({"A": {"next": ["C", "B"], **roi}, "B": {"timeout": 4000}})
+    )
+
+    write_overrides(path, {"A": {"next": ["B", "C"]}}, OPTIMIZED_FIELDS)
+
+    # B's timeout is owned by this tool and not proposed again
+    assert read(path) == {"A": {**roi, "next": ["B", "C"]}}
+
+
+def test_write_overrides_respects_scope(tmp_path):
+    path = tmp_path / "optimized.json"
+    path.write_text(json.dumps({"A": {"timeout": 4000}, "B": {"timeout": 5000}}))
+
+    write_overrides(path, {"A": {"timeout": 6000}}, ("timeout",), scope={"A"})
+
+    assert read(path) == {"A": {"timeout": 6000}, "B": {"timeout": 5000}}
+
+
+def test_write_overrides_drops_nodes_left_empty(tmp_path):
+    path = tmp_path / "optimized.json"
+    path.write_text(json.dumps({"A": {"timeout": 4000}}))
+
+    write_overrides(path, {}, OPTIMIZED_FIELDS)
+
+    assert read(path) == {}
+
+
+def ocr(roi):
+    return {"recognition": {"type": "OCR", "param": {"roi": roi}}}
+
+
+NODES = {
+    "Parent": {"next": ["Slow", "Fast"]},
+    "Slow": ocr([0, 0, 1280, 720]),
+    "Fast": ocr([0, 0, 100, 100]),
+}
+
+
+def records(slow: int, fast: int):
+    return [{"kind": "node", "prev": "Parent", "name": "Slow"}] * slow + [
+        {"kind": "node", "prev": "Parent", "name": "Fast"}
+    ] * fast
+
+
+def options(tmp_path, reorder=None):
+    return SimpleNamespace(
+        defaults=tmp_path / "missing.json",
+        min_samples=20,
+        min_gain=0.1,
+        margin=1.5,
+        min_timeout=3000,
+        reorder=reorder,
+    )
+
+
+def probe(*hits):
+    """One probed frame per argument, the names that hit on it"""
+    return [
+        {name: ([[0, 0, 1, 1]] if name in frame else [], 1.0) for name in NODES}
+        for frame in hits
+    ]
+
+
+def test_swapped_pairs():
+    assert swapped_pairs(["a", "b", "c"], ["c", "a", "b"]) == [("a", "c"), ("b", "c")]
+    assert swapped_pairs(["a", "b"], ["a", "b"]) == []
+
+
+def test_reordering_needs_proof_or_opt_in(tmp_path):
+    overrides, report = optimize(records(10, 30), NODES, options(tmp_path))
+    assert overrides == {}
+    assert "kept, no probed frames" in report[0]
+
+    overrides, _ = optimize(
+        records(10, 30), NODES, options(tmp_path, reorder=["Parent.next"])
+    )
+    assert overrides == {"Parent": {"next": ["Fast", "Slow"]}}
+
+
+def test_reordering_proven_exclusive_on_probed_frames(tmp_path):
+    exclusive = probe({"Slow"}, {"Fast"}, set())
+    overrides, report = optimize(records(10, 30), NODES, options(tmp_path), exclusive)
+    assert overrides == {"Parent": {"next": ["Fast", "Slow"]}}
+    assert "proven exclusive" in report[0]
+
+    # both match the same frame: Slow wins today, moving Fast first changes that
+    overlapping = probe({"Slow"}, {"Fast"}, {"Slow", "Fast"})
+    overrides, report = optimize(records(10, 30), NODES, options(tmp_path), overlapping)
+    assert overrides == {}
+    assert "Slow and Fast both hit on 1 frames" in report[0]
+
+
+def test_candidates_never_seen_are_not_proven():
+    assert exclusivity_problem(["Slow", "Fast"], ["Fast", "Slow"], probe({"Fast"}))
+    assert exclusivity_problem(["Slow", "X"], ["X", "Slow"], probe({"Slow"}))
@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+
+import numpy
+import pytest
+
+from utils import reco_cache
+from utils.reco_cache import RecognitionCache, run_recognition_in_roi
+
+
+@dataclass
+class Result:
+    box: list
+
+
+@dataclass
+class Detail:
+    """The fields of MaaFramework's RecognitionDetail the helpers touch"""
+
+    box: list
+    all_results: list
+    filterd_results: list
+    best_result: Result
+
+
+class CountingContext:
+    """Stands in for MaaFramework's context, answering with a fixed box"""
+
+    def __init__(self, box=(5, 6, 7, 8)):
+        self.box = list(box)
+        self.calls = []
+
+    def run_recognition(self, entry, image, pipeline_override):
+        self.calls.append((entry, image.shape, pipeline_override))
+        result = Result(box=list(self.box))
+        return Detail(list(self.box), [result], [result], result)
+
+
+def frame(seed=0):
+    rng = numpy.random.default_rng(seed)
+    return rng.integers(0, 255, (720, 1280, 3), dtype=numpy.uint8)
+
+
+def test_key_ignores_sensor_noise_and_pixels_outside_the_roi():
+    image = frame()
+    recognition = {"type": "OCR", "param": {"roi": [100, 100, 200, 50]}}
+    key = RecognitionCache.make_key(image, recognition)
+
+    noisy = image & 0xF8 | 0x03  # same 32 levels per channel
+    assert RecognitionCache.make_key(noisy, recognition) == key
+
+    outside = image.copy()
+    outside[400:] = 0
+    assert RecognitionCache.make_key(outside, recognition) == key
+
+    inside = image.copy()
+    inside[110:120, 110:200] = 255 - inside[110:120, 110:200]
+    assert RecognitionCache.make_key(inside, recognition) != key
+
+    other = {"type": "OCR", "param": {"roi": [100, 100, 200, 50], "expected": "x"}}
+    assert RecognitionCache.make_key(image, other) != key
+
+
+def test_evicts_least_recently_used():
+    cache = RecognitionCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is RecognitionCache._MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_expires_old_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(reco_cache.time, "time", lambda: now[0])
+    cache = RecognitionCache(max_age=30)
+    cache.put("a", 1)
+
+    now[0] += 29
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is RecognitionCache._MISSING
+
+
+def test_get_or_build_builds_once():
+    cache = RecognitionCache()
+    builds = []
+    for _ in range(3):
+        value = cache.get_or_build("index", lambda: builds.append(1) or "built")
+    assert value == "built" and len(builds) == 1
+
+
+def test_run_recognition_answers_repeats_from_the_cache():
+    cache = RecognitionCache()
+    context = CountingContext()
+    override = {
+        "Node": {"recognition": {"type": "OCR", "param": {"roi": [0, 0, 50, 50]}}}
+    }
+
+    first = cache.run_recognition(context, "Node", frame(), override)
+    second = cache.run_recognition(context, "Node", frame(), override)
+    assert first is second
+    assert len(context.calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.run_recognition(context, "Node", frame(seed=1), override)
+    assert len(context.calls) == 2
+
+
+def test_run_recognition_without_recognition_is_not_cached():
+    cache = RecognitionCache()
+    context = CountingContext()
+    cache.run_recognition(context, "Node", frame(), {})
+    cache.run_recognition(context, "Node", frame(), {})
+    assert len(context.calls) == 2
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(reco_cache, "recognition_cache", RecognitionCache())
+
+
+def test_run_recognition_in_roi_translates_boxes(fresh_cache):
+    context = CountingContext(box=(5, 6, 7, 8))
+    recognition = {"type": "TemplateMatch", "param": {"roi": [0, 0, 1280, 720]}}
+    detail = run_recognition_in_roi(
+        context, "Node", frame(), [100, 200, 300, 150], recognition
+    )
+
+    ((entry, shape, override),) = context.calls
+    assert shape == (150, 300, 3)
+    assert override["Node"]["recognition"]["param"]["roi"] == [0, 0, 300, 150]
+    assert detail.box == [105, 206, 7, 8]
+    assert detail.best_result.box == [105, 206, 7, 8]
+    assert [r.box for r in detail.all_results] == [[105, 206, 7, 8]]
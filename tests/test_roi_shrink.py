@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from roi_shrink import holdout_split, propose_roi, roi_override
+
+
+def test_holdout_keeps_whole_sessions_out():
+    paths = [Path(f"session-{s}/frame-{f}.png") for s in range(6) for f in range(4)]
+    held_out = holdout_split(paths, 0.3)
+
+    assert {paths[i].parent for i in held_out} == {Path("session-2"), Path("session-5")}
+    assert len(held_out) == 8
+
+
+def test_holdout_interleaves_frames_of_a_single_session():
+    paths = [Path(f"session/frame-{f}.png") for f in range(10)]
+    assert holdout_split(paths, 0.3) == {2, 5, 8}
+    assert holdout_split(paths, 0) == set()
+
+
+def test_propose_roi_is_clamped_to_the_original():
+    boxes = [[100, 100, 50, 20], [300, 140, 40, 20]]
+    assert propose_roi(boxes, [90, 90, 400, 200], 24) == [90, 90, 274, 94]
+
+
+def test_override_only_replaces_the_roi():
+    assert roi_override([1, 2, 3, 4]) == {
+        "recognition": {"param": {"roi": [1, 2, 3, 4]}}
+    }
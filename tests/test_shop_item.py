@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+import numpy
+import pytest
+from maa.custom_recognition import CustomRecognition
+
+from utils import reco_cache
+from utils.reco_cache import RecognitionCache
+from custom.reco import shop_item
+from custom.reco.shop_item import CheckShopItem, MallPage
+
+GRID_ROI = [200, 170, 1080, 550]
+CARD_ROI = [212, 480, 257, 239]  # Mall_DailyLimited_Buy_BRankContract
+OTHER_CARD_ROI = [480, 480, 257, 239]
+
+
+@dataclass
+class Result:
+    text: str
+    box: list
+
+
+@dataclass
+class Detail:
+    box: list
+    all_results: list
+    filterd_results: list
+    best_result: Result
+
+
+class ShopContext:
+    """Answers the grid OCR with fixed full-frame results"""
+
+    def __init__(self, results):
+        self.results = results
+        self.rois = []
+        self.overrides = []
+
+    def get_node_data(self, name):
+        if name != shop_item.SHOP_GRID_NODE:
+            return None
+        return {"recognition": {"type": "OCR", "param": {"roi": GRID_ROI}}}
+
+    def run_recognition(self, entry, image, pipeline_override):
+        roi = pipeline_override[entry]["recognition"]["param"]["roi"]
+        self.rois.append(roi)
+        # run_recognition_in_roi hands over the crop, answer in its coordinates
+        origin = GRID_ROI[:2]
+        results = [
+            Result(r.text, [r.box[0] - origin[0], r.box[1] - origin[1], *r.box[2:]])
+            for r in self.results
+        ]
+        best = results[0] if results else None
+        return Detail(best and best.box, results, results, best)
+
+    def override_pipeline(self, override):
+        self.overrides.append(override)
+        return True
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = RecognitionCache()
+    monkeypatch.setattr(reco_cache, "recognition_cache", cache)
+    monkeypatch.setattr(shop_item, "recognition_cache", cache)
+
+
+def analyze(context, item_name, roi=CARD_ROI):
+    argv = CustomRecognition.AnalyzeArg(
+        task_detail=None,
+        node_name="Mall_DailyLimited_Buy_BRankContract",
+        custom_recognition_name="CheckShopItem",
+        custom_recognition_param=f'"{item_name}"',
+        image=numpy.zeros((720, 1280, 3), dtype=numpy.uint8),
+        roi=roi,
+    )
+    return CheckShopItem().analyze(context, argv)
+
+
+def test_badge_merged_into_the_item_name_marks_the_card_sold_out():
+    page = MallPage([Result("B Rank Contract Sold Out", [250, 600, 180, 30])])
+    assert page.find_item("B Rank Contract", CARD_ROI) == [250, 600, 180, 30]
+    assert page.is_sold_out(CARD_ROI)
+    assert not page.is_sold_out(OTHER_CARD_ROI)
+
+
+def test_names_containing_sold_are_not_badges():
+    page = MallPage([Result("Soldier Pack", [250, 600, 120, 30])])
+    assert not page.is_sold_out(CARD_ROI)
+    assert page.find_item("Soldier Pack", CARD_ROI)
+
+
+def test_available_item_is_clicked_once_per_frame():
+    context = ShopContext(
+        [
+            Result("B Rank Contract", [250, 600, 150, 30]),
+            Result("A Rank Contract", [520, 600, 150, 30]),
+            Result("Sold Out", [540, 520, 100, 30]),
+        ]
+    )
+    result = analyze(context, "B Rank Contract")
+    assert result.box == [250, 600, 150, 30]
+
+    assert analyze(context, "A Rank Contract", OTHER_CARD_ROI).box is None
+    # both cards resolve against one OCR of the grid node's roi
+    assert context.rois == [[0, 0, GRID_ROI[2], GRID_ROI[3]]]
+
+
+def test_merged_badge_disables_the_node():
+    context = ShopContext([Result("B Rank Contract Sold Out", [250, 600, 180, 30])])
+    result = analyze(context, "B Rank Contract")
+
+    assert result.box is None and result.detail == "Item sold out"
+    assert context.overrides == [
+        {"Mall_DailyLimited_Buy_BRankContract": {"enabled": False}}
+    ]
@@ -0,0 +1,94 @@
+import numpy
+import pytest
+from PIL import Image
+
+from conftest import PROJECT_DIR
+from utils import template
+from utils.template import MultiTemplateMatcher, load_template
+
+FLOORS = [f"stage/bounty-floor-{floor}.png" for floor in ("i", "ii", "iii", "iv")]
+
+
+@pytest.fixture
+def resource_images(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        template,
+        "RESOURCE_IMAGE_DIRS",
+        [tmp_path, PROJECT_DIR / "assets" / "resource" / "base" / "image"],
+    )
+    return tmp_path
+
+
+def paste(frame, gray, x, y):
+    height, width = gray.shape
+    frame[y : y + height, x : x + width] = gray.astype(numpy.uint8)[..., None]
+
+
+def brute_force_ncc(image, patch):
+    height, width = patch.shape
+    patch = patch - patch.mean()
+    scores = numpy.zeros(
+        (image.shape[0] - height + 1, image.shape[1] - width + 1), dtype=numpy.float64
+    )
+    for y in range(scores.shape[0]):
+        for x in range(scores.shape[1]):
+            window = image[y : y + height, x : x + width]
+            window = window - window.mean()
+            denominator = numpy.sqrt((window**2).sum() * (patch**2).sum())
+            scores[y, x] = (window * patch).sum() / denominator if denominator else 0
+    return scores
+
+
+def test_finds_every_floor_template(resource_images):
+    rng = numpy.random.default_rng(0)
+    matcher = MultiTemplateMatcher(FLOORS)
+    roi = [0, 185, 214, 483]
+
+    for name, (x, y) in zip(FLOORS, [(20, 200), (90, 300), (150, 420), (40, 560)]):
+        frame = rng.integers(0, 255, (720, 1280, 3), dtype=numpy.uint8)
+        template_image = load_template(name)
+        paste(frame, template_image, x, y)
+
+        matches = matcher.match(frame, roi)
+        assert matches[name].box == [
+            x,
+            y,
+            template_image.shape[1],
+            template_image.shape[0],
+        ]
+        assert matches[name].score > 0.99
+        best = max(matches, key=lambda other: matches[other].score)
+        assert best == name
+
+
+def test_scores_match_brute_force_ncc(resource_images):
+    rng = numpy.random.default_rng(1)
+    patches = {
+        "a.png": rng.integers(0, 255, (6, 5), dtype=numpy.uint8),
+        "b.png": rng.integers(0, 255, (4, 7), dtype=numpy.uint8),
+    }
+    for name, patch in patches.items():
+        Image.fromarray(patch, "L").save(resource_images / name)
+
+    frame = rng.integers(0, 255, (40, 50, 3), dtype=numpy.uint8)
+    frame[:] = frame[..., :1]  # gray, so to_gray is exact
+    roi = [10, 8, 30, 24]
+    matches = MultiTemplateMatcher(list(patches)).match(frame, roi)
+
+    crop = frame[8:32, 10:40, 0].astype(numpy.float64)
+    for name, patch in patches.items():
+        scores = brute_force_ncc(crop, patch.astype(numpy.float64))
+        y, x = numpy.unravel_index(int(numpy.argmax(scores)), scores.shape)
+        assert matches[name].box == [10 + x, 8 + y, patch.shape[1], patch.shape[0]]
+        assert matches[name].score == pytest.approx(scores[y, x], abs=1e-4)
+
+
+def test_skips_templates_larger_than_the_roi(resource_images):
+    frame = numpy.zeros((720, 1280, 3), dtype=numpy.uint8)
+    assert MultiTemplateMatcher(FLOORS).match(frame, [0, 0, 20, 20]) == {}
+
+
+def test_missing_template_raises(resource_images):
+    frame = numpy.zeros((100, 100, 3), dtype=numpy.uint8)
+    with pytest.raises(FileNotFoundError):
+        MultiTemplateMatcher(["missing.png"]).match(frame, [0, 0, 50, 50])